@@ -0,0 +1,57 @@
+from .base.address import address_lower
+
+
+COLLECTION_NAME = 'account_operations'
+
+
+def operation_key(d_oper):
+    """ Query of the operation in operations: queue operations by operId_,
+    Transfer by id_event and revert by hash """
+
+    if d_oper.get("operId_") is not None:
+        return {"operId_": d_oper["operId_"]}
+    if d_oper.get("id_event"):
+        return {"id_event": d_oper["id_event"]}
+
+    return {"hash": d_oper["hash"]}
+
+
+def operation_accounts(d_oper):
+    """ Sender and recipient of the operation document """
+
+    d_params = d_oper.get("params") or dict()
+    d_executed = d_oper.get("executed") or dict()
+
+    return [d_params.get("sender"), d_params.get("recipient"),
+            d_executed.get("sender_"), d_executed.get("recipient_")]
+
+
+def account_operation_updates(d_oper, accounts, replace=False):
+    """ (query, update) of the entries of the operation, one per account
+
+    Entries are compact: account, key (the query of the operation), operation, hash,
+    blockNumber and createdAt to page by account. With replace the entry takes the
+    values of this write (executed operations), if not only the first write sets them.
+    """
+
+    d_entry = dict()
+    d_entry["operation"] = d_oper.get("operation")
+    d_entry["hash"] = d_oper["hash"]
+    d_entry["blockNumber"] = d_oper["blockNumber"]
+    d_entry["createdAt"] = d_oper["createdAt"]
+
+    key = operation_key(d_oper)
+    update = {"$set": d_entry} if replace else {"$setOnInsert": d_entry}
+
+    updates = list()
+    for account in sorted(set(address_lower(account) for account in accounts if account)):
+        updates.append(({"account": account, "key": key}, update))
+
+    return updates
+
+
+def write_account_operations(uow, d_oper, accounts, replace=False):
+    """ Register the upsert of the account entries of the operation """
+
+    for query, update in account_operation_updates(d_oper, accounts, replace=replace):
+        uow.update_one(COLLECTION_NAME, query, update, upsert=True)
@@ -0,0 +1,86 @@
+"""
+                    GNU AFFERO GENERAL PUBLIC LICENSE
+                       Version 3, 19 November 2007
+
+ Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+ Everyone is permitted to copy and distribute verbatim copies
+ of this license document, but changing it is not allowed.
+
+ THIS IS A PART OF MONEY ON CHAIN PACKAGE
+
+"""
+
+import os
+import json
+import threading
+
+from eth_hash.auto import keccak
+
+from .decoder import LogDecoder
+
+
+class ABIRegistry(object):
+    """ Process wide registry of ABIs
+
+    ABIs are interned by content hash, so contracts sharing an ABI (ERC20 tokens,
+    vestings) share the same log decoder and decode plans. ABI files are read
+    from disk only once.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # abi file path -> abi
+        self.abi_files = dict()
+        # content hash -> abi
+        self.abis = dict()
+        # content hash -> log decoder
+        self.decoders = dict()
+
+    @staticmethod
+    def abi_hash(abi):
+        """ Hash of the ABI content, independent of the key order """
+
+        content = json.dumps(abi, sort_keys=True, separators=(',', ':'))
+        return keccak(content.encode()).hex()
+
+    def load_abi_file(self, abi_file):
+        """ ABI from file, read from disk only the first time """
+
+        abi_file = os.path.realpath(abi_file)
+        with self.lock:
+            abi = self.abi_files.get(abi_file)
+        if abi is not None:
+            return abi
+
+        with open(abi_file) as f:
+            abi = json.load(f)
+
+        with self.lock:
+            return self.abi_files.setdefault(abi_file, abi)
+
+    def intern_abi(self, abi):
+        """ Register the ABI, return its content hash """
+
+        abi_hash = self.abi_hash(abi)
+        with self.lock:
+            self.abis.setdefault(abi_hash, abi)
+
+        return abi_hash
+
+    def _hash_decoder(self, abi_hash):
+
+        with self.lock:
+            decoder = self.decoders.get(abi_hash)
+            if decoder is None:
+                decoder = LogDecoder(abi=self.abis[abi_hash])
+                self.decoders[abi_hash] = decoder
+
+        return decoder
+
+    def log_decoder(self, abi):
+        """ Log decoder shared by every contract with the same ABI """
+
+        return self._hash_decoder(self.intern_abi(abi))
+
+
+abi_registry = ABIRegistry()
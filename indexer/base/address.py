@@ -0,0 +1,34 @@
+"""
+                    GNU AFFERO GENERAL PUBLIC LICENSE
+                       Version 3, 19 November 2007
+
+ Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+ Everyone is permitted to copy and distribute verbatim copies
+ of this license document, but changing it is not allowed.
+
+ THIS IS A PART OF MONEY ON CHAIN PACKAGE
+
+"""
+
+import sys
+from functools import lru_cache
+
+from eth_utils import to_checksum_address
+
+
+# the same few thousand addresses repeat in every block, bounded so it can't grow forever
+ADDRESS_CACHE_SIZE = 65536
+
+
+@lru_cache(maxsize=ADDRESS_CACHE_SIZE)
+def address_lower(address):
+    """ Lowercase form of the address, interned """
+
+    return sys.intern(address.lower())
+
+
+@lru_cache(maxsize=ADDRESS_CACHE_SIZE)
+def address_checksum(address):
+    """ Checksum form of the address (keccak), interned """
+
+    return sys.intern(to_checksum_address(address))
@@ -11,9 +11,10 @@
 
 """
 
-import json
 import logging
 
+from .abi_registry import abi_registry
+
 
 class Contract(object):
 
@@ -45,10 +46,8 @@ class Contract(object):
     @staticmethod
     def content_abi_file(abi_file):
 
-        with open(abi_file) as f:
-            abi = json.load(f)
-
-        return abi
+        # read once and shared by the contracts loading the same file
+        return abi_registry.load_abi_file(abi_file)
 
     @staticmethod
     def content_bin_file(bin_file):
@@ -5,15 +5,20 @@ by: https://github.com/iamdefinitelyahuman/eth-event/
 """
 
 import re
+from collections import OrderedDict
 from typing import Dict, List
 
 from eth_abi import decode
-from eth_abi.exceptions import InsufficientDataBytes, NoEntriesFound, NonEmptyPaddingBytes
+from eth_abi.decoding import ContextFramesBytesIO, TupleDecoder
+from eth_abi.exceptions import DecodingError, InsufficientDataBytes, NoEntriesFound, NonEmptyPaddingBytes
+from eth_abi.registry import registry
 from eth_hash.auto import keccak
 from eth_utils import to_checksum_address
 from hexbytes import HexBytes
 from web3.contract import Contract
 
+from .address import address_checksum, address_lower
+
 
 class ABIError(Exception):
     pass
@@ -32,13 +37,259 @@ class UnknownEvent(Exception):
 
 
 class LogDecoder:
-    def __init__(self, contract: Contract):
+    def __init__(self, contract: Contract = None, abi: List = None):
         self.contract = contract
-        self.event_abis = [abi for abi in self.contract.abi if abi['type'] == 'event']
+        if contract is not None:
+            abi = contract.abi
+        self.event_abis = [i for i in abi if i['type'] == 'event']
         self.topic_map = get_topic_map(self.event_abis)
+        self.plans = get_plan_map(self.topic_map)
 
     def decode_log(self, log: Dict):
-        return decode_log(log, self.topic_map)
+        return decode_log_plan(log, self.plans)
+
+
+def to_bytes(value) -> bytes:
+    """ Topic or data as bytes, they come as bytes / HexBytes from the node or hex string """
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value)
+    if value[:2] in ("0x", "0X"):
+        value = value[2:]
+    return bytes.fromhex(value)
+
+
+class DecodePlan:
+    """
+    Precompiled decoding of one event: the types, the eth-abi decoders and the
+    position of the indexed fields are resolved once, decoding a log is then
+    one call to the data decoder plus the topics.
+    """
+
+    def __init__(self, abi: Dict):
+        self.name = abi["name"]
+        self.inputs = abi["inputs"]
+
+        try:
+            unindexed_inputs = [i for i in self.inputs if not i["indexed"]]
+            self.indexed_count = len(self.inputs) - len(unindexed_inputs)
+            self.unindexed_types = tuple(_params(unindexed_inputs))
+            # special case, log without topics of an event with indexed fields
+            self.all_types = tuple(_params(self.inputs))
+        except (KeyError, TypeError):
+            raise ABIError("Invalid ABI")
+
+        self.data_decoder = self._tuple_decoder(self.unindexed_types)
+        self.all_decoder = self._tuple_decoder(self.all_types)
+
+        # indexed dynamic types (string, bytes, arrays) are only the hash in the topic
+        self.topic_decoders = dict()
+        for i, types in zip(self.inputs, self.all_types):
+            if i["indexed"]:
+                decoder = registry.get_decoder(types)
+                self.topic_decoders[i["name"]] = None if decoder.is_dynamic else decoder
+
+        # (name, type, components, indexed) of every field in order
+        self.fields = tuple((i["name"], i["type"], i.get("components"), i["indexed"]) for i in self.inputs)
+
+    @staticmethod
+    def _tuple_decoder(types):
+        return TupleDecoder(decoders=tuple(registry.get_decoder(t) for t in types))
+
+    def decode(self, topics: List, data) -> List:
+
+        if self.indexed_count and not topics:
+            data_decoder, data_types, from_topics = self.all_decoder, self.all_types, False
+        else:
+            if self.indexed_count < len(topics):
+                raise EventError(
+                    "Event log does not contain enough topics for the given ABI - this"
+                    " is usually because an event argument is not marked as indexed"
+                )
+            if self.indexed_count > len(topics):
+                raise EventError(
+                    "Event log contains more topics than expected for the given ABI - this is"
+                    " usually because an event argument is incorrectly marked as indexed"
+                )
+            data_decoder, data_types, from_topics = self.data_decoder, self.unindexed_types, True
+
+        data = to_bytes(data)
+        if data_types and not data:
+            data = bytes(len(data_types) * 32)
+
+        try:
+            decoded = data_decoder(ContextFramesBytesIO(data))
+        except InsufficientDataBytes:
+            raise EventError("Event data has insufficient length")
+        except NonEmptyPaddingBytes:
+            raise EventError("Malformed data field in event log")
+        except OverflowError:
+            raise EventError("Cannot decode event due to overflow error")
+        except (DecodingError, ValueError):
+            raise EventError("Malformed data field in event log")
+
+        result = []
+        i_topic = 0
+        i_data = 0
+        for name, abi_type, components, indexed in self.fields:
+            field = {"name": name, "type": abi_type}
+            if components is not None:
+                field["components"] = components
+
+            if from_topics and indexed:
+                encoded = to_bytes(topics[i_topic])
+                i_topic += 1
+                decoder = self.topic_decoders[name]
+                value = None
+                if decoder is not None:
+                    try:
+                        value = decoder(ContextFramesBytesIO(encoded))
+                    except (InsufficientDataBytes, NoEntriesFound, OverflowError):
+                        decoder = None
+                if decoder is None:
+                    # an array or other data type that uses multiple slots
+                    field.update({"value": HexBytes(encoded).hex(), "decoded": False})
+                    result.append(field)
+                    continue
+            else:
+                value = decoded[i_data]
+                i_data += 1
+
+            if isinstance(value, bytes):
+                # converting to `HexBytes` first ensures the leading `0x`
+                value = HexBytes(value).hex()
+            field.update({"value": value, "decoded": True})
+            result.append(field)
+
+        return result
+
+    def decode_log(self, log: Dict) -> List:
+        """ Data of one log of this event, EventError if it cannot be decoded """
+        try:
+            return self.decode(log["topics"][1:], log["data"])
+        except (KeyError, TypeError, ValueError):
+            raise EventError("Invalid event")
+
+    def decode_many(self, logs: List) -> List:
+        """ Data of every log, all of them of this event, in one pass.
+        A log that cannot be decoded gets its EventError instance in place of the data. """
+        results = []
+        for log in logs:
+            try:
+                results.append(self.decode_log(log))
+            except EventError as e:
+                results.append(e)
+        return results
+
+
+class DecodedGroup:
+    """
+    Logs of a batch with the same (address, topic), decoded with one plan.
+
+    `indexes` are the positions of the logs in the batch and `columns` the
+    values of every field, one list per field name in the order of the logs.
+    """
+
+    def __init__(self, address: str, plan: DecodePlan):
+        self.address = address
+        self.plan = plan
+        self.name = plan.name
+        self.indexes = []
+        self.columns = OrderedDict((name, []) for name, _, _, _ in plan.fields)
+
+    def append(self, index: int, data: List):
+        self.indexes.append(index)
+        for field in data:
+            self.columns[field["name"]].append(field["value"])
+
+
+def get_plan_map(topic_map: Dict) -> Dict:
+    """
+    Decode plans by topic as bytes, from a topic map generated by `get_topic_map`.
+    """
+    return {to_bytes(topic): DecodePlan(abi) for topic, abi in topic_map.items()}
+
+
+def decode_log_plan(log: Dict, plans: Dict) -> Dict:
+    """
+    Decode a single event log with the plans generated by `get_plan_map`.
+
+    Same result as `decode_log`, with a dict lookup by the raw topic bytes.
+    """
+    if not log["topics"]:
+        raise EventError("Cannot decode an anonymous event")
+
+    plan = plans.get(to_bytes(log["topics"][0]))
+    if plan is None:
+        raise UnknownEvent("Event topic is not present in given ABI")
+
+    return {
+        "name": plan.name,
+        "data": plan.decode_log(log),
+        "decoded": True,
+        "address": address_checksum(log["address"]),
+    }
+
+
+def decode_logs_batch(logs: List, decoders: Dict):
+    """
+    Decode the logs of a whole batch (block, range) grouped by (address, topic).
+
+    Each group is decoded in one pass with its plan, the lookups are done once
+    per group and not per log.
+
+    Arguments
+    ---------
+    logs : List
+        Event logs, from any of the addresses in `decoders`.
+    decoders : Dict
+        `LogDecoder` by lowercase address.
+
+    Returns
+    -------
+    List
+        One item per log in the same order, formatted as `decode_log`, or the
+        `UnknownEvent` / `EventError` instance if the log cannot be decoded.
+    Dict
+        `DecodedGroup` by (address, topic), with the typed columns of the
+        decoded logs of the group.
+    """
+    pending = OrderedDict()
+    results = [None] * len(logs)
+    for index, log in enumerate(logs):
+        try:
+            key = (address_lower(log["address"]), to_bytes(log["topics"][0]))
+        except IndexError:
+            results[index] = EventError("Cannot decode an anonymous event")
+            continue
+        except (KeyError, TypeError, ValueError):
+            results[index] = EventError("Invalid event")
+            continue
+        pending.setdefault(key, []).append(index)
+
+    groups = OrderedDict()
+    for (address, topic), indexes in pending.items():
+        plan = decoders[address].plans.get(topic)
+        if plan is None:
+            for index in indexes:
+                results[index] = UnknownEvent("Event topic is not present in given ABI")
+            continue
+
+        group = DecodedGroup(address, plan)
+        emitter = address_checksum(address)
+        for index, data in zip(indexes, plan.decode_many([logs[index] for index in indexes])):
+            if isinstance(data, EventError):
+                results[index] = data
+                continue
+            group.append(index, data)
+            results[index] = {
+                "name": plan.name,
+                "data": data,
+                "decoded": True,
+                "address": emitter,
+            }
+        groups[(address, topic)] = group
+
+    return results, groups
 
 
 def get_log_topic(event_abi: Dict) -> str:
@@ -147,7 +398,7 @@ def decode_log(log: Dict, topic_map: Dict) -> Dict:
             "name": abi["name"],
             "data": _decode(abi["inputs"], log["topics"][1:], log["data"]),
             "decoded": True,
-            "address": to_checksum_address(log["address"]),
+            "address": address_checksum(log["address"]),
         }
     except (KeyError, TypeError):
         raise EventError("Invalid event")
@@ -195,7 +446,7 @@ def decode_logs(logs: List, topic_map: Dict, allow_undecoded: bool = False) -> L
                 "topics": topics,
                 "data": HexBytes(item["data"]).hex(),
                 "decoded": False,
-                "address": to_checksum_address(item["address"]),
+                "address": address_checksum(item["address"]),
             }
         else:
             event = decode_log(item, topic_map)
@@ -362,7 +613,7 @@ def _decode(inputs: List, topics: List, data: str) -> List:
         if topics and i["indexed"]:
             encoded = HexBytes(topics.pop())
             try:
-                value = decode(i["type"], encoded)
+                value = decode([i["type"]], encoded)[0]
             except (InsufficientDataBytes, NoEntriesFound, OverflowError):
                 # an array or other data type that uses multiple slots
                 result[-1].update({"value": encoded.hex(), "decoded": False})
@@ -34,20 +34,21 @@ class MongoManager:
 
         return collection
 
-    def create_index(self, client, collection_name, index_map, unique=False):
+    def create_index(self, client, collection_name, index_map, unique=False, partial_filter=None):
         # index_map: [("field_to_index", ASCENDING)]
 
         collection = self.get_collection(client, collection_name)
-        create = True
-        for index in index_map:
-            if index[0] in collection.index_information():
-                create = False
-                break
+        index_keys = [tuple(index) for index in index_map]
+        existing = [info['key'] for info in collection.index_information().values()]
+        create = index_keys not in existing
 
         if create:
-            collection.create_index(index_map, unique=unique)
+            if partial_filter:
+                collection.create_index(index_keys, unique=unique, partialFilterExpression=partial_filter)
+            else:
+                collection.create_index(index_keys, unique=unique)
         else:
-            log.error("Cannot create index already exist collection indexing!")
+            log.info("Index already exist {0} {1}".format(collection_name, index_keys))
 
 
 mongo_manager = MongoManager()
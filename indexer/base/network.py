@@ -14,6 +14,7 @@
 from web3 import Web3, Account
 from web3._utils.threads import Timeout
 from web3.exceptions import TimeExhausted
+from web3._utils.request import make_post_request
 import json
 import os
 import datetime
@@ -149,6 +150,70 @@ class ConnectionManager(BaseConnectionManager):
         """ Transaction receipt """
         return self.web3.eth.get_transaction_receipt(transaction_hash)
 
+    def batch_request(self, method, params_list, batch_size=100):
+        """ Same JSON-RPC method with every params of params_list, in batch requests of batch_size
+
+        Return the results in the order of params_list
+        """
+
+        provider = self.web3.provider
+        results = list()
+        for start in range(0, len(params_list), batch_size):
+            chunk = params_list[start:start + batch_size]
+            payload = [dict(jsonrpc='2.0', id=n, method=method, params=params)
+                       for n, params in enumerate(chunk)]
+            raw_response = make_post_request(
+                provider.endpoint_uri,
+                json.dumps(payload).encode(),
+                **provider.get_request_kwargs())
+            responses = json.loads(raw_response)
+            if not isinstance(responses, list):
+                raise Exception("Batch request not supported by the node: {0}".format(responses))
+
+            chunk_results = [None] * len(chunk)
+            for response in responses:
+                if 'error' in response:
+                    raise Exception("{0} request error: {1}".format(method, response['error']))
+                chunk_results[response['id']] = response.get('result')
+            results.extend(chunk_results)
+
+        return results
+
+    def get_transaction_receipts(self, transaction_hashes, batch_size=100):
+        """ Transactions receipts in JSON-RPC batch requests of batch_size
+
+        Return dict hash -> dict(status, blockNumber, blockHash), None if the node doesn't know the tx
+        """
+
+        results = self.batch_request('eth_getTransactionReceipt',
+                                     [[tx_hash] for tx_hash in transaction_hashes],
+                                     batch_size=batch_size)
+
+        receipts = dict()
+        for tx_hash, result in zip(transaction_hashes, results):
+            if not result:
+                receipts[tx_hash] = None
+                continue
+            receipts[tx_hash] = dict(
+                status=Web3.to_int(hexstr=result['status']),
+                blockNumber=Web3.to_int(hexstr=result['blockNumber']),
+                blockHash=result['blockHash'])
+
+        return receipts
+
+    def get_block_hashes(self, block_numbers, batch_size=100):
+        """ Hash of the blocks of the canonical chain in JSON-RPC batch requests of batch_size
+
+        Return dict block number -> hash, None if the node doesn't have the block
+        """
+
+        results = self.batch_request('eth_getBlockByNumber',
+                                     [[hex(block_number), False] for block_number in block_numbers],
+                                     batch_size=batch_size)
+
+        return dict((block_number, result['hash'] if result else None)
+                    for block_number, result in zip(block_numbers, results))
+
     def get_transaction_by_hash(self, transaction_hash):
         """ Transaction by hash """
         return self.web3.eth.get_transaction(transaction_hash)
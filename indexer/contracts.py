@@ -13,7 +13,9 @@
 
 import os
 import logging
+from web3 import Web3
 from web3.types import BlockIdentifier
+from web3._utils.abi import get_abi_output_types
 
 from .base.contracts import Contract
 
@@ -40,25 +42,31 @@ class Multicall2(Contract):
     def aggregate_multiple(self, call_list, require_success=False, block_identifier: BlockIdentifier = 'latest'):
 
         list_aggregate = list()
+        list_functions = list()
         if not isinstance(call_list, list):
             raise Exception("list_aggregate must be a list")
 
         for aggregate_tuple in call_list:
             if not isinstance(aggregate_tuple, (tuple, list)):
                 raise Exception("The list must contains tuple or list of parameters: "
-                                "(contract_address, encode_input, decode_output, format output)")
+                                "(contract_address, function, input_parameters, format output)")
 
             if len(aggregate_tuple) != 4:
                 raise Exception("The list must contains tuple or list of parameters: "
                                 "(contract_address, function, input_parameters, format output). "
-                                "Example: (moc_state_address, moc_state.sc.getBitcoinPrice, None, None)")
+                                "Example: (moc_address, moc.sc.functions.getBitcoinPrice, None, None)")
 
             if aggregate_tuple[2]:
-                list_aggregate.append((aggregate_tuple[0], aggregate_tuple[1].encode_input(*aggregate_tuple[2])))
+                fn = aggregate_tuple[1](*aggregate_tuple[2])
             else:
-                list_aggregate.append((aggregate_tuple[0], aggregate_tuple[1].encode_input()))
+                fn = aggregate_tuple[1]()
 
-        results = self.sc.tryBlockAndAggregate(require_success, list_aggregate, block_identifier=block_identifier)
+            list_functions.append(fn)
+            list_aggregate.append((Web3.to_checksum_address(aggregate_tuple[0]), fn._encode_transaction_data()))
+
+        results = self.sc.functions.tryBlockAndAggregate(
+            require_success,
+            list_aggregate).call(block_identifier=block_identifier)
 
         # decode results
         count = 0
@@ -67,11 +75,16 @@ class Multicall2(Contract):
         d_validity = dict()
         l_validity_results = list()
         for result in results[2]:
-            fn = call_list[count][1]
+            fn = list_functions[count]
             format_result = call_list[count][3]
-            decoded_result = fn.decode_output(result[1])
-            if format_result:
-                decoded_result = format_result(decoded_result)
+            decoded_result = None
+            if result[0]:
+                decoded_result = self.connection_manager.web3.codec.decode(
+                    get_abi_output_types(fn.abi), result[1])
+                if len(decoded_result) == 1:
+                    decoded_result = decoded_result[0]
+                if format_result:
+                    decoded_result = format_result(decoded_result)
 
             decoded_results.append(decoded_result)
 
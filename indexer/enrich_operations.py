@@ -0,0 +1,127 @@
+import datetime
+import time
+
+from pymongo import UpdateOne
+
+from .logger import get_logger
+from .events import EventMocQueueOperationQueued
+from .account_operations import account_operation_updates, COLLECTION_NAME as ACCOUNT_OPERATIONS
+
+
+log = get_logger('enrich')
+
+
+class EnrichOperations:
+    """ Fill the params of the queued operations out of the log processing
+
+    The logs scanner writes the operation with what the logs contain and push a
+    job to operations_enrichment. This task reads the params from MocQueue in
+    batches (multicall per block) and completes the operations. It waits while
+    the logs scanner is catching up, so the node is used first for the logs.
+    """
+
+    def __init__(self, options, connection_helper, indexer_state, contracts_loaded, filter_contracts_addresses):
+        self.options = options
+        self.connection_helper = connection_helper
+        self.indexer_state = indexer_state
+        self.batch_size = self.options.get('enrich_operations', {}).get('batch_size', 100)
+        self.catch_up_blocks = self.options.get('enrich_operations', {}).get('catch_up_blocks', 1000)
+        # failing jobs are retried after retry_seconds, doubled on every attempt up to max_retry_seconds
+        self.retry_seconds = self.options.get('enrich_operations', {}).get('retry_seconds', 60)
+        self.max_retry_seconds = self.options.get('enrich_operations', {}).get('max_retry_seconds', 3600)
+
+        self.handler_queued = EventMocQueueOperationQueued(
+            self.options,
+            self.connection_helper,
+            contracts_loaded,
+            filter_contracts_addresses,
+            dict())
+
+    def catching_up(self):
+        """ Logs scanner far behind the node head, ex. backfilling the history """
+
+        watermark = self.indexer_state.get('last_logs_watermark')
+        if not watermark:
+            return False
+
+        head = self.connection_helper.connection_manager.block_number
+
+        return head - watermark['blockNumber'] > self.catch_up_blocks
+
+    def retry_later(self, collection_enrichment, job):
+        """ Back off the failing job, so it doesn't block the rest of the queue """
+
+        attempts = job.get('attempts', 0) + 1
+        delay = min(self.retry_seconds * 2 ** (attempts - 1), self.max_retry_seconds)
+        collection_enrichment.update_one(
+            {"_id": job["_id"]},
+            {"$set": {"attempts": attempts,
+                      "retryAt": datetime.datetime.now() + datetime.timedelta(seconds=delay)}})
+
+    def write_account_operations(self, collection_operations, accounts):
+        """ Entries in account_operations of the enriched operations, accounts: operId_ -> accounts """
+
+        requests = list()
+        for d_oper in collection_operations.find(
+                {"operId_": {"$in": list(accounts.keys())}},
+                {"operId_": 1, "operation": 1, "hash": 1, "blockNumber": 1, "createdAt": 1}):
+            for query, update in account_operation_updates(d_oper, accounts[d_oper["operId_"]]):
+                requests.append(UpdateOne(query, update, upsert=True))
+
+        if requests:
+            collection_accounts = self.connection_helper.mongo_collection(ACCOUNT_OPERATIONS)
+            collection_accounts.bulk_write(requests, ordered=False)
+
+    def enrich_operations(self, task=None):
+
+        start_time = time.time()
+
+        if self.catching_up():
+            log.info("[6. Enrich Operations] Logs scanner catching up, waiting to enrich operations")
+            return
+
+        collection_enrichment = self.connection_helper.mongo_collection('operations_enrichment')
+        jobs = list(collection_enrichment.find(
+            {"retryAt": {"$not": {"$gt": datetime.datetime.now()}}},
+            sort=[("blockNumber", 1)],
+            limit=self.batch_size))
+        if not jobs:
+            return
+
+        self.handler_queued.prefetch_params(
+            [(job["operId_"], job["operType_"], job["blockNumber"]) for job in jobs])
+
+        requests = list()
+        done_ids = list()
+        accounts = dict()
+        for job in jobs:
+            try:
+                raw_params = self.handler_queued.operation_params(job["operId_"], job["operType_"], job["blockNumber"])
+                d_params = self.handler_queued.parse_params(job["operType_"], raw_params)
+            except Exception as e:
+                log.error("[6. Enrich Operations] Cannot get params operId_: {0} {1}".format(job["operId_"], e))
+                self.retry_later(collection_enrichment, job)
+                continue
+
+            # only the params got from MocQueue, the rest of the operation is from the logs
+            d_set = dict(("params.{0}".format(key), value) for key, value in d_params.items())
+            d_set["params.lastUpdatedAt"] = datetime.datetime.now()
+            requests.append(UpdateOne({"operId_": job["operId_"]}, {"$set": d_set}))
+            done_ids.append(job["_id"])
+            accounts[job["operId_"]] = [d_params.get('sender'), d_params.get('recipient')]
+
+        if requests:
+            collection_operations = self.connection_helper.mongo_collection('operations')
+            collection_operations.bulk_write(requests, ordered=False)
+            self.write_account_operations(collection_operations, accounts)
+            collection_enrichment.delete_many({"_id": {"$in": done_ids}})
+
+        duration = time.time() - start_time
+        log.info("[6. Enrich Operations] Done! Enriched: [{0}] in [{1} seconds]".format(len(requests), duration))
+
+        if requests and len(jobs) == self.batch_size:
+            # more pending and the node is answering, run again
+            return dict(wake=['enrich_operations'])
+
+    def on_task(self, task=None):
+        return self.enrich_operations(task=task)
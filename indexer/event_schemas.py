@@ -0,0 +1,245 @@
+"""
+Declarative mapping of the events to the documents written by SchemaEvent (events.py)
+
+Key: (contract name in contracts_addresses, event name)
+
+    collection: event collection, upsert by id_event
+    fields: (document field, converter[, event field]), event field defaults to the document field,
+            a tuple are alternative names (first present). Every document also has hash, id_event,
+            blockNumber, createdAt and lastUpdatedAt.
+    operation: executed operation written to operations by operId_ (MocQueue)
+    omoc_operation: operation written to omoc_operations by id_event
+    omoc_fields: fields of the omoc operation, default the same fields
+
+Converters: int, str, raw (as is), address (checksum), address_lower, oper_id,
+tp_index and ca_index (position of the address in the config TP / CA list)
+"""
+
+QUEUE_FEES_FIELDS = [
+    ('qACfee_', 'str'),
+    ('qFeeToken_', 'str'),
+    ('qACVendorMarkup_', 'str'),
+    ('qFeeTokenVendorMarkup_', 'str'),
+    ('vendor_', 'address'),
+    ('operId_', 'oper_id')
+]
+
+SENDER_RECIPIENT_FIELDS = [
+    ('sender_', 'address'),
+    ('recipient_', 'address')
+]
+
+TP_FIELDS = [
+    ('tp_', 'address'),
+    ('tpIndex_', 'tp_index', 'tp_')
+]
+
+STAKE_FIELDS = [
+    ('user', 'address_lower'),
+    ('subaccount', 'address_lower'),
+    ('destination', 'address_lower'),
+    ('amount', 'str'),
+    ('mocs', 'str')
+]
+
+PAYMENT_FIELDS = [
+    ('id', 'oper_id'),
+    ('source', 'address_lower'),
+    ('destination', 'address_lower'),
+    ('amount', 'str')
+]
+
+EARNINGS_FIELDS = [
+    ('earnings', 'str'),
+    ('start', 'int'),
+    ('end', 'int')
+]
+
+
+EVENT_SCHEMAS = {
+
+    # Moc
+
+    ('Moc', 'LiqTPRedeemed'): dict(
+        collection='event_Moc_LiqTPRedeemed',
+        fields=TP_FIELDS + [
+            ('sender_', 'address_lower'),
+            ('recipient_', 'address_lower'),
+            ('qTP_', 'raw'),
+            ('qAC_', 'raw')
+        ]),
+    ('Moc', 'SuccessFeeDistributed'): dict(
+        collection='event_Moc_SuccessFeeDistributed',
+        fields=[
+            ('mocGain_', 'str'),
+            ('tpGain_', 'str')
+        ]),
+    ('Moc', 'SettlementExecuted'): dict(
+        collection='event_Moc_SettlementExecuted',
+        fields=[]),
+    ('Moc', 'TCInterestPayment'): dict(
+        collection='event_Moc_TCInterestPayment',
+        fields=[
+            ('interestAmount_', 'str')
+        ]),
+    ('Moc', 'TPemaUpdated'): dict(
+        collection='event_Moc_TPemaUpdated',
+        fields=[
+            ('i_', 'oper_id'),
+            ('oldTPema_', 'str'),
+            ('newTPema_', 'str')
+        ]),
+
+    # MocQueue
+
+    ('MocQueue', 'OperationExecuted'): dict(
+        collection='event_MocQueue_OperationExecuted',
+        fields=[
+            ('operId_', 'oper_id'),
+            ('executor', 'address')
+        ]),
+    ('MocQueue', 'TCMinted'): dict(
+        collection='event_MocQueue_TCMinted',
+        operation='TCMint',
+        fields=SENDER_RECIPIENT_FIELDS + [
+            ('qTC_', 'str'),
+            ('qAC_', 'str')
+        ] + QUEUE_FEES_FIELDS),
+    ('MocQueue', 'TCRedeemed'): dict(
+        collection='event_MocQueue_TCRedeemed',
+        operation='TCRedeem',
+        fields=SENDER_RECIPIENT_FIELDS + [
+            ('qTC_', 'str'),
+            ('qAC_', 'str')
+        ] + QUEUE_FEES_FIELDS),
+    ('MocQueue', 'TPMinted'): dict(
+        collection='event_MocQueue_TPMinted',
+        operation='TPMint',
+        fields=[
+            ('tp', 'address', ('tp', 'tp_')),
+            ('tpIndex_', 'tp_index', ('tp', 'tp_'))
+        ] + SENDER_RECIPIENT_FIELDS + [
+            ('qTP_', 'str'),
+            ('qAC_', 'str')
+        ] + QUEUE_FEES_FIELDS),
+    ('MocQueue', 'TPRedeemed'): dict(
+        collection='event_MocQueue_TPRedeemed',
+        operation='TPRedeem',
+        fields=TP_FIELDS + SENDER_RECIPIENT_FIELDS + [
+            ('qTP_', 'str'),
+            ('qAC_', 'str')
+        ] + QUEUE_FEES_FIELDS),
+    ('MocQueue', 'TPSwappedForTP'): dict(
+        collection='event_MocQueue_TPSwappedForTP',
+        operation='TPSwapForTP',
+        fields=[
+            ('tpFrom_', 'address'),
+            ('tpFromIndex_', 'tp_index', 'tpFrom_'),
+            ('tpTo_', 'address'),
+            ('tpToIndex_', 'tp_index', 'tpTo_')
+        ] + SENDER_RECIPIENT_FIELDS + [
+            ('qTPfrom_', 'str'),
+            ('qTPto_', 'str')
+        ] + QUEUE_FEES_FIELDS),
+    ('MocQueue', 'TPSwappedForTC'): dict(
+        collection='event_MocQueue_TPSwappedForTC',
+        operation='TPSwapForTC',
+        fields=TP_FIELDS + SENDER_RECIPIENT_FIELDS + [
+            ('qTC_', 'str'),
+            ('qTP_', 'str')
+        ] + QUEUE_FEES_FIELDS),
+    ('MocQueue', 'TCSwappedForTP'): dict(
+        collection='event_MocQueue_TCSwappedForTP',
+        operation='TCSwapForTP',
+        fields=TP_FIELDS + SENDER_RECIPIENT_FIELDS + [
+            ('qTC_', 'str'),
+            ('qTP_', 'str')
+        ] + QUEUE_FEES_FIELDS),
+    ('MocQueue', 'TCandTPRedeemed'): dict(
+        collection='event_MocQueue_TCandTPRedeemed',
+        operation='TCandTPRedeem',
+        fields=TP_FIELDS + SENDER_RECIPIENT_FIELDS + [
+            ('qTC_', 'str'),
+            ('qTP_', 'str'),
+            ('qAC_', 'str')
+        ] + QUEUE_FEES_FIELDS),
+    ('MocQueue', 'TCandTPMinted'): dict(
+        collection='event_MocQueue_TCandTPMinted',
+        operation='TCandTPMint',
+        fields=TP_FIELDS + SENDER_RECIPIENT_FIELDS + [
+            ('qTC_', 'str'),
+            ('qTP_', 'str'),
+            ('qAC_', 'str')
+        ] + QUEUE_FEES_FIELDS),
+
+    # OMOC
+
+    ('IncentiveV2', 'ClaimOK'): dict(
+        collection='event_IncentiveV2_ClaimOK',
+        fields=[
+            ('recipient', 'address_lower'),
+            ('origin', 'address_lower'),
+            ('value', 'str')
+        ]),
+    ('VestingFactory', 'VestingCreated'): dict(
+        collection='event_VestingFactory_VestingCreated',
+        fields=[
+            ('vesting', 'address_lower'),
+            ('holder', 'address_lower')
+        ]),
+    ('DelayMachine', 'PaymentCancel'): dict(
+        collection='event_DelayMachine_PaymentCancel',
+        omoc_operation='DelayMachine_PaymentCancel',
+        fields=PAYMENT_FIELDS),
+    ('DelayMachine', 'PaymentDeposit'): dict(
+        collection='event_DelayMachine_PaymentDeposit',
+        omoc_operation='DelayMachine_PaymentDeposit',
+        fields=PAYMENT_FIELDS + [
+            ('expiration', 'int')
+        ]),
+    ('DelayMachine', 'PaymentWithdraw'): dict(
+        collection='event_DelayMachine_PaymentWithdraw',
+        omoc_operation='DelayMachine_PaymentWithdraw',
+        fields=PAYMENT_FIELDS),
+    ('Supporters', 'AddStake'): dict(
+        collection='event_Supporters_AddStake',
+        omoc_operation='Supporters_AddStake',
+        fields=[
+            ('user', 'address_lower'),
+            ('subaccount', 'address_lower'),
+            ('sender', 'address_lower'),
+            ('amount', 'str'),
+            ('mocs', 'str')
+        ]),
+    ('Supporters', 'CancelEarnings'): dict(
+        collection='event_Supporters_CancelEarnings',
+        fields=EARNINGS_FIELDS),
+    ('Supporters', 'PayEarnings'): dict(
+        collection='event_Supporters_PayEarnings',
+        fields=EARNINGS_FIELDS),
+    ('Supporters', 'Withdraw'): dict(
+        collection='event_Supporters_Withdraw',
+        omoc_operation='Supporters_Withdraw',
+        fields=[
+            ('msgSender', 'address_lower'),
+            ('subaccount', 'address_lower'),
+            ('receiver', 'address_lower'),
+            ('mocs', 'str'),
+            ('blockNum', 'int', 'blockNumber')
+        ],
+        omoc_fields=[
+            ('msgSender', 'address_lower'),
+            ('subaccount', 'address_lower'),
+            ('receiver', 'address_lower'),
+            ('amount', 'str', 'mocs'),
+            ('mocs', 'str'),
+            ('blockNum', 'int', 'blockNumber')
+        ]),
+    ('Supporters', 'WithdrawStake'): dict(
+        collection='event_Supporters_WithdrawStake',
+        omoc_operation='Supporters_WithdrawStake',
+        fields=STAKE_FIELDS),
+    ('VotingMachine', 'VoteEvent'): dict(
+        collection='event_VotingMachine_VoteEvent',
+        fields=STAKE_FIELDS),
+}
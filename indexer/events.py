@@ -1,10 +1,22 @@
 import datetime
+import threading
 from collections import OrderedDict
 
 from eth_typing import HexStr
 from web3 import Web3
 
-from .logger import log
+from .logger import get_logger
+from .base.decoder import to_bytes
+from .base.address import address_lower, address_checksum
+from .account_operations import write_account_operations
+
+
+log = get_logger('events')
+
+
+# keccak of Transfer(address,address,uint256)
+TRANSFER_TOPIC = bytes(Web3.keccak(text='Transfer(address,address,uint256)'))
+ZERO_ADDRESS = '0x0000000000000000000000000000000000000000'
 
 
 def sanitize_address(address):
@@ -12,7 +24,23 @@ def sanitize_address(address):
     if address == "0x0000000000000000000000000000000000000000":
         return None
 
-    return Web3.to_checksum_address(address.replace("0x000000000000000000000000", "0x"))
+    return address_checksum(address.replace("0x000000000000000000000000", "0x"))
+
+
+def sanitize_address_lower(address):
+    """ Same as sanitize_address in lowercase """
+
+    address = sanitize_address(address)
+    if address is None:
+        return None
+
+    return address_lower(address)
+
+
+def address_index_map(addresses):
+    """ Position of each address in the list, instead of list.index() on every event """
+
+    return dict((address_checksum(address), i) for i, address in enumerate(addresses))
 
 
 def oper_id_to_int(oper_id):
@@ -36,6 +64,10 @@ class BaseEvent:
         self.filter_contracts_addresses = filter_contracts_addresses
         self.block_info = block_info
 
+        # position of the tokens in the config, by checksum address
+        self.tp_indexes = address_index_map(self.options['addresses']['TP'])
+        self.ca_indexes = address_index_map(self.options['addresses']['CA'])
+
     def parse_event(self, parsed_receipt, decoded_event):
         fields = dict()
         for field in decoded_event:
@@ -43,207 +75,165 @@ class BaseEvent:
 
         return dict(**parsed_receipt, **fields)
 
-
-class EventMocLiqTPRedeemed(BaseEvent):
-
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
-
-        parsed = self.parse_event(parsed_receipt, decoded_event)
-
-        # get collection
-        collection = self.connection_helper.mongo_collection('event_Moc_LiqTPRedeemed')
-
-        tx_hash = parsed['hash']
-        log_index = parsed['logIndex']
-        id_event = "{0}:{1}".format(tx_hash, log_index)
-
-        d_event = dict()
-        d_event["hash"] = tx_hash
-        d_event["id_event"] = id_event
-        d_event["blockNumber"] = int(parsed["blockNumber"])
-        d_event["tp_"] = sanitize_address(parsed["tp_"])
-        d_event['tpIndex_'] = self.options["addresses"]["TP"].index(d_event["tp_"])
-        d_event["sender_"] = sanitize_address(parsed["sender_"]).lower()
-        d_event["recipient_"] = sanitize_address(parsed["recipient_"]).lower()
-        d_event["qTP_"] = parsed["qTP_"]
-        d_event["qAC_"] = parsed["qAC_"]
-        d_event["createdAt"] = parsed["createdAt"]
-        d_event["lastUpdatedAt"] = datetime.datetime.now()
-
-        # remove old document with only hash as id and replace with id_event as unique id
-        remove_query = {"hash": d_event["hash"], "id_event": {"$exists": False}}
-        if collection.find(remove_query):
-            collection.delete_many(remove_query)
-
-        collection.find_one_and_update(
-            {"id_event": d_event["id_event"]},
-            {"$set": d_event},
-            upsert=True)
-
-        log.info("Event :: Moc_LiqTPRedeemed :: {0}".format(d_event["id_event"]))
-        log.info(d_event)
-
-        return d_event, parsed
-
-
-class EventMocSuccessFeeDistributed(BaseEvent):
-
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
-
-        parsed = self.parse_event(parsed_receipt, decoded_event)
-
-        # get collection SuccessFeeDistributed
-        collection = self.connection_helper.mongo_collection('event_Moc_SuccessFeeDistributed')
-
-        tx_hash = parsed['hash']
-        log_index = parsed['logIndex']
-        id_event = "{0}:{1}".format(tx_hash, log_index)
-
-        d_event = dict()
-        d_event["hash"] = tx_hash
-        d_event["id_event"] = id_event
-        d_event["blockNumber"] = int(parsed["blockNumber"])
-        d_event["mocGain_"] = str(parsed["mocGain_"])
-        d_event["tpGain_"] = str(parsed["tpGain_"])
-        d_event["createdAt"] = parsed["createdAt"]
-        d_event["lastUpdatedAt"] = datetime.datetime.now()
+    @staticmethod
+    def write_event(uow, collection_name, d_event):
+        """ Register the upsert of the event by id_event """
 
         # remove old document with only hash as id and replace with id_event as unique id
-        remove_query = {"hash": d_event["hash"], "id_event": {"$exists": False}}
-        if collection.find(remove_query):
-            collection.delete_many(remove_query)
+        if uow.legacy_cleanup:
+            uow.delete_many(collection_name, {"hash": d_event["hash"], "id_event": {"$exists": False}})
+        uow.update_one(collection_name,
+                       {"id_event": d_event["id_event"]},
+                       {"$set": d_event},
+                       upsert=True)
 
-        collection.find_one_and_update(
-            {"id_event": d_event["id_event"]},
-            {"$set": d_event},
-            upsert=True)
+    @staticmethod
+    def write_operation(uow, d_oper):
+        """ Register the upsert of the operation by operId_ """
 
-        log.info("Event :: Success Fee Distributed :: {0}".format(d_event["id_event"]))
-        log.info(d_event)
+        uow.upsert_operation(d_oper)
 
-        return d_event, parsed
 
+class SchemaEvent(BaseEvent):
+    """ Handler of an event described in EVENT_SCHEMAS (event_schemas.py)
 
-class EventMocSettlementExecuted(BaseEvent):
-
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
-
-        parsed = self.parse_event(parsed_receipt, decoded_event)
-
-        # get collection
-        collection = self.connection_helper.mongo_collection('event_Moc_SettlementExecuted')
+    The fields of the schema are compiled once to converter functions, handling
+    an event is building the documents with them and the shared write logic.
+    """
 
-        tx_hash = parsed['hash']
-        log_index = parsed['logIndex']
-        id_event = "{0}:{1}".format(tx_hash, log_index)
+    def __init__(self, options, connection_helper, contracts_loaded, filter_contracts_addresses, block_info, schema):
 
-        d_event = dict()
-        d_event["hash"] = tx_hash
-        d_event["id_event"] = id_event
-        d_event["blockNumber"] = int(parsed["blockNumber"])
-        d_event["createdAt"] = parsed["createdAt"]
-        d_event["lastUpdatedAt"] = datetime.datetime.now()
+        super().__init__(options, connection_helper, contracts_loaded, filter_contracts_addresses, block_info)
 
-        # remove old document with only hash as id and replace with id_event as unique id
-        remove_query = {"hash": d_event["hash"], "id_event": {"$exists": False}}
-        if collection.find(remove_query):
-            collection.delete_many(remove_query)
+        self.collection_name = schema['collection']
+        self.label = self.collection_name.replace('event_', '', 1)
+        self.operation = schema.get('operation')
+        self.omoc_operation = schema.get('omoc_operation')
+
+        converters = {
+            'int': int,
+            'str': str,
+            'raw': lambda value: value,
+            'address': sanitize_address,
+            'address_lower': sanitize_address_lower,
+            'oper_id': oper_id_to_int,
+            'tp_index': lambda value: self.tp_indexes[sanitize_address(value)],
+            'ca_index': lambda value: self.ca_indexes[sanitize_address(value)]
+        }
+        self.fields = self.compile_fields(schema['fields'], converters)
+        self.omoc_fields = self.compile_fields(schema.get('omoc_fields', schema['fields']), converters)
+
+    @staticmethod
+    def compile_field(converter, source):
+
+        if isinstance(source, tuple):
+            # alternative names, the first present
+            def get_field(parsed):
+                for name in source:
+                    if name in parsed:
+                        return converter(parsed[name])
+                raise KeyError(source[0])
+            return get_field
+
+        return lambda parsed: converter(parsed[source])
+
+    def compile_fields(self, fields, converters):
+        """ (document field, function from the parsed event) of each field of the schema """
+
+        compiled = list()
+        for field in fields:
+            name, converter = field[0], field[1]
+            source = field[2] if len(field) > 2 else name
+            compiled.append((name, self.compile_field(converters[converter], source)))
+
+        return tuple(compiled)
+
+    def executed_operation(self, parsed, d_event):
+        """ Operation executed by the queue """
 
-        collection.find_one_and_update(
-            {"id_event": d_event["id_event"]},
-            {"$set": d_event},
-            upsert=True)
+        d_oper = OrderedDict()
+        d_oper["blockNumber"] = d_event["blockNumber"]
+        # to check the block is still in the chain before confirming
+        d_oper["blockHash"] = parsed.get("blockHash")
+        d_oper["hash"] = d_event["hash"]
+        d_oper["id_event"] = d_event["id_event"]
+        d_oper["operId_"] = d_event["operId_"]
+        d_oper["executed"] = d_event
+        d_oper["operation"] = self.operation
+        d_oper["gas"] = parsed['gas']
+        d_oper["gasPrice"] = str(parsed['gasPrice'])
+        d_oper["gasUsed"] = int(parsed['gasUsed'])
+        gas_fee = parsed['gasUsed'] * Web3.from_wei(int(parsed["gasPrice"]), 'ether')
+        d_oper["gasFeeRBTC"] = str(int(gas_fee * self.precision))
+        d_oper["status"] = 1  # Executed
+        d_oper["createdAt"] = parsed["createdAt"]
+        d_oper["lastUpdatedAt"] = datetime.datetime.now()
+        d_oper["confirmationTime"] = None
+        d_oper["last_block_indexed"] = d_event["blockNumber"]
 
-        log.info("Event :: Settlement Executed :: {0}".format(d_event["id_event"]))
-        log.info(d_event)
+        return d_oper
 
-        return d_event, parsed
+    def omoc_operation_doc(self, parsed, d_event):
 
+        d_oper = OrderedDict()
+        d_oper["hash"] = d_event["hash"]
+        d_oper["id_event"] = d_event["id_event"]
+        d_oper["blockNumber"] = d_event["blockNumber"]
+        d_oper["operation"] = self.omoc_operation
+        for name, get_field in self.omoc_fields:
+            d_oper[name] = get_field(parsed)
+        d_oper["createdAt"] = parsed["createdAt"]
+        d_oper["lastUpdatedAt"] = datetime.datetime.now()
+        d_oper["last_block_indexed"] = d_event["blockNumber"]
 
-class EventMocTCInterestPayment(BaseEvent):
+        return d_oper
 
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
+    def parse_event_and_save(self, parsed_receipt, decoded_event, uow):
 
         parsed = self.parse_event(parsed_receipt, decoded_event)
 
-        # get collection
-        collection = self.connection_helper.mongo_collection('event_Moc_TCInterestPayment')
-
         tx_hash = parsed['hash']
         log_index = parsed['logIndex']
-        id_event = "{0}:{1}".format(tx_hash, log_index)
 
-        d_event = dict()
+        d_event = OrderedDict()
         d_event["hash"] = tx_hash
-        d_event["id_event"] = id_event
+        d_event["id_event"] = "{0}:{1}".format(tx_hash, log_index)
         d_event["blockNumber"] = int(parsed["blockNumber"])
-        d_event["interestAmount_"] = str(parsed["interestAmount_"])
+        for name, get_field in self.fields:
+            d_event[name] = get_field(parsed)
         d_event["createdAt"] = parsed["createdAt"]
         d_event["lastUpdatedAt"] = datetime.datetime.now()
 
-        # remove old document with only hash as id and replace with id_event as unique id
-        remove_query = {"hash": d_event["hash"], "id_event": {"$exists": False}}
-        if collection.find(remove_query):
-            collection.delete_many(remove_query)
-
-        collection.find_one_and_update(
-            {"id_event": d_event["id_event"]},
-            {"$set": d_event},
-            upsert=True)
-
-        log.info("Event :: TC Interest Payment :: {0} ".format(d_event["id_event"]))
-        log.info(d_event)
-
-        return d_event, parsed
-
+        self.write_event(uow, self.collection_name, d_event)
 
-class EventMocTPemaUpdated(BaseEvent):
+        log.info("Event :: %s :: %s", self.label, d_event["id_event"])
+        log.debug("%s", d_event)
 
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
+        if self.operation:
+            d_oper = self.executed_operation(parsed, d_event)
+            self.write_operation(uow, d_oper)
+            write_account_operations(uow, d_oper, [d_event.get("sender_"), d_event.get("recipient_")], replace=True)
 
-        parsed = self.parse_event(parsed_receipt, decoded_event)
-
-        # get collection
-        collection = self.connection_helper.mongo_collection('event_Moc_TPemaUpdated')
-
-        tx_hash = parsed['hash']
-        log_index = parsed['logIndex']
-        id_event = "{0}:{1}".format(tx_hash, log_index)
-
-        d_event = dict()
-        d_event["hash"] = tx_hash
-        d_event["id_event"] = id_event
-        d_event["blockNumber"] = int(parsed["blockNumber"])
-        d_event["i_"] = oper_id_to_int(parsed["i_"])
-        d_event["oldTPema_"] = str(parsed["oldTPema_"])
-        d_event["newTPema_"] = str(parsed["newTPema_"])
-        d_event["createdAt"] = parsed["createdAt"]
-        d_event["lastUpdatedAt"] = datetime.datetime.now()
-
-        # remove old document with only hash as id and replace with id_event as unique id
-        remove_query = {"hash": d_event["hash"], "id_event": {"$exists": False}}
-        if collection.find(remove_query):
-            collection.delete_many(remove_query)
+            log.info("Event MocQueue %s :: operId_: %s", d_oper["operation"], d_oper["operId_"])
 
-        collection.find_one_and_update(
-            {"id_event": d_event["id_event"]},
-            {"$set": d_event},
-            upsert=True)
+        if self.omoc_operation:
+            d_oper = self.omoc_operation_doc(parsed, d_event)
+            uow.update_one('omoc_operations',
+                           {"id_event": d_oper["id_event"]},
+                           {"$set": d_oper},
+                           upsert=True)
 
-        log.info("Event :: TP Ema Updated :: {0}".format(d_event["id_event"]))
-        log.info(d_event)
-
-        return d_event, parsed
+        return d_event
 
 
 class EventMocQueueOperationError(BaseEvent):
 
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
+    def parse_event_and_save(self, parsed_receipt, decoded_event, uow):
 
         parsed = self.parse_event(parsed_receipt, decoded_event)
 
         # get collection OperationQueueStatus
-        collection = self.connection_helper.mongo_collection('event_MocQueue_OperationError')
+        collection_name = 'event_MocQueue_OperationError'
 
         tx_hash = parsed['hash']
         log_index = parsed['logIndex']
@@ -282,22 +272,12 @@ class EventMocQueueOperationError(BaseEvent):
         d_event["createdAt"] = parsed["createdAt"]
         d_event["lastUpdatedAt"] = datetime.datetime.now()
 
-        # remove old document with only hash as id and replace with id_event as unique id
-        remove_query = {"hash": d_event["hash"], "id_event": {"$exists": False}}
-        if collection.find(remove_query):
-            collection.delete_many(remove_query)
-
-        collection.find_one_and_update(
-            {"id_event": d_event["id_event"]},
-            {"$set": d_event},
-            upsert=True)
+        self.write_event(uow, collection_name, d_event)
 
-        log.info("Event :: OperationError :: operId_: {0}".format(d_event["operId_"]))
-        log.info(d_event)
+        log.info("Event :: OperationError :: operId_: %s", d_event["operId_"])
+        log.debug("%s", d_event)
 
         # change status in collection operations
-        collection = self.connection_helper.mongo_collection('operations')
-
         d_oper = OrderedDict()
         d_oper["blockNumber"] = int(parsed["blockNumber"])
         d_oper["hash"] = tx_hash
@@ -324,28 +304,19 @@ class EventMocQueueOperationError(BaseEvent):
             log.warning("Event :: OperationError :: operId_: {0} Skipping... Fluxcapacitor limitation not failing".format(d_event["operId_"]))
             d_oper["status"] = 0
 
-        operation = collection.find_one({"operId_": d_oper["operId_"]})
-        if operation:
-            if operation['status'] >= 1:
-                # if executed don't update
-                log.warning("Event :: OperationError :: operId_: {0} Skipping writting to database is already in status 1".format(d_event["operId_"]))
-                return d_oper, parsed
-
-        collection.find_one_and_update(
-            {"operId_": d_oper["operId_"]},
-            {"$set": d_oper},
-            upsert=True)
+        # not written if the operation is already executed (status >= 1), checked by the database
+        self.write_operation(uow, d_oper)
 
         return d_oper, parsed
 
 
 class EventMocQueueUnhandledError(BaseEvent):
 
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
+    def parse_event_and_save(self, parsed_receipt, decoded_event, uow):
         parsed = self.parse_event(parsed_receipt, decoded_event)
 
         # get collection
-        collection = self.connection_helper.mongo_collection('event_MocQueue_UnhandledError')
+        collection_name = 'event_MocQueue_UnhandledError'
 
         tx_hash = parsed['hash']
         log_index = parsed['logIndex']
@@ -369,22 +340,12 @@ class EventMocQueueUnhandledError(BaseEvent):
         d_event["createdAt"] = parsed["createdAt"]
         d_event["lastUpdatedAt"] = datetime.datetime.now()
 
-        # remove old document with only hash as id and replace with id_event as unique id
-        remove_query = {"hash": d_event["hash"], "id_event": {"$exists": False}}
-        if collection.find(remove_query):
-            collection.delete_many(remove_query)
-
-        collection.find_one_and_update(
-            {"id_event": d_event["id_event"]},
-            {"$set": d_event},
-            upsert=True)
+        self.write_event(uow, collection_name, d_event)
 
-        log.info("Event :: MocQueue_UnhandledError :: operId_: {0}".format(d_event["operId_"]))
-        log.info(d_event)
+        log.info("Event :: MocQueue_UnhandledError :: operId_: %s", d_event["operId_"])
+        log.debug("%s", d_event)
 
         # change status in collection operations
-        collection = self.connection_helper.mongo_collection('operations')
-
         d_oper = OrderedDict()
         d_oper["blockNumber"] = int(parsed["blockNumber"])
         d_oper["hash"] = tx_hash
@@ -402,107 +363,123 @@ class EventMocQueueUnhandledError(BaseEvent):
         d_oper["confirmationTime"] = None
         d_oper["last_block_indexed"] = int(parsed["blockNumber"])
 
-        operation = collection.find_one({"operId_": d_oper["operId_"]})
-        if operation:
-            if operation['status'] >= 1:
-                # if executed don't update
-                log.warning("Event :: MocQueue_UnhandledError :: Skipping writting to database is already in status 1")
-                return d_oper, parsed
-
-        collection.find_one_and_update(
-            {"operId_": d_oper["operId_"]},
-            {"$set": d_oper},
-            upsert=True)
+        # not written if the operation is already executed (status >= 1), checked by the database
+        self.write_operation(uow, d_oper)
 
         return d_oper, parsed
 
 
 class EventMocQueueOperationQueued(BaseEvent):
 
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
-        parsed = self.parse_event(parsed_receipt, decoded_event)
-
-        # get collection
-        collection = self.connection_helper.mongo_collection('event_MocQueue_OperationQueued')
-
-        tx_hash = parsed['hash']
-        log_index = parsed['logIndex']
-        id_event = "{0}:{1}".format(tx_hash, log_index)
-
-        # STATUS:
-        # -4 Revert
-        # -3 Stale Transaction
-        # -2 Error Unhandled
-        # -1 Error
-        #  0 Queue
-        #  1 Executed
-        #  2 Confirmed > 10 blocks
-
-        # Operation Type:
-        #
-        # 0 none
-        # 1 mintTC
-        # 2 redeemTC
-        # 3 mintTP
-        # 4 redeemTP
-        # 5 mintTCandTP
-        # 6 redeemTCandTP
-        # 7 swapTCforTP
-        # 8 swapTPforTC
-        # 9 swapTPforTP
-
-        d_event = dict()
-        d_event["hash"] = tx_hash
-        d_event["id_event"] = id_event
-        d_event["blockNumber"] = int(parsed["blockNumber"])
-        d_event["operId_"] = oper_id_to_int(parsed["operId_"])
-        d_event["bucket_"] = sanitize_address(parsed["bucket_"])
-        d_event["operType_"] = int(parsed["operType_"])
-        d_event["createdAt"] = parsed["createdAt"]
-        d_event["lastUpdatedAt"] = datetime.datetime.now()
-
-        # remove old document with only hash as id and replace with id_event as unique id
-        remove_query = {"hash": d_event["hash"], "id_event": {"$exists": False}}
-        if collection.find(remove_query):
-            collection.delete_many(remove_query)
+    # operation name and MocQueue getter of the params by operation type
+    operations_functions = {
+        1: ('TCMint', 'operationsMintTC'),
+        2: ('TCRedeem', 'operationsRedeemTC'),
+        3: ('TPMint', 'operationsMintTP'),
+        4: ('TPRedeem', 'operationsRedeemTP'),
+        5: ('TCandTPMint', 'operationsMintTCandTP'),
+        6: ('TCandTPRedeem', 'operationsRedeemTCandTP'),
+        7: ('TCSwapForTP', 'operationsSwapTCforTP'),
+        8: ('TPSwapForTC', 'operationsSwapTPforTC'),
+        9: ('TPSwapForTP', 'operationsSwapTPforTP')
+    }
 
-        collection.find_one_and_update(
-            {"id_event": d_event["id_event"]},
-            {"$set": d_event},
-            upsert=True)
+    def __init__(self, options, connection_helper, contracts_loaded, filter_contracts_addresses, block_info):
 
-        log.info("Event :: MocQueue_OperationQueued :: operId_: {0}".format(d_event["operId_"]))
-        log.info(d_event)
+        super().__init__(options, connection_helper, contracts_loaded, filter_contracts_addresses, block_info)
 
-        # write to collection operations as queue operation
-        collection = self.connection_helper.mongo_collection('operations')
+        # params by operId_ got with multicall
+        self.params_cache = OrderedDict()
+        self.params_cache_size = self.options['scan_logs'].get('params_cache_size', 10000)
+        self.params_cache_lock = threading.Lock()
+        self.multicall_size = self.options['scan_logs'].get('multicall_size', 100)
+
+        # params got later by the enrichment task
+        self.enrich_deferred = 'enrich_operations' in self.options['tasks']
+
+    def cache_params(self, oper_id, raw_params):
+
+        with self.params_cache_lock:
+            self.params_cache[oper_id] = raw_params
+            self.params_cache.move_to_end(oper_id)
+            while len(self.params_cache) > self.params_cache_size:
+                self.params_cache.popitem(last=False)
+
+    def queued_operation(self, parsed_receipt, decoded_event):
+        """ (operId_, operType_, blockNumber) of the event """
+
+        parsed = self.parse_event(parsed_receipt, decoded_event)
+        return oper_id_to_int(parsed["operId_"]), int(parsed["operType_"]), int(parsed["blockNumber"])
+
+    def prefetch_params(self, queued_operations):
+        """ Get the params of the queued operations with multicall, one call per block
+
+        queued_operations: list of (operId_, operType_, blockNumber). The params are read
+        at the block the operation was queued, after the execution they are empty.
+        """
+
+        if 'Multicall2' not in self.contracts_loaded:
+            return
+
+        d_blocks = OrderedDict()
+        for oper_id, oper_type, block_number in queued_operations:
+            if oper_type not in self.operations_functions or oper_id in self.params_cache:
+                continue
+            d_blocks.setdefault(block_number, list()).append((oper_id, oper_type))
+
+        mocqueue = self.contracts_loaded["MocQueue"]
+        for block_number, operations in d_blocks.items():
+            for i in range(0, len(operations), self.multicall_size):
+                chunk = operations[i:i + self.multicall_size]
+                call_list = [(mocqueue.address(),
+                              getattr(mocqueue.sc.functions, self.operations_functions[oper_type][1]),
+                              [oper_id],
+                              None) for oper_id, oper_type in chunk]
+                try:
+                    _, results, d_validity = self.contracts_loaded["Multicall2"].aggregate_multiple(
+                        call_list,
+                        block_identifier=block_number)
+                except Exception as e:
+                    # not cached, they are going to be get one by one
+                    log.error("Event :: MocQueue_OperationQueued :: Multicall error block: {0} {1}".format(
+                        block_number, e))
+                    continue
+
+                for (oper_id, _), raw_params, valid in zip(chunk, results, d_validity['results']):
+                    if valid:
+                        self.cache_params(oper_id, raw_params)
+
+    def operation_params(self, oper_id, oper_type, block_number):
+        """ Params of the operation from the multicall cache or from MocQueue """
+
+        with self.params_cache_lock:
+            raw_params = self.params_cache.get(oper_id)
+        if raw_params is not None:
+            return raw_params
+
+        fn = getattr(self.contracts_loaded["MocQueue"].sc.functions, self.operations_functions[oper_type][1])
+        return fn(oper_id).call(block_identifier=block_number)
+
+    def parse_params(self, oper_type, raw_params):
+        """ Params of the operation from the MocQueue getter result """
 
-        # getting the information from the MoCQueue, but take in consideration that
-        # after the execution of the queue this is information is no longer available
-        operation = None
         d_params = dict()
-        if d_event["operType_"] == 1:
-            operation = 'TCMint'
-            raw_params = self.contracts_loaded["MocQueue"].sc.functions.operationsMintTC(d_event["operId_"]).call()
+        if oper_type == 1:
             d_params['qTC'] = str(raw_params[0])
             d_params['qACmax'] = str(raw_params[1])
             d_params['sender'] = sanitize_address(raw_params[2])
             d_params['recipient'] = sanitize_address(raw_params[3])
             d_params['vendor'] = sanitize_address(raw_params[4])
-        elif d_event["operType_"] == 2:
-            operation = 'TCRedeem'
-            raw_params = self.contracts_loaded["MocQueue"].sc.functions.operationsRedeemTC(d_event["operId_"]).call()
+        elif oper_type == 2:
             d_params['qTC'] = str(raw_params[0])
             d_params['qACmin'] = str(raw_params[1])
             d_params['sender'] = sanitize_address(raw_params[2])
             d_params['recipient'] = sanitize_address(raw_params[3])
             d_params['vendor'] = sanitize_address(raw_params[4])
-        elif d_event["operType_"] == 3:
-            operation = 'TPMint'
-            raw_params = self.contracts_loaded["MocQueue"].sc.functions.operationsMintTP(d_event["operId_"]).call()
+        elif oper_type == 3:
             d_params['tp'] = sanitize_address(raw_params[0])
             if d_params['tp']:
-                d_params['tpIndex'] = self.options["addresses"]["TP"].index(d_params['tp'])
+                d_params['tpIndex'] = self.tp_indexes[d_params['tp']]
             else:
                 # by default the first one
                 d_params['tpIndex'] = 0
@@ -511,12 +488,10 @@ class EventMocQueueOperationQueued(BaseEvent):
             d_params['sender'] = sanitize_address(raw_params[3])
             d_params['recipient'] = sanitize_address(raw_params[4])
             d_params['vendor'] = sanitize_address(raw_params[5])
-        elif d_event["operType_"] == 4:
-            operation = 'TPRedeem'
-            raw_params = self.contracts_loaded["MocQueue"].sc.functions.operationsRedeemTP(d_event["operId_"]).call()
+        elif oper_type == 4:
             d_params['tp'] = sanitize_address(raw_params[0])
             if d_params['tp']:
-                d_params['tpIndex'] = self.options["addresses"]["TP"].index(d_params['tp'])
+                d_params['tpIndex'] = self.tp_indexes[d_params['tp']]
             else:
                 # by default the first one
                 d_params['tpIndex'] = 0
@@ -525,12 +500,10 @@ class EventMocQueueOperationQueued(BaseEvent):
             d_params['sender'] = sanitize_address(raw_params[3])
             d_params['recipient'] = sanitize_address(raw_params[4])
             d_params['vendor'] = sanitize_address(raw_params[5])
-        elif d_event["operType_"] == 5:
-            operation = 'TCandTPMint'
-            raw_params = self.contracts_loaded["MocQueue"].sc.functions.operationsMintTCandTP(d_event["operId_"]).call()
+        elif oper_type == 5:
             d_params['tp'] = sanitize_address(raw_params[0])
             if d_params['tp']:
-                d_params['tpIndex'] = self.options["addresses"]["TP"].index(d_params['tp'])
+                d_params['tpIndex'] = self.tp_indexes[d_params['tp']]
             else:
                 # by default the first one
                 d_params['tpIndex'] = 0
@@ -539,12 +512,10 @@ class EventMocQueueOperationQueued(BaseEvent):
             d_params['sender'] = sanitize_address(raw_params[3])
             d_params['recipient'] = sanitize_address(raw_params[4])
             d_params['vendor'] = sanitize_address(raw_params[5])
-        elif d_event["operType_"] == 6:
-            operation = 'TCandTPRedeem'
-            raw_params = self.contracts_loaded["MocQueue"].sc.functions.operationsRedeemTCandTP(d_event["operId_"]).call()
+        elif oper_type == 6:
             d_params['tp'] = sanitize_address(raw_params[0])
             if d_params['tp']:
-                d_params['tpIndex'] = self.options["addresses"]["TP"].index(d_params['tp'])
+                d_params['tpIndex'] = self.tp_indexes[d_params['tp']]
             else:
                 # by default the first one
                 d_params['tpIndex'] = 0
@@ -554,12 +525,10 @@ class EventMocQueueOperationQueued(BaseEvent):
             d_params['sender'] = sanitize_address(raw_params[4])
             d_params['recipient'] = sanitize_address(raw_params[5])
             d_params['vendor'] = sanitize_address(raw_params[6])
-        elif d_event["operType_"] == 7:
-            operation = 'TCSwapForTP'
-            raw_params = self.contracts_loaded["MocQueue"].sc.functions.operationsSwapTCforTP(d_event["operId_"]).call()
+        elif oper_type == 7:
             d_params['tp'] = sanitize_address(raw_params[0])
             if d_params['tp']:
-                d_params['tpIndex'] = self.options["addresses"]["TP"].index(d_params['tp'])
+                d_params['tpIndex'] = self.tp_indexes[d_params['tp']]
             else:
                 # by default the first one
                 d_params['tpIndex'] = 0
@@ -569,12 +538,10 @@ class EventMocQueueOperationQueued(BaseEvent):
             d_params['sender'] = sanitize_address(raw_params[4])
             d_params['recipient'] = sanitize_address(raw_params[5])
             d_params['vendor'] = sanitize_address(raw_params[6])
-        elif d_event["operType_"] == 8:
-            operation = 'TPSwapForTC'
-            raw_params = self.contracts_loaded["MocQueue"].sc.functions.operationsSwapTPforTC(d_event["operId_"]).call()
+        elif oper_type == 8:
             d_params['tp'] = sanitize_address(raw_params[0])
             if d_params['tp']:
-                d_params['tpIndex'] = self.options["addresses"]["TP"].index(d_params['tp'])
+                d_params['tpIndex'] = self.tp_indexes[d_params['tp']]
             else:
                 # by default the first one
                 d_params['tpIndex'] = 0
@@ -584,17 +551,15 @@ class EventMocQueueOperationQueued(BaseEvent):
             d_params['sender'] = sanitize_address(raw_params[4])
             d_params['recipient'] = sanitize_address(raw_params[5])
             d_params['vendor'] = sanitize_address(raw_params[6])
-        elif d_event["operType_"] == 9:
-            operation = 'TPSwapForTP'
-            raw_params = self.contracts_loaded["MocQueue"].sc.functions.operationsSwapTPforTP(d_event["operId_"]).call()
+        elif oper_type == 9:
             d_params['tpFrom'] = sanitize_address(raw_params[0])
             if d_params['tpFrom']:
-                d_params['tpFromIndex'] = self.options["addresses"]["TP"].index(d_params['tpFrom'])
+                d_params['tpFromIndex'] = self.tp_indexes[d_params['tpFrom']]
             else:
                 d_params['tpFromIndex'] = 0
             d_params['tpTo'] = sanitize_address(raw_params[1])
             if d_params['tpTo']:
-                d_params['tpToIndex'] = self.options["addresses"]["TP"].index(d_params['tpTo'])
+                d_params['tpToIndex'] = self.tp_indexes[d_params['tpTo']]
             else:
                 d_params['tpToIndex'] = 0
             d_params['qTP'] = str(raw_params[2])
@@ -604,6 +569,75 @@ class EventMocQueueOperationQueued(BaseEvent):
             d_params['recipient'] = sanitize_address(raw_params[6])
             d_params['vendor'] = sanitize_address(raw_params[7])
 
+        return d_params
+
+    def parse_event_and_save(self, parsed_receipt, decoded_event, uow):
+        parsed = self.parse_event(parsed_receipt, decoded_event)
+
+        # get collection
+        collection_name = 'event_MocQueue_OperationQueued'
+
+        tx_hash = parsed['hash']
+        log_index = parsed['logIndex']
+        id_event = "{0}:{1}".format(tx_hash, log_index)
+
+        # STATUS:
+        # -4 Revert
+        # -3 Stale Transaction
+        # -2 Error Unhandled
+        # -1 Error
+        #  0 Queue
+        #  1 Executed
+        #  2 Confirmed > 10 blocks
+
+        # Operation Type:
+        #
+        # 0 none
+        # 1 mintTC
+        # 2 redeemTC
+        # 3 mintTP
+        # 4 redeemTP
+        # 5 mintTCandTP
+        # 6 redeemTCandTP
+        # 7 swapTCforTP
+        # 8 swapTPforTC
+        # 9 swapTPforTP
+
+        d_event = dict()
+        d_event["hash"] = tx_hash
+        d_event["id_event"] = id_event
+        d_event["blockNumber"] = int(parsed["blockNumber"])
+        d_event["operId_"] = oper_id_to_int(parsed["operId_"])
+        d_event["bucket_"] = sanitize_address(parsed["bucket_"])
+        d_event["operType_"] = int(parsed["operType_"])
+        d_event["createdAt"] = parsed["createdAt"]
+        d_event["lastUpdatedAt"] = datetime.datetime.now()
+
+        self.write_event(uow, collection_name, d_event)
+
+        log.info("Event :: MocQueue_OperationQueued :: operId_: %s", d_event["operId_"])
+        log.debug("%s", d_event)
+
+        # write to collection operations as queue operation
+        # getting the information from the MoCQueue, but take in consideration that
+        # after the execution of the queue this is information is no longer available
+        operation = None
+        d_params = dict()
+        if d_event["operType_"] in self.operations_functions:
+            operation, _ = self.operations_functions[d_event["operType_"]]
+            if self.enrich_deferred:
+                # params filled later by the enrichment task, out of the hot path
+                uow.update_one('operations_enrichment',
+                               {"operId_": d_event["operId_"]},
+                               {"$setOnInsert": {"operId_": d_event["operId_"],
+                                                 "operType_": d_event["operType_"],
+                                                 "blockNumber": d_event["blockNumber"],
+                                                 "createdAt": datetime.datetime.now()}},
+                               upsert=True)
+            else:
+                raw_params = self.operation_params(d_event["operId_"], d_event["operType_"], d_event["blockNumber"])
+                d_params = self.parse_params(d_event["operType_"], raw_params)
+
         d_oper = OrderedDict()
         d_oper["blockNumber"] = int(parsed["blockNumber"])
         d_oper["hash"] = tx_hash
@@ -626,1516 +660,182 @@ class EventMocQueueOperationQueued(BaseEvent):
         d_oper["confirmationTime"] = None
         d_oper["last_block_indexed"] = int(parsed["blockNumber"])
 
-        operation = collection.find_one({"operId_": d_oper["operId_"]})
-        if operation:
-            if operation['status'] >= 1:
-                # if executed don't update
-                log.warning("Event :: MocQueue_OperationQueued :: Skipping writting to database is already in status 1")
-                return d_oper, parsed
-
-        collection.find_one_and_update(
-            {"operId_": d_oper["operId_"]},
-            {"$set": d_oper},
-            upsert=True)
+        # not written if the operation is already executed (status >= 1), checked by the database
+        self.write_operation(uow, d_oper)
+        write_account_operations(uow, d_oper, [d_params.get('sender'), d_params.get('recipient')])
 
         return d_oper, parsed
 
 
-class EventMocQueueOperationExecuted(BaseEvent):
+class EventTokenTransfer(BaseEvent):
 
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
+    def __init__(self, options, connection_helper, contracts_loaded, filter_contracts_addresses, block_info, token_involved):
 
-        parsed = self.parse_event(parsed_receipt, decoded_event)
+        self.options = options
+        self.connection_helper = connection_helper
+        self.contracts_loaded = contracts_loaded
+        self.filter_contracts_addresses = filter_contracts_addresses
+        self.block_info = block_info
+        self.token_involved = token_involved
 
-        # get collection OperationQueueStatus
-        collection = self.connection_helper.mongo_collection('event_MocQueue_OperationExecuted')
+        super().__init__(options, connection_helper, contracts_loaded, filter_contracts_addresses, block_info)
 
-        tx_hash = parsed['hash']
-        log_index = parsed['logIndex']
-        id_event = "{0}:{1}".format(tx_hash, log_index)
+        # transfers from / to these addresses are not indexed
+        self.address_not_allowed = frozenset(
+            [ZERO_ADDRESS] + [address_lower(address) for address in self.filter_contracts_addresses])
 
-        # STATUS:
-        # -4 Revert
-        # -3 Stale Transaction
-        # -2 Error Unhandled
-        # -1 Error
-        #  0 Queue
-        #  1 Executed
-        #  2 Confirmed > 10 blocks
+    # def parse_event(self, parsed_receipt, decoded_event):
+    #
+    #     # decode event to support write in mongo
+    #     parsed_receipt['from'] = decoded_event['from'].lower()
+    #     parsed_receipt['to'] = decoded_event['to'].lower()
+    #     parsed_receipt['value'] = str(decoded_event['value'])
+    #
+    #     return parsed_receipt
 
-        d_event = dict()
-        d_event["hash"] = tx_hash
-        d_event["id_event"] = id_event
-        d_event["blockNumber"] = int(parsed["blockNumber"])
-        d_event["operId_"] = oper_id_to_int(parsed["operId_"]) #int(parsed["operId_"].split('0x')[1])
-        d_event["executor"] = sanitize_address(parsed["executor"])
-        d_event["createdAt"] = parsed["createdAt"]
-        d_event["lastUpdatedAt"] = datetime.datetime.now()
+    @staticmethod
+    def is_transfer_log(tx_log):
+        """ ERC20 Transfer with from and to indexed """
 
-        # remove old document with only hash as id and replace with id_event as unique id
-        remove_query = {"hash": d_event["hash"], "id_event": {"$exists": False}}
-        if collection.find(remove_query):
-            collection.delete_many(remove_query)
+        topics = tx_log['topics']
+        return len(topics) == 3 and to_bytes(topics[0]) == TRANSFER_TOPIC
 
-        collection.find_one_and_update(
-            {"id_event": d_event["id_event"]},
-            {"$set": d_event},
-            upsert=True)
+    def parse_log_and_save(self, parsed_receipt, tx_log, uow):
+        """ Fast path, from / to / value sliced from the raw log without the generic decoding """
 
-        log.info("Event :: MocQueue_OperationExecuted :: operId_: {0}".format(d_event["operId_"]))
-        log.info(d_event)
-
-        return d_event, parsed
-
-
-class EventMocQueueTCMinted(BaseEvent):
-
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
-
-        parsed = self.parse_event(parsed_receipt, decoded_event)
-
-        # get collection
-        collection = self.connection_helper.mongo_collection('event_MocQueue_TCMinted')
-
-        tx_hash = parsed['hash']
-        log_index = parsed['logIndex']
-        id_event = "{0}:{1}".format(tx_hash, log_index)
-
-        d_event = OrderedDict()
-        d_event["blockNumber"] = int(parsed["blockNumber"])
-        d_event["hash"] = tx_hash
-        d_event["id_event"] = id_event
-        d_event["sender_"] = sanitize_address(parsed["sender_"])
-        d_event["recipient_"] = sanitize_address(parsed["recipient_"])
-        d_event["qTC_"] = str(parsed["qTC_"])
-        d_event["qAC_"] = str(parsed["qAC_"])
-        d_event["qACfee_"] = str(parsed["qACfee_"])
-        d_event["qFeeToken_"] = str(parsed["qFeeToken_"])
-        d_event["qACVendorMarkup_"] = str(parsed["qACVendorMarkup_"])
-        d_event["qFeeTokenVendorMarkup_"] = str(parsed["qFeeTokenVendorMarkup_"])
-        d_event["vendor_"] = sanitize_address(parsed["vendor_"])
-        d_event["operId_"] = oper_id_to_int(parsed["operId_"])
-        d_event["createdAt"] = parsed["createdAt"]
-        d_event["lastUpdatedAt"] = datetime.datetime.now()
-
-        # remove old document with only hash as id and replace with id_event as unique id
-        remove_query = {"hash": d_event["hash"], "id_event": {"$exists": False}}
-        if collection.find(remove_query):
-            collection.delete_many(remove_query)
-
-        collection.find_one_and_update(
-            {"id_event": d_event["id_event"]},
-            {"$set": d_event},
-            upsert=True)
-
-        # write to collection operations
-        collection = self.connection_helper.mongo_collection('operations')
-
-        # STATUS:
-        # -4 Revert
-        # -3 Stale Transaction
-        # -2 Error Unhandled
-        # -1 Error
-        #  0 Queue
-        #  1 Executed
-        #  2 Confirmed > 10 blocks
-
-        d_oper = OrderedDict()
-        d_oper["blockNumber"] = int(parsed["blockNumber"])
-        d_oper["hash"] = tx_hash
-        d_oper["id_event"] = id_event
-        d_oper["operId_"] = d_event["operId_"]
-        d_oper["executed"] = d_event
-        d_oper["operation"] = 'TCMint'
-        d_oper["gas"] = parsed['gas']
-        d_oper["gasPrice"] = str(parsed['gasPrice'])
-        d_oper["gasUsed"] = int(parsed['gasUsed'])
-        gas_fee = parsed["gasUsed"] * Web3.from_wei(int(parsed["gasPrice"]), 'ether')
-        d_oper["gasFeeRBTC"] = str(int(gas_fee * self.precision))
-        d_oper["status"] = 1  # Executed
-        d_oper["createdAt"] = parsed["createdAt"]
-        d_oper["lastUpdatedAt"] = datetime.datetime.now()
-        d_oper["confirmationTime"] = None
-        d_oper["last_block_indexed"] = int(parsed["blockNumber"])
-
-        collection.find_one_and_update(
-            {"operId_": d_oper["operId_"]},
-            {"$set": d_oper},
-            upsert=True)
-
-        log.info("Event MocQueue {0} :: operId_: {1}".format(d_oper["operation"], d_oper["operId_"]))
-
-        return d_oper
+        topics = tx_log['topics']
+        address_from = '0x' + to_bytes(topics[1])[-20:].hex()
+        address_to = '0x' + to_bytes(topics[2])[-20:].hex()
+        if address_from in self.address_not_allowed or address_to in self.address_not_allowed:
+            # skip transfers to our contracts
+            return
 
+        value = int.from_bytes(to_bytes(tx_log['data'])[:32], 'big')
 
-class EventMocQueueTCRedeemed(BaseEvent):
+        return self.save_transfer(parsed_receipt, address_from, address_to, value, uow)
 
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
+    def parse_event_and_save(self, parsed_receipt, decoded_event, uow):
 
         parsed = self.parse_event(parsed_receipt, decoded_event)
 
-        # get collection
-        collection = self.connection_helper.mongo_collection('event_MocQueue_TCRedeemed')
-
-        tx_hash = parsed['hash']
-        log_index = parsed['logIndex']
-        id_event = "{0}:{1}".format(tx_hash, log_index)
-
-        d_event = OrderedDict()
-        d_event["blockNumber"] = int(parsed["blockNumber"])
-        d_event["hash"] = tx_hash
-        d_event["id_event"] = id_event
-        d_event["sender_"] = sanitize_address(parsed["sender_"])
-        d_event["recipient_"] = sanitize_address(parsed["recipient_"])
-        d_event["qTC_"] = str(parsed["qTC_"])
-        d_event["qAC_"] = str(parsed["qAC_"])
-        d_event["qACfee_"] = str(parsed["qACfee_"])
-        d_event["qFeeToken_"] = str(parsed["qFeeToken_"])
-        d_event["qACVendorMarkup_"] = str(parsed["qACVendorMarkup_"])
-        d_event["qFeeTokenVendorMarkup_"] = str(parsed["qFeeTokenVendorMarkup_"])
-        d_event["vendor_"] = sanitize_address(parsed["vendor_"])
-        d_event["operId_"] = oper_id_to_int(parsed["operId_"])
-        d_event["createdAt"] = parsed["createdAt"]
-        d_event["lastUpdatedAt"] = datetime.datetime.now()
-
-        # remove old document with only hash as id and replace with id_event as unique id
-        remove_query = {"hash": d_event["hash"], "id_event": {"$exists": False}}
-        if collection.find(remove_query):
-            collection.delete_many(remove_query)
-
-        collection.find_one_and_update(
-            {"id_event": d_event["id_event"]},
-            {"$set": d_event},
-            upsert=True)
-
-        # write to collection operations
-        collection = self.connection_helper.mongo_collection('operations')
-
-        # STATUS:
-        # -4 Revert
-        # -3 Stale Transaction
-        # -2 Error Unhandled
-        # -1 Error
-        #  0 Queue
-        #  1 Executed
-        #  2 Confirmed > 10 blocks
-
-        d_oper = OrderedDict()
-        d_oper["blockNumber"] = int(parsed["blockNumber"])
-        d_oper["hash"] = tx_hash
-        d_oper["id_event"] = id_event
-        d_oper["operId_"] = d_event["operId_"]
-        d_oper["executed"] = d_event
-        d_oper["operation"] = 'TCRedeem'
-        d_oper["gas"] = parsed['gas']
-        d_oper["gasPrice"] = str(parsed['gasPrice'])
-        d_oper["gasUsed"] = int(parsed['gasUsed'])
-        gas_fee = parsed['gasUsed'] * Web3.from_wei(int(parsed["gasPrice"]), 'ether')
-        d_oper["gasFeeRBTC"] = str(int(gas_fee * self.precision))
-        d_oper["status"] = 1  # Executed
-        d_oper["createdAt"] = parsed["createdAt"]
-        d_oper["lastUpdatedAt"] = datetime.datetime.now()
-        d_oper["confirmationTime"] = None
-        d_oper["last_block_indexed"] = int(parsed["blockNumber"])
-
-        collection.find_one_and_update(
-            {"operId_": d_oper["operId_"]},
-            {"$set": d_oper},
-            upsert=True)
-
-        log.info("Event MocQueue {0} :: operId_: {1}".format(d_oper["operation"], d_oper["operId_"]))
-
-        return d_oper
-
-
-class EventMocQueueTPMinted(BaseEvent):
+        if address_lower(parsed['from']) in self.address_not_allowed or \
+                address_lower(parsed['to']) in self.address_not_allowed:
+            # skip transfers to our contracts
+            return parsed
 
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
+        return self.save_transfer(parsed_receipt, parsed['from'], parsed['to'], parsed['value'], uow)
 
-        parsed = self.parse_event(parsed_receipt, decoded_event)
+    def save_transfer(self, parsed_receipt, address_from, address_to, value, uow):
 
         # get collection
-        collection = self.connection_helper.mongo_collection('event_MocQueue_TPMinted')
+        collection_name = 'operations'
 
-        tx_hash = parsed['hash']
-        log_index = parsed['logIndex']
+        tx_hash = parsed_receipt['hash']
+        log_index = parsed_receipt['logIndex']
         id_event = "{0}:{1}".format(tx_hash, log_index)
 
-        d_event = OrderedDict()
-        d_event["blockNumber"] = int(parsed["blockNumber"])
-        d_event["hash"] = tx_hash
-        d_event["id_event"] = id_event
-
-        if 'tp' in parsed:
-            tp_key_name = 'tp'
-        else:
-            tp_key_name = 'tp_'
-
-        d_event["tp"] = sanitize_address(parsed[tp_key_name])
-        d_event['tpIndex_'] = self.options["addresses"]["TP"].index(d_event["tp"])
-        d_event["sender_"] = sanitize_address(parsed["sender_"])
-        d_event["recipient_"] = sanitize_address(parsed["recipient_"])
-        d_event["qTP_"] = str(parsed["qTP_"])
-        d_event["qAC_"] = str(parsed["qAC_"])
-        d_event["qACfee_"] = str(parsed["qACfee_"])
-        d_event["qFeeToken_"] = str(parsed["qFeeToken_"])
-        d_event["qACVendorMarkup_"] = str(parsed["qACVendorMarkup_"])
-        d_event["qFeeTokenVendorMarkup_"] = str(parsed["qFeeTokenVendorMarkup_"])
-        d_event["vendor_"] = sanitize_address(parsed["vendor_"])
-        d_event["operId_"] = oper_id_to_int(parsed["operId_"])
-        d_event["createdAt"] = parsed["createdAt"]
-        d_event["lastUpdatedAt"] = datetime.datetime.now()
-
-        # remove old document with only hash as id and replace with id_event as unique id
-        remove_query = {"hash": d_event["hash"], "id_event": {"$exists": False}}
-        if collection.find(remove_query):
-            collection.delete_many(remove_query)
-                        
-        collection.find_one_and_update(
-            {"id_event": d_event["id_event"]},
-            {"$set": d_event},
-            upsert=True)
-
-        collection = self.connection_helper.mongo_collection('operations')
-
-        # STATUS:
-        # -4 Revert
-        # -3 Stale Transaction
-        # -2 Error Unhandled
-        # -1 Error
-        #  0 Queue
-        #  1 Executed
-        #  2 Confirmed > 10 blocks
-
         d_oper = OrderedDict()
-        d_oper["blockNumber"] = int(parsed["blockNumber"])
+        d_oper["blockNumber"] = int(parsed_receipt["blockNumber"])
+        d_oper["blockHash"] = parsed_receipt.get("blockHash")
+        d_oper["operation"] = 'Transfer'
         d_oper["hash"] = tx_hash
         d_oper["id_event"] = id_event
-        d_oper["operId_"] = d_event["operId_"]
-        d_oper["executed"] = d_event
-        d_oper["operation"] = 'TPMint'
-        d_oper["gas"] = parsed['gas']
-        d_oper["gasPrice"] = str(parsed['gasPrice'])
-        d_oper["gasUsed"] = int(parsed['gasUsed'])
-        gas_fee = parsed['gasUsed'] * Web3.from_wei(int(parsed["gasPrice"]), 'ether')
+        d_oper["gas"] = parsed_receipt['gas']
+        d_oper["gasPrice"] = str(parsed_receipt['gasPrice'])
+        d_oper["gasUsed"] = int(parsed_receipt['gasUsed'])
+        gas_fee = parsed_receipt['gasUsed'] * Web3.from_wei(int(parsed_receipt['gasPrice']), 'ether')
         d_oper["gasFeeRBTC"] = str(int(gas_fee * self.precision))
-        d_oper["status"] = 1  # Executed
-        d_oper["createdAt"] = parsed["createdAt"]
+        d_oper["status"] = 1
+        d_params = dict()
+        d_params['hash'] = tx_hash
+        d_params['blockNumber'] = int(parsed_receipt["blockNumber"])
+        d_params["createdAt"] = parsed_receipt["createdAt"]
+        d_params["lastUpdatedAt"] = datetime.datetime.now()
+        d_params["token"] = self.token_involved
+        d_params["sender"] = sanitize_address(address_from)
+        d_params["recipient"] = sanitize_address(address_to)
+        d_params["amount"] = str(value)
+        d_oper["params"] = d_params
+        d_oper["createdAt"] = parsed_receipt["createdAt"]
         d_oper["lastUpdatedAt"] = datetime.datetime.now()
         d_oper["confirmationTime"] = None
-        d_oper["last_block_indexed"] = int(parsed["blockNumber"])
+        d_oper["last_block_indexed"] = int(parsed_receipt["blockNumber"])
 
-        collection.find_one_and_update(
-            {"operId_": d_oper["operId_"]},
-            {"$set": d_oper},
-            upsert=True)
+        self.write_event(uow, collection_name, d_oper)
+        write_account_operations(uow, d_oper, [d_params["sender"], d_params["recipient"]], replace=True)
 
-        log.info("Event MocQueue {0} :: operId_: {1}".format(d_oper["operation"], d_oper["operId_"]))
+        log.info("Tx %s - Token: [%s] From: [%s] To: [%s] Value: [%s] Tx Hash: [%s]",
+                 'Transfer',
+                 d_params["token"],
+                 d_params["sender"],
+                 d_params["recipient"],
+                 d_params["amount"],
+                 tx_hash)
 
         return d_oper
 
 
-class EventMocQueueTPRedeemed(BaseEvent):
+class EventFastBtcBridgeNewBitcoinTransfer(BaseEvent):
 
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
+    def parse_event_and_save(self, parsed_receipt, decoded_event, uow):
 
         parsed = self.parse_event(parsed_receipt, decoded_event)
 
-        # get collection
-        collection = self.connection_helper.mongo_collection('event_MocQueue_TPRedeemed')
+        # get collection transaction
+        collection_name = 'FastBtcBridge'
 
         tx_hash = parsed['hash']
         log_index = parsed['logIndex']
         id_event = "{0}:{1}".format(tx_hash, log_index)
 
-        d_event = OrderedDict()
-        d_event["blockNumber"] = int(parsed["blockNumber"])
-        d_event["hash"] = tx_hash
-        d_event["id_event"] = id_event
-        d_event["tp_"] = sanitize_address(parsed["tp_"])
-        d_event['tpIndex_'] = self.options["addresses"]["TP"].index(d_event["tp_"])
-        d_event["sender_"] = sanitize_address(parsed["sender_"])
-        d_event["recipient_"] = sanitize_address(parsed["recipient_"])
-        d_event["qTP_"] = str(parsed["qTP_"])
-        d_event["qAC_"] = str(parsed["qAC_"])
-        d_event["qACfee_"] = str(parsed["qACfee_"])
-        d_event["qFeeToken_"] = str(parsed["qFeeToken_"])
-        d_event["qACVendorMarkup_"] = str(parsed["qACVendorMarkup_"])
-        d_event["qFeeTokenVendorMarkup_"] = str(parsed["qFeeTokenVendorMarkup_"])
-        d_event["vendor_"] = sanitize_address(parsed["vendor_"])
-        d_event["operId_"] = oper_id_to_int(parsed["operId_"])
-        d_event["createdAt"] = parsed["createdAt"]
-        d_event["lastUpdatedAt"] = datetime.datetime.now()
-
-        # remove old document with only hash as id and replace with id_event as unique id
-        remove_query = {"hash": d_event["hash"], "id_event": {"$exists": False}}
-        if collection.find(remove_query):
-            collection.delete_many(remove_query)
-
-        collection.find_one_and_update(
-            {"id_event": d_event["id_event"]},
-            {"$set": d_event},
-            upsert=True)
-
-        collection = self.connection_helper.mongo_collection('operations')
-
-        # STATUS:
-        # -4 Revert
-        # -3 Stale Transaction
-        # -2 Error Unhandled
-        # -1 Error
-        #  0 Queue
-        #  1 Executed
-        #  2 Confirmed > 10 blocks
-
-        d_oper = OrderedDict()
-        d_oper["blockNumber"] = int(parsed["blockNumber"])
-        d_oper["hash"] = tx_hash
-        d_oper["id_event"] = id_event
-        d_oper["operId_"] = d_event["operId_"]
-        d_oper["executed"] = d_event
-        d_oper["operation"] = 'TPRedeem'
-        d_oper["gas"] = parsed['gas']
-        d_oper["gasPrice"] = str(parsed['gasPrice'])
-        d_oper["gasUsed"] = int(parsed['gasUsed'])
-        gas_fee = parsed['gasUsed'] * Web3.from_wei(int(parsed["gasPrice"]), 'ether')
-        d_oper["gasFeeRBTC"] = str(int(gas_fee * self.precision))
-        d_oper["status"] = 1  # Executed
-        d_oper["createdAt"] = parsed["createdAt"]
-        d_oper["lastUpdatedAt"] = datetime.datetime.now()
-        d_oper["confirmationTime"] = None
-        d_oper["last_block_indexed"] = int(parsed["blockNumber"])
+        d_tx = dict()
+        d_tx["transactionHash"] = tx_hash
+        d_tx["id_event"] = id_event
+        d_tx["transactionHashLastUpdated"] = tx_hash
+        d_tx["blockNumber"] = parsed["blockNumber"]
+        d_tx["type"] = 'PEG_OUT'
+        d_tx["transferId"] = str(parsed["transferId"])
+        d_tx["btcAddress"] = parsed["btcAddress"]
+        d_tx["nonce"] = parsed["nonce"]
+        d_tx["amountSatoshi"] = str(parsed["amountSatoshi"])
+        d_tx["feeSatoshi"] = str(parsed["feeSatoshi"])
+        d_tx["rskAddress"] = sanitize_address(parsed["rskAddress"])
+        d_tx["status"] = 0
+        d_tx["timestamp"] = parsed["timestamp"]
+        d_tx["updated"] = parsed["timestamp"]
 
-        collection.find_one_and_update(
-            {"operId_": d_oper["operId_"]},
-            {"$set": d_oper},
-            upsert=True)
+        uow.update_one(collection_name,
+                       {"transferId": d_tx["transferId"]},
+                       {"$set": d_tx},
+                       upsert=True)
 
-        log.info("Event MocQueue {0} :: operId_: {1}".format(d_oper["operation"], d_oper["operId_"]))
+        log.info("EVENT::NewBitcoinTransfer::%s", d_tx["transferId"])
+        log.debug("%s", d_tx)
 
-        return d_oper
+        return d_tx, parsed
 
 
-class EventMocQueueTPSwappedForTP(BaseEvent):
+class EventFastBtcBridgeBitcoinTransferStatusUpdated(BaseEvent):
 
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
+    def parse_event_and_save(self, parsed_receipt, decoded_event, uow):
 
         parsed = self.parse_event(parsed_receipt, decoded_event)
 
-        # get collection
-        collection = self.connection_helper.mongo_collection('event_MocQueue_TPSwappedForTP')
-
-        tx_hash = parsed['hash']
-        log_index = parsed['logIndex']
-        id_event = "{0}:{1}".format(tx_hash, log_index)
-
-        d_event = OrderedDict()
-        d_event["blockNumber"] = int(parsed["blockNumber"])
-        d_event["hash"] = tx_hash
-        d_event["id_event"] = id_event
-        d_event["tpFrom_"] = sanitize_address(parsed["tpFrom_"])
-        d_event['tpFromIndex_'] = self.options["addresses"]["TP"].index(d_event["tpFrom_"])
-        d_event["tpTo_"] = sanitize_address(parsed["tpTo_"])
-        d_event['tpToIndex_'] = self.options["addresses"]["TP"].index(d_event["tpTo_"])
-        d_event["sender_"] = sanitize_address(parsed["sender_"])
-        d_event["recipient_"] = sanitize_address(parsed["recipient_"])
-        d_event["qTPfrom_"] = str(parsed["qTPfrom_"])
-        d_event["qTPto_"] = str(parsed["qTPto_"])
-        d_event["qACfee_"] = str(parsed["qACfee_"])
-        d_event["qFeeToken_"] = str(parsed["qFeeToken_"])
-        d_event["qACVendorMarkup_"] = str(parsed["qACVendorMarkup_"])
-        d_event["qFeeTokenVendorMarkup_"] = str(parsed["qFeeTokenVendorMarkup_"])
-        d_event["vendor_"] = sanitize_address(parsed["vendor_"])
-        d_event["operId_"] = oper_id_to_int(parsed["operId_"])
-        d_event["createdAt"] = parsed["createdAt"]
-        d_event["lastUpdatedAt"] = datetime.datetime.now()
-
-        # remove old document with only hash as id and replace with id_event as unique id
-        remove_query = {"hash": d_event["hash"], "id_event": {"$exists": False}}
-        if collection.find(remove_query):
-            collection.delete_many(remove_query)
-
-        collection.find_one_and_update(
-            {"id_event": d_event["id_event"]},
-            {"$set": d_event},
-            upsert=True)
-
-        collection = self.connection_helper.mongo_collection('operations')
-
-        # STATUS:
-        # -4 Revert
-        # -3 Stale Transaction
-        # -2 Error Unhandled
-        # -1 Error
-        #  0 Queue
-        #  1 Executed
-        #  2 Confirmed > 10 blocks
-
-        d_oper = OrderedDict()
-        d_oper["blockNumber"] = int(parsed["blockNumber"])
-        d_oper["hash"] = tx_hash
-        d_oper["id_event"] = id_event
-        d_oper["operId_"] = d_event["operId_"]
-        d_oper["executed"] = d_event
-        d_oper["operation"] = 'TPSwapForTP'
-        d_oper["gas"] = parsed['gas']
-        d_oper["gasPrice"] = str(parsed['gasPrice'])
-        d_oper["gasUsed"] = int(parsed['gasUsed'])
-        gas_fee = parsed['gasUsed'] * Web3.from_wei(int(parsed["gasPrice"]), 'ether')
-        d_oper["gasFeeRBTC"] = str(int(gas_fee * self.precision))
-        d_oper["status"] = 1  # Executed
-        d_oper["createdAt"] = parsed["createdAt"]
-        d_oper["lastUpdatedAt"] = datetime.datetime.now()
-        d_oper["confirmationTime"] = None
-        d_oper["last_block_indexed"] = int(parsed["blockNumber"])
-
-        collection.find_one_and_update(
-            {"operId_": d_oper["operId_"]},
-            {"$set": d_oper},
-            upsert=True)
-
-        log.info("Event MocQueue {0} :: operId_: {1}".format(d_oper["operation"], d_oper["operId_"]))
+        # get collection transaction
+        collection_name = 'FastBtcBridge'
 
-        return d_oper
+        d_tx = dict()
+        d_tx["transactionHashLastUpdated"] = parsed["hash"]
+        d_tx["status"] = parsed["newStatus"]
+        d_tx["transferId"] = str(parsed["transferId"])
+        d_tx["updated"] = parsed["timestamp"]
 
+        uow.update_one(collection_name,
+                       {"transferId": d_tx["transferId"]},
+                       {"$set": d_tx},
+                       upsert=False)
 
-class EventMocQueueTPSwappedForTC(BaseEvent):
+        log.info("EVENT::BitcoinTransferStatusUpdated::%s", d_tx["transferId"])
+        log.debug("%s", d_tx)
 
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
-
-        parsed = self.parse_event(parsed_receipt, decoded_event)
-
-        # get collection
-        collection = self.connection_helper.mongo_collection('event_MocQueue_TPSwappedForTC')
-
-        tx_hash = parsed['hash']
-        log_index = parsed['logIndex']
-        id_event = "{0}:{1}".format(tx_hash, log_index)
-
-        d_event = OrderedDict()
-        d_event["blockNumber"] = int(parsed["blockNumber"])
-        d_event["hash"] = tx_hash
-        d_event["id_event"] = id_event
-        d_event["tp_"] = sanitize_address(parsed["tp_"])
-        d_event['tpIndex_'] = self.options["addresses"]["TP"].index(d_event["tp_"])
-        d_event["sender_"] = sanitize_address(parsed["sender_"])
-        d_event["recipient_"] = sanitize_address(parsed["recipient_"])
-        d_event["qTC_"] = str(parsed["qTC_"])
-        d_event["qTP_"] = str(parsed["qTP_"])
-        d_event["qACfee_"] = str(parsed["qACfee_"])
-        d_event["qFeeToken_"] = str(parsed["qFeeToken_"])
-        d_event["qACVendorMarkup_"] = str(parsed["qACVendorMarkup_"])
-        d_event["qFeeTokenVendorMarkup_"] = str(parsed["qFeeTokenVendorMarkup_"])
-        d_event["vendor_"] = sanitize_address(parsed["vendor_"])
-        d_event["operId_"] = oper_id_to_int(parsed["operId_"])
-        d_event["createdAt"] = parsed["createdAt"]
-        d_event["lastUpdatedAt"] = datetime.datetime.now()
-
-        # remove old document with only hash as id and replace with id_event as unique id
-        remove_query = {"hash": d_event["hash"], "id_event": {"$exists": False}}
-        if collection.find(remove_query):
-            collection.delete_many(remove_query)
-
-        collection.find_one_and_update(
-            {"id_event": d_event["id_event"]},
-            {"$set": d_event},
-            upsert=True)
-
-        collection = self.connection_helper.mongo_collection('operations')
-
-        # STATUS:
-        # -4 Revert
-        # -3 Stale Transaction
-        # -2 Error Unhandled
-        # -1 Error
-        #  0 Queue
-        #  1 Executed
-        #  2 Confirmed > 10 blocks
-
-        d_oper = OrderedDict()
-        d_oper["blockNumber"] = int(parsed["blockNumber"])
-        d_oper["hash"] = tx_hash
-        d_oper["id_event"] = id_event
-        d_oper["operId_"] = d_event["operId_"]
-        d_oper["executed"] = d_event
-        d_oper["operation"] = 'TPSwapForTC'
-        d_oper["gas"] = parsed['gas']
-        d_oper["gasPrice"] = str(parsed['gasPrice'])
-        d_oper["gasUsed"] = int(parsed['gasUsed'])
-        gas_fee = parsed['gasUsed'] * Web3.from_wei(int(parsed["gasPrice"]), 'ether')
-        d_oper["gasFeeRBTC"] = str(int(gas_fee * self.precision))
-        d_oper["status"] = 1  # Executed
-        d_oper["createdAt"] = parsed["createdAt"]
-        d_oper["lastUpdatedAt"] = datetime.datetime.now()
-        d_oper["confirmationTime"] = None
-        d_oper["last_block_indexed"] = int(parsed["blockNumber"])
-
-        collection.find_one_and_update(
-            {"operId_": d_oper["operId_"]},
-            {"$set": d_oper},
-            upsert=True)
-
-        log.info("Event MocQueue {0} :: operId_: {1}".format(d_oper["operation"], d_oper["operId_"]))
-
-        return d_oper
-
-
-class EventMocQueueTCSwappedForTP(BaseEvent):
-
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
-
-        parsed = self.parse_event(parsed_receipt, decoded_event)
-
-        # get collection
-        collection = self.connection_helper.mongo_collection('event_MocQueue_TCSwappedForTP')
-
-        tx_hash = parsed['hash']
-        log_index = parsed['logIndex']
-        id_event = "{0}:{1}".format(tx_hash, log_index)
-
-        d_event = OrderedDict()
-        d_event["blockNumber"] = int(parsed["blockNumber"])
-        d_event["hash"] = tx_hash
-        d_event["id_event"] = id_event
-        d_event["tp_"] = sanitize_address(parsed["tp_"])
-        d_event['tpIndex_'] = self.options["addresses"]["TP"].index(d_event["tp_"])
-        d_event["sender_"] = sanitize_address(parsed["sender_"])
-        d_event["recipient_"] = sanitize_address(parsed["recipient_"])
-        d_event["qTC_"] = str(parsed["qTC_"])
-        d_event["qTP_"] = str(parsed["qTP_"])
-        d_event["qACfee_"] = str(parsed["qACfee_"])
-        d_event["qFeeToken_"] = str(parsed["qFeeToken_"])
-        d_event["qACVendorMarkup_"] = str(parsed["qACVendorMarkup_"])
-        d_event["qFeeTokenVendorMarkup_"] = str(parsed["qFeeTokenVendorMarkup_"])
-        d_event["vendor_"] = sanitize_address(parsed["vendor_"])
-        d_event["operId_"] = oper_id_to_int(parsed["operId_"])
-        d_event["createdAt"] = parsed["createdAt"]
-        d_event["lastUpdatedAt"] = datetime.datetime.now()
-
-        # remove old document with only hash as id and replace with id_event as unique id
-        remove_query = {"hash": d_event["hash"], "id_event": {"$exists": False}}
-        if collection.find(remove_query):
-            collection.delete_many(remove_query)
-
-        collection.find_one_and_update(
-            {"id_event": d_event["id_event"]},
-            {"$set": d_event},
-            upsert=True)
-
-        collection = self.connection_helper.mongo_collection('operations')
-
-        # STATUS:
-        # -4 Revert
-        # -3 Stale Transaction
-        # -2 Error Unhandled
-        # -1 Error
-        #  0 Queue
-        #  1 Executed
-        #  2 Confirmed > 10 blocks
-
-        d_oper = OrderedDict()
-        d_oper["blockNumber"] = int(parsed["blockNumber"])
-        d_oper["hash"] = tx_hash
-        d_oper["id_event"] = id_event
-        d_oper["operId_"] = d_event["operId_"]
-        d_oper["executed"] = d_event
-        d_oper["operation"] = 'TCSwapForTP'
-        d_oper["gas"] = parsed['gas']
-        d_oper["gasPrice"] = str(parsed['gasPrice'])
-        d_oper["gasUsed"] = int(parsed['gasUsed'])
-        gas_fee = parsed['gasUsed'] * Web3.from_wei(int(parsed["gasPrice"]), 'ether')
-        d_oper["gasFeeRBTC"] = str(int(gas_fee * self.precision))
-        d_oper["status"] = 1  # Executed
-        d_oper["createdAt"] = parsed["createdAt"]
-        d_oper["lastUpdatedAt"] = datetime.datetime.now()
-        d_oper["confirmationTime"] = None
-        d_oper["last_block_indexed"] = int(parsed["blockNumber"])
-
-        collection.find_one_and_update(
-            {"operId_": d_oper["operId_"]},
-            {"$set": d_oper},
-            upsert=True)
-
-        log.info("Event MocQueue {0} :: operId_: {1}".format(d_oper["operation"], d_oper["operId_"]))
-
-        return d_oper
-
-
-class EventMocQueueTCandTPRedeemed(BaseEvent):
-
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
-        parsed = self.parse_event(parsed_receipt, decoded_event)
-
-        # get collection
-        collection = self.connection_helper.mongo_collection('event_MocQueue_TCandTPRedeemed')
-
-        tx_hash = parsed['hash']
-        log_index = parsed['logIndex']
-        id_event = "{0}:{1}".format(tx_hash, log_index)
-
-        d_event = OrderedDict()
-        d_event["blockNumber"] = int(parsed["blockNumber"])
-        d_event["hash"] = tx_hash
-        d_event["id_event"] = id_event
-        d_event["tp_"] = sanitize_address(parsed["tp_"])
-        d_event['tpIndex_'] = self.options["addresses"]["TP"].index(d_event["tp_"])
-        d_event["sender_"] = sanitize_address(parsed["sender_"])
-        d_event["recipient_"] = sanitize_address(parsed["recipient_"])
-        d_event["qTC_"] = str(parsed["qTC_"])
-        d_event["qTP_"] = str(parsed["qTP_"])
-        d_event["qAC_"] = str(parsed["qAC_"])
-        d_event["qACfee_"] = str(parsed["qACfee_"])
-        d_event["qFeeToken_"] = str(parsed["qFeeToken_"])
-        d_event["qACVendorMarkup_"] = str(parsed["qACVendorMarkup_"])
-        d_event["qFeeTokenVendorMarkup_"] = str(parsed["qFeeTokenVendorMarkup_"])
-        d_event["vendor_"] = sanitize_address(parsed["vendor_"])
-        d_event["operId_"] = oper_id_to_int(parsed["operId_"])
-        d_event["createdAt"] = parsed["createdAt"]
-        d_event["lastUpdatedAt"] = datetime.datetime.now()
-
-        # remove old document with only hash as id and replace with id_event as unique id
-        remove_query = {"hash": d_event["hash"], "id_event": {"$exists": False}}
-        if collection.find(remove_query):
-            collection.delete_many(remove_query)
-
-        collection.find_one_and_update(
-            {"id_event": d_event["id_event"]},
-            {"$set": d_event},
-            upsert=True)
-
-        collection = self.connection_helper.mongo_collection('operations')
-
-        # STATUS:
-        # -4 Revert
-        # -3 Stale Transaction
-        # -2 Error Unhandled
-        # -1 Error
-        #  0 Queue
-        #  1 Executed
-        #  2 Confirmed > 10 blocks
-
-        d_oper = OrderedDict()
-        d_oper["blockNumber"] = int(parsed["blockNumber"])
-        d_oper["hash"] = tx_hash
-        d_oper["id_event"] = id_event
-        d_oper["operId_"] = d_event["operId_"]
-        d_oper["executed"] = d_event
-        d_oper["operation"] = 'TCandTPRedeem'
-        d_oper["gas"] = parsed['gas']
-        d_oper["gasPrice"] = str(parsed['gasPrice'])
-        d_oper["gasUsed"] = int(parsed['gasUsed'])
-        gas_fee = parsed['gasUsed'] * Web3.from_wei(int(parsed["gasPrice"]), 'ether')
-        d_oper["gasFeeRBTC"] = str(int(gas_fee * self.precision))
-        d_oper["status"] = 1  # Executed
-        d_oper["createdAt"] = parsed["createdAt"]
-        d_oper["lastUpdatedAt"] = datetime.datetime.now()
-        d_oper["confirmationTime"] = None
-        d_oper["last_block_indexed"] = int(parsed["blockNumber"])
-
-        collection.find_one_and_update(
-            {"operId_": d_oper["operId_"]},
-            {"$set": d_oper},
-            upsert=True)
-
-        log.info("Event MocQueue {0} :: operId_: {1}".format(d_oper["operation"], d_oper["operId_"]))
-
-        return d_oper
-
-
-class EventMocQueueTCandTPMinted(BaseEvent):
-
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
-        parsed = self.parse_event(parsed_receipt, decoded_event)
-
-        # get collection
-        collection = self.connection_helper.mongo_collection('event_MocQueue_TCandTPMinted')
-
-        tx_hash = parsed['hash']
-        log_index = parsed['logIndex']
-        id_event = "{0}:{1}".format(tx_hash, log_index)
-
-        d_event = OrderedDict()
-        d_event["blockNumber"] = int(parsed["blockNumber"])
-        d_event["hash"] = tx_hash
-        d_event["id_event"] = id_event
-        d_event["tp_"] = sanitize_address(parsed["tp_"])
-        d_event['tpIndex_'] = self.options["addresses"]["TP"].index(d_event["tp_"])
-        d_event["sender_"] = sanitize_address(parsed["sender_"])
-        d_event["recipient_"] = sanitize_address(parsed["recipient_"])
-        d_event["qTC_"] = str(parsed["qTC_"])
-        d_event["qTP_"] = str(parsed["qTP_"])
-        d_event["qAC_"] = str(parsed["qAC_"])
-        d_event["qACfee_"] = str(parsed["qACfee_"])
-        d_event["qFeeToken_"] = str(parsed["qFeeToken_"])
-        d_event["qACVendorMarkup_"] = str(parsed["qACVendorMarkup_"])
-        d_event["qFeeTokenVendorMarkup_"] = str(parsed["qFeeTokenVendorMarkup_"])
-        d_event["vendor_"] = sanitize_address(parsed["vendor_"])
-        d_event["operId_"] = oper_id_to_int(parsed["operId_"])
-        d_event["createdAt"] = parsed["createdAt"]
-        d_event["lastUpdatedAt"] = datetime.datetime.now()
-
-        # remove old document with only hash as id and replace with id_event as unique id
-        remove_query = {"hash": d_event["hash"], "id_event": {"$exists": False}}
-        if collection.find(remove_query):
-            collection.delete_many(remove_query)
-
-        collection.find_one_and_update(
-            {"id_event": d_event["id_event"]},
-            {"$set": d_event},
-            upsert=True)
-
-        collection = self.connection_helper.mongo_collection('operations')
-
-        # STATUS:
-        # -4 Revert
-        # -3 Stale Transaction
-        # -2 Error Unhandled
-        # -1 Error
-        #  0 Queue
-        #  1 Executed
-        #  2 Confirmed > 10 blocks
-
-        d_oper = OrderedDict()
-        d_oper["blockNumber"] = int(parsed["blockNumber"])
-        d_oper["hash"] = tx_hash
-        d_oper["id_event"] = id_event
-        d_oper["operId_"] = d_event["operId_"]
-        d_oper["executed"] = d_event
-        d_oper["operation"] = 'TCandTPMint'
-        d_oper["gas"] = parsed['gas']
-        d_oper["gasPrice"] = str(parsed['gasPrice'])
-        d_oper["gasUsed"] = int(parsed['gasUsed'])
-        gas_fee = parsed['gasUsed'] * Web3.from_wei(int(parsed["gasPrice"]), 'ether')
-        d_oper["gasFeeRBTC"] = str(int(gas_fee * self.precision))
-        d_oper["status"] = 1  # Executed
-        d_oper["createdAt"] = parsed["createdAt"]
-        d_oper["lastUpdatedAt"] = datetime.datetime.now()
-        d_oper["confirmationTime"] = None
-        d_oper["last_block_indexed"] = int(parsed["blockNumber"])
-
-        collection.find_one_and_update(
-            {"operId_": d_oper["operId_"]},
-            {"$set": d_oper},
-            upsert=True)
-
-        log.info("Event MocQueue {0} :: operId_: {1}".format(d_oper["operation"], d_oper["operId_"]))
-
-        return d_oper
-
-
-class EventTokenTransfer(BaseEvent):
-
-    def __init__(self, options, connection_helper, contracts_loaded, filter_contracts_addresses, block_info, token_involved):
-
-        self.options = options
-        self.connection_helper = connection_helper
-        self.contracts_loaded = contracts_loaded
-        self.filter_contracts_addresses = filter_contracts_addresses
-        self.block_info = block_info
-        self.token_involved = token_involved
-
-        super().__init__(options, connection_helper, contracts_loaded, filter_contracts_addresses, block_info)
-
-    # def parse_event(self, parsed_receipt, decoded_event):
-    #
-    #     # decode event to support write in mongo
-    #     parsed_receipt['from'] = decoded_event['from'].lower()
-    #     parsed_receipt['to'] = decoded_event['to'].lower()
-    #     parsed_receipt['value'] = str(decoded_event['value'])
-    #
-    #     return parsed_receipt
-
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
-
-        parsed = self.parse_event(parsed_receipt, decoded_event)
-
-        address_from_contract = '0x0000000000000000000000000000000000000000'
-        address_not_allowed = [str.lower(address_from_contract)] + self.filter_contracts_addresses
-
-        if sanitize_address(parsed['from']).lower() in address_not_allowed or \
-                sanitize_address(parsed['to']).lower() in address_not_allowed:
-            # skip transfers to our contracts
-            return parsed
-
-        # get collection
-        collection = self.connection_helper.mongo_collection('operations')
-
-        tx_hash = parsed['hash']
-        log_index = parsed['logIndex']
-        id_event = "{0}:{1}".format(tx_hash, log_index)
-
-        d_oper = OrderedDict()
-        d_oper["blockNumber"] = int(parsed["blockNumber"])
-        d_oper["operation"] = 'Transfer'
-        d_oper["hash"] = tx_hash
-        d_oper["id_event"] = id_event
-        d_oper["gas"] = parsed['gas']
-        d_oper["gasPrice"] = str(parsed['gasPrice'])
-        d_oper["gasUsed"] = int(parsed['gasUsed'])
-        gas_fee = parsed['gasUsed'] * Web3.from_wei(int(parsed['gasPrice']), 'ether')
-        d_oper["gasFeeRBTC"] = str(int(gas_fee * self.precision))
-        d_oper["status"] = 1
-        d_params = dict()
-        d_params['hash'] = tx_hash
-        d_params['blockNumber'] = int(parsed["blockNumber"])
-        d_params["createdAt"] = parsed["createdAt"]
-        d_params["lastUpdatedAt"] = datetime.datetime.now()
-        d_params["token"] = self.token_involved
-        d_params["sender"] = sanitize_address(parsed["from"])
-        d_params["recipient"] = sanitize_address(parsed["to"])
-        d_params["amount"] = str(parsed["value"])
-        d_oper["params"] = d_params
-        d_oper["createdAt"] = parsed["createdAt"]
-        d_oper["lastUpdatedAt"] = datetime.datetime.now()
-        d_oper["confirmationTime"] = None
-        d_oper["last_block_indexed"] = int(parsed["blockNumber"])
-
-        # remove old document with only hash as id and replace with id_event as unique id
-        remove_query = {"hash": d_oper["hash"], "id_event": {"$exists": False}}
-        if collection.find(remove_query):
-            collection.delete_many(remove_query)
-
-        collection.find_one_and_update(
-            {"id_event": d_oper["id_event"]},
-            {"$set": d_oper},
-            upsert=True)
-
-        log.info("Tx {0} - Token: [{1}] From: [{2}] To: [{3}] Value: [{4}] Tx Hash: [{5}]".format(
-            'Transfer',
-            d_params["token"],
-            d_params["sender"],
-            d_params["recipient"],
-            d_params["amount"],
-            tx_hash))
-
-        return d_oper, parsed
-
-
-class EventFastBtcBridgeNewBitcoinTransfer(BaseEvent):
-
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
-
-        parsed = self.parse_event(parsed_receipt, decoded_event)
-
-        # get collection transaction
-        collection_bridge = self.connection_helper.mongo_collection('FastBtcBridge')
-
-        tx_hash = parsed['hash']
-        log_index = parsed['logIndex']
-        id_event = "{0}:{1}".format(tx_hash, log_index)
-
-        d_tx = dict()
-        d_tx["transactionHash"] = tx_hash
-        d_tx["id_event"] = id_event
-        d_tx["transactionHashLastUpdated"] = tx_hash
-        d_tx["blockNumber"] = parsed["blockNumber"]
-        d_tx["type"] = 'PEG_OUT'
-        d_tx["transferId"] = str(parsed["transferId"])
-        d_tx["btcAddress"] = parsed["btcAddress"]
-        d_tx["nonce"] = parsed["nonce"]
-        d_tx["amountSatoshi"] = str(parsed["amountSatoshi"])
-        d_tx["feeSatoshi"] = str(parsed["feeSatoshi"])
-        d_tx["rskAddress"] = sanitize_address(parsed["rskAddress"])
-        d_tx["status"] = 0
-        d_tx["timestamp"] = parsed["timestamp"]
-        d_tx["updated"] = parsed["timestamp"]
-
-        collection_bridge.find_one_and_update(
-            {"transferId": d_tx["transferId"]},
-            {"$set": d_tx},
-            upsert=True)
-
-        log.info("EVENT::NewBitcoinTransfer::{0}".format(d_tx["transferId"]))
-        log.info(d_tx)
-
-        return d_tx, parsed
-
-
-class EventFastBtcBridgeBitcoinTransferStatusUpdated(BaseEvent):
-
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
-
-        parsed = self.parse_event(parsed_receipt, decoded_event)
-
-        # get collection transaction
-        collection_bridge = self.connection_helper.mongo_collection('FastBtcBridge')
-
-        d_tx = dict()
-        d_tx["transactionHashLastUpdated"] = parsed["hash"]
-        d_tx["status"] = parsed["newStatus"]
-        d_tx["transferId"] = str(parsed["transferId"])
-        d_tx["updated"] = parsed["timestamp"]
-
-        collection_bridge.find_one_and_update(
-            {"transferId": d_tx["transferId"]},
-            {"$set": d_tx},
-            upsert=False)
-
-        log.info("EVENT::BitcoinTransferStatusUpdated::{0}".format(d_tx["transferId"]))
-        log.info(d_tx)
-
-        return d_tx, parsed
-
-
-class EventOMOCIncentiveV2ClaimOK(BaseEvent):
-
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
-
-        parsed = self.parse_event(parsed_receipt, decoded_event)
-
-        # get collection
-        collection = self.connection_helper.mongo_collection('event_IncentiveV2_ClaimOK')
-
-        tx_hash = parsed['hash']
-        log_index = parsed['logIndex']
-        id_event = "{0}:{1}".format(tx_hash, log_index)
-
-        d_event = dict()
-        d_event["hash"] = tx_hash
-        d_event["id_event"] = id_event
-        d_event["blockNumber"] = int(parsed["blockNumber"])
-        d_event["recipient"] = sanitize_address(parsed["recipient"]).lower()
-        d_event["origin"] = sanitize_address(parsed["origin"]).lower()
-        d_event["value"] = str(parsed["value"])
-        d_event["createdAt"] = parsed["createdAt"]
-        d_event["lastUpdatedAt"] = datetime.datetime.now()
-
-        # remove old document with only hash as id and replace with id_event as unique id
-        remove_query = {"hash": d_event["hash"], "id_event": {"$exists": False}}
-        if collection.find(remove_query):
-            collection.delete_many(remove_query)
-
-        collection.find_one_and_update(
-            {"id_event": d_event["id_event"]},
-            {"$set": d_event},
-            upsert=True)
-
-        log.info("Event :: IncentiveV2_ClaimOK :: {0}".format(d_event["id_event"]))
-        log.info(d_event)
-
-        return d_event, parsed
-
-
-class EventOMOCVestingFactoryVestingCreated(BaseEvent):
-
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
-
-        parsed = self.parse_event(parsed_receipt, decoded_event)
-
-        # get collection
-        collection = self.connection_helper.mongo_collection('event_VestingFactory_VestingCreated')
-
-        tx_hash = parsed['hash']
-        log_index = parsed['logIndex']
-        id_event = "{0}:{1}".format(tx_hash, log_index)
-
-        d_event = dict()
-        d_event["hash"] = tx_hash
-        d_event["id_event"] = id_event
-        d_event["blockNumber"] = int(parsed["blockNumber"])
-        d_event["vesting"] = sanitize_address(parsed["vesting"]).lower()
-        d_event["holder"] = sanitize_address(parsed["holder"]).lower()
-        d_event["createdAt"] = parsed["createdAt"]
-        d_event["lastUpdatedAt"] = datetime.datetime.now()
-
-        # remove old document with only hash as id and replace with id_event as unique id
-        remove_query = {"hash": d_event["hash"], "id_event": {"$exists": False}}
-        if collection.find(remove_query):
-            collection.delete_many(remove_query)
-
-        collection.find_one_and_update(
-            {"id_event": d_event["id_event"]},
-            {"$set": d_event},
-            upsert=True)
-
-        log.info("Event :: VestingFactory_VestingCreated :: {0}".format(d_event["id_event"]))
-        log.info(d_event)
-
-        return d_event, parsed
-
-
-class EventOMOCDelayMachinePaymentCancel(BaseEvent):
-
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
-
-        parsed = self.parse_event(parsed_receipt, decoded_event)
-
-        # get collection
-        collection = self.connection_helper.mongo_collection('event_DelayMachine_PaymentCancel')
-
-        tx_hash = parsed['hash']
-        log_index = parsed['logIndex']
-        id_event = "{0}:{1}".format(tx_hash, log_index)
-
-        d_event = dict()
-        d_event["hash"] = tx_hash
-        d_event["id_event"] = id_event
-        d_event["blockNumber"] = int(parsed["blockNumber"])
-        d_event["id"] = oper_id_to_int(parsed["id"])
-        d_event["source"] = sanitize_address(parsed["source"]).lower()
-        d_event["destination"] = sanitize_address(parsed["destination"]).lower()
-        d_event["amount"] = str(parsed["amount"])
-        d_event["createdAt"] = parsed["createdAt"]
-        d_event["lastUpdatedAt"] = datetime.datetime.now()
-
-        # remove old document with only hash as id and replace with id_event as unique id
-        remove_query = {"hash": d_event["hash"], "id_event": {"$exists": False}}
-        if collection.find(remove_query):
-            collection.delete_many(remove_query)
-
-        collection.find_one_and_update(
-            {"id_event": d_event["id_event"]},
-            {"$set": d_event},
-            upsert=True)
-
-        log.info("Event :: DelayMachine_PaymentCancel :: {0}".format(d_event["id_event"]))
-        log.info(d_event)
-
-        # Write to Omoc Operation collection
-        collection = self.connection_helper.mongo_collection('omoc_operations')
-        d_oper = OrderedDict()
-        d_oper["hash"] = tx_hash
-        d_oper["id_event"] = id_event
-        d_oper["blockNumber"] = int(parsed["blockNumber"])
-        d_oper["operation"] = 'DelayMachine_PaymentCancel'
-        d_oper["id"] = oper_id_to_int(parsed["id"])
-        d_oper["source"] = sanitize_address(parsed["source"]).lower()
-        d_oper["destination"] = sanitize_address(parsed["destination"]).lower()
-        d_oper["amount"] = str(parsed["amount"])
-        d_oper["createdAt"] = parsed["createdAt"]
-        d_oper["lastUpdatedAt"] = datetime.datetime.now()
-        d_oper["last_block_indexed"] = int(parsed["blockNumber"])
-
-        collection.find_one_and_update(
-            {"id_event": d_oper["id_event"]},
-            {"$set": d_oper},
-            upsert=True)
-
-        return d_event, parsed
-
-
-class EventOMOCDelayMachinePaymentDeposit(BaseEvent):
-
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
-
-        parsed = self.parse_event(parsed_receipt, decoded_event)
-
-        # get collection
-        collection = self.connection_helper.mongo_collection('event_DelayMachine_PaymentDeposit')
-
-        tx_hash = parsed['hash']
-        log_index = parsed['logIndex']
-        id_event = "{0}:{1}".format(tx_hash, log_index)
-
-        d_event = dict()
-        d_event["hash"] = tx_hash
-        d_event["id_event"] = id_event
-        d_event["blockNumber"] = int(parsed["blockNumber"])
-        d_event["id"] = oper_id_to_int(parsed["id"])
-        d_event["source"] = sanitize_address(parsed["source"]).lower()
-        d_event["destination"] = sanitize_address(parsed["destination"]).lower()
-        d_event["amount"] = str(parsed["amount"])
-        d_event["expiration"] = int(parsed["expiration"])
-        d_event["createdAt"] = parsed["createdAt"]
-        d_event["lastUpdatedAt"] = datetime.datetime.now()
-
-        # remove old document with only hash as id and replace with id_event as unique id
-        remove_query = {"hash": d_event["hash"], "id_event": {"$exists": False}}
-        if collection.find(remove_query):
-            collection.delete_many(remove_query)
-
-        collection.find_one_and_update(
-            {"id_event": d_event["id_event"]},
-            {"$set": d_event},
-            upsert=True)
-
-        log.info("Event :: DelayMachine_PaymentDeposit :: {0}".format(d_event["id_event"]))
-        log.info(d_event)
-
-        # Write to Omoc Operation collection
-        collection = self.connection_helper.mongo_collection('omoc_operations')
-        d_oper = OrderedDict()
-        d_oper["hash"] = tx_hash
-        d_oper["id_event"] = id_event
-        d_oper["blockNumber"] = int(parsed["blockNumber"])
-        d_oper["operation"] = 'DelayMachine_PaymentDeposit'
-        d_oper["id"] = oper_id_to_int(parsed["id"])
-        d_oper["source"] = sanitize_address(parsed["source"]).lower()
-        d_oper["destination"] = sanitize_address(parsed["destination"]).lower()
-        d_oper["amount"] = str(parsed["amount"])
-        d_oper["expiration"] = int(parsed["expiration"])
-        d_oper["createdAt"] = parsed["createdAt"]
-        d_oper["lastUpdatedAt"] = datetime.datetime.now()
-        d_oper["last_block_indexed"] = int(parsed["blockNumber"])
-
-        collection.find_one_and_update(
-            {"id_event": d_oper["id_event"]},
-            {"$set": d_oper},
-            upsert=True)
-
-        return d_event, parsed
-
-
-class EventOMOCDelayMachinePaymentWithdraw(BaseEvent):
-
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
-
-        parsed = self.parse_event(parsed_receipt, decoded_event)
-
-        # get collection
-        collection = self.connection_helper.mongo_collection('event_DelayMachine_PaymentWithdraw')
-
-        tx_hash = parsed['hash']
-        log_index = parsed['logIndex']
-        id_event = "{0}:{1}".format(tx_hash, log_index)
-
-        d_event = dict()
-        d_event["hash"] = tx_hash
-        d_event["id_event"] = id_event
-        d_event["blockNumber"] = int(parsed["blockNumber"])
-        d_event["id"] = oper_id_to_int(parsed["id"])
-        d_event["source"] = sanitize_address(parsed["source"]).lower()
-        d_event["destination"] = sanitize_address(parsed["destination"]).lower()
-        d_event["amount"] = str(parsed["amount"])
-        d_event["createdAt"] = parsed["createdAt"]
-        d_event["lastUpdatedAt"] = datetime.datetime.now()
-
-        # remove old document with only hash as id and replace with id_event as unique id
-        remove_query = {"hash": d_event["hash"], "id_event": {"$exists": False}}
-        if collection.find(remove_query):
-            collection.delete_many(remove_query)
-
-        collection.find_one_and_update(
-            {"id_event": d_event["id_event"]},
-            {"$set": d_event},
-            upsert=True)
-
-        log.info("Event :: DelayMachine_PaymentWithdraw :: {0}".format(d_event["id_event"]))
-        log.info(d_event)
-
-        # Write to Omoc Operation collection
-        collection = self.connection_helper.mongo_collection('omoc_operations')
-        d_oper = OrderedDict()
-        d_oper["hash"] = tx_hash
-        d_oper["id_event"] = id_event
-        d_oper["blockNumber"] = int(parsed["blockNumber"])
-        d_oper["operation"] = 'DelayMachine_PaymentWithdraw'
-        d_oper["id"] = oper_id_to_int(parsed["id"])
-        d_oper["source"] = sanitize_address(parsed["source"]).lower()
-        d_oper["destination"] = sanitize_address(parsed["destination"]).lower()
-        d_oper["amount"] = str(parsed["amount"])
-        d_oper["createdAt"] = parsed["createdAt"]
-        d_oper["lastUpdatedAt"] = datetime.datetime.now()
-        d_oper["last_block_indexed"] = int(parsed["blockNumber"])
-
-        collection.find_one_and_update(
-            {"id_event": d_oper["id_event"]},
-            {"$set": d_oper},
-            upsert=True)
-
-        return d_event, parsed
-
-
-class EventOMOCSupportersAddStake(BaseEvent):
-
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
-
-        parsed = self.parse_event(parsed_receipt, decoded_event)
-
-        # get collection
-        collection = self.connection_helper.mongo_collection('event_Supporters_AddStake')
-
-        tx_hash = parsed['hash']
-        log_index = parsed['logIndex']
-        id_event = "{0}:{1}".format(tx_hash, log_index)
-
-        d_event = dict()
-        d_event["hash"] = tx_hash
-        d_event["id_event"] = id_event
-        d_event["blockNumber"] = int(parsed["blockNumber"])
-        d_event["user"] = sanitize_address(parsed["user"]).lower()
-        d_event["subaccount"] = sanitize_address(parsed["subaccount"]).lower()
-        d_event["sender"] = sanitize_address(parsed["sender"]).lower()
-        d_event["amount"] = str(parsed["amount"])
-        d_event["mocs"] = str(parsed["mocs"])
-        d_event["createdAt"] = parsed["createdAt"]
-        d_event["lastUpdatedAt"] = datetime.datetime.now()
-
-        # remove old document with only hash as id and replace with id_event as unique id
-        remove_query = {"hash": d_event["hash"], "id_event": {"$exists": False}}
-        if collection.find(remove_query):
-            collection.delete_many(remove_query)
-
-        collection.find_one_and_update(
-            {"id_event": d_event["id_event"]},
-            {"$set": d_event},
-            upsert=True)
-
-        log.info("Event :: Supporters_AddStake {0}".format(d_event["id_event"]))
-
-        # Write to Omoc Operation collection
-        collection = self.connection_helper.mongo_collection('omoc_operations')
-        d_oper = OrderedDict()
-        d_oper["hash"] = tx_hash
-        d_oper["id_event"] = id_event
-        d_oper["blockNumber"] = int(parsed["blockNumber"])
-        d_oper["operation"] = 'Supporters_AddStake'
-        d_oper["user"] = sanitize_address(parsed["user"]).lower()
-        d_oper["subaccount"] = sanitize_address(parsed["subaccount"]).lower()
-        d_oper["sender"] = sanitize_address(parsed["sender"]).lower()
-        d_oper["amount"] = str(parsed["amount"])
-        d_oper["mocs"] = str(parsed["mocs"])
-        d_oper["createdAt"] = parsed["createdAt"]
-        d_oper["lastUpdatedAt"] = datetime.datetime.now()
-        d_oper["last_block_indexed"] = int(parsed["blockNumber"])
-
-        collection.find_one_and_update(
-            {"id_event": d_oper["id_event"]},
-            {"$set": d_oper},
-            upsert=True)
-
-        return d_event, parsed
-
-
-class EventOMOCSupportersCancelEarnings(BaseEvent):
-
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
-
-        parsed = self.parse_event(parsed_receipt, decoded_event)
-
-        # get collection
-        collection = self.connection_helper.mongo_collection('event_Supporters_CancelEarnings')
-
-        tx_hash = parsed['hash']
-        log_index = parsed['logIndex']
-        id_event = "{0}:{1}".format(tx_hash, log_index)
-
-        d_event = dict()
-        d_event["hash"] = tx_hash
-        d_event["id_event"] = id_event
-        d_event["blockNumber"] = int(parsed["blockNumber"])
-        d_event["earnings"] = str(parsed["earnings"])
-        d_event["start"] = int(parsed["start"])
-        d_event["end"] = int(parsed["end"])
-        d_event["createdAt"] = parsed["createdAt"]
-        d_event["lastUpdatedAt"] = datetime.datetime.now()
-
-        # remove old document with only hash as id and replace with id_event as unique id
-        remove_query = {"hash": d_event["hash"], "id_event": {"$exists": False}}
-        if collection.find(remove_query):
-            collection.delete_many(remove_query)
-
-        collection.find_one_and_update(
-            {"id_event": d_event["id_event"]},
-            {"$set": d_event},
-            upsert=True)
-
-        log.info("Event :: Supporters_CancelEarnings :: {0}".format(d_event["id_event"]))
-        log.info(d_event)
-
-        return d_event, parsed
-
-
-class EventOMOCSupportersPayEarnings(BaseEvent):
-
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
-
-        parsed = self.parse_event(parsed_receipt, decoded_event)
-
-        # get collection
-        collection = self.connection_helper.mongo_collection('event_Supporters_PayEarnings')
-
-        tx_hash = parsed['hash']
-        log_index = parsed['logIndex']
-        id_event = "{0}:{1}".format(tx_hash, log_index)
-
-        d_event = dict()
-        d_event["hash"] = tx_hash
-        d_event["id_event"] = id_event
-        d_event["blockNumber"] = int(parsed["blockNumber"])
-        d_event["earnings"] = str(parsed["earnings"])
-        d_event["start"] = int(parsed["start"])
-        d_event["end"] = int(parsed["end"])
-        d_event["createdAt"] = parsed["createdAt"]
-        d_event["lastUpdatedAt"] = datetime.datetime.now()
-
-        # remove old document with only hash as id and replace with id_event as unique id
-        remove_query = {"hash": d_event["hash"], "id_event": {"$exists": False}}
-        if collection.find(remove_query):
-            collection.delete_many(remove_query)
-
-        collection.find_one_and_update(
-            {"id_event": d_event["id_event"]},
-            {"$set": d_event},
-            upsert=True)
-
-        log.info("Event :: Supporters_PayEarnings :: {0}".format(d_event["id_event"]))
-        log.info(d_event)
-
-        return d_event, parsed
-
-
-class EventOMOCSupportersWithdraw(BaseEvent):
-
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
-
-        parsed = self.parse_event(parsed_receipt, decoded_event)
-
-        # get collection
-        collection = self.connection_helper.mongo_collection('event_Supporters_Withdraw')
-
-        tx_hash = parsed['hash']
-        log_index = parsed['logIndex']
-        id_event = "{0}:{1}".format(tx_hash, log_index)
-
-        d_event = dict()
-        d_event["hash"] = tx_hash
-        d_event["id_event"] = id_event
-        d_event["blockNumber"] = int(parsed["blockNumber"])
-        d_event["msgSender"] = sanitize_address(parsed["msgSender"]).lower()
-        d_event["subaccount"] = sanitize_address(parsed["subaccount"]).lower()
-        d_event["receiver"] = sanitize_address(parsed["receiver"]).lower()
-        d_event["mocs"] = str(parsed["mocs"])
-        d_event["blockNum"] = int(parsed["blockNumber"])
-        d_event["createdAt"] = parsed["createdAt"]
-        d_event["lastUpdatedAt"] = datetime.datetime.now()
-
-        # remove old document with only hash as id and replace with id_event as unique id
-        remove_query = {"hash": d_event["hash"], "id_event": {"$exists": False}}
-        if collection.find(remove_query):
-            collection.delete_many(remove_query)
-
-        collection.find_one_and_update(
-            {"id_event": d_event["id_event"]},
-            {"$set": d_event},
-            upsert=True)
-
-        log.info("Event :: Supporters_Withdraw :: {0}".format(d_event["id_event"]))
-        log.info(d_event)
-
-        # Write to Omoc Operation collection
-        collection = self.connection_helper.mongo_collection('omoc_operations')
-        d_oper = OrderedDict()
-        d_oper["hash"] = tx_hash
-        d_oper["id_event"] = id_event
-        d_oper["blockNumber"] = int(parsed["blockNumber"])
-        d_oper["operation"] = 'Supporters_Withdraw'
-        d_oper["msgSender"] = sanitize_address(parsed["msgSender"]).lower()
-        d_oper["subaccount"] = sanitize_address(parsed["subaccount"]).lower()
-        d_oper["receiver"] = sanitize_address(parsed["receiver"]).lower()
-        d_oper["amount"] = str(parsed["mocs"])
-        d_oper["mocs"] = str(parsed["mocs"])
-        d_oper["blockNum"] = int(parsed["blockNumber"])
-        d_oper["createdAt"] = parsed["createdAt"]
-        d_oper["lastUpdatedAt"] = datetime.datetime.now()
-        d_oper["last_block_indexed"] = int(parsed["blockNumber"])
-
-        collection.find_one_and_update(
-            {"id_event": d_oper["id_event"]},
-            {"$set": d_oper},
-            upsert=True)
-
-        return d_event, parsed
-
-
-class EventOMOCSupportersWithdrawStake(BaseEvent):
-
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
-
-        parsed = self.parse_event(parsed_receipt, decoded_event)
-
-        # get collection
-        collection = self.connection_helper.mongo_collection('event_Supporters_WithdrawStake')
-
-        tx_hash = parsed['hash']
-        log_index = parsed['logIndex']
-        id_event = "{0}:{1}".format(tx_hash, log_index)
-
-        d_event = dict()
-        d_event["hash"] = tx_hash
-        d_event["id_event"] = id_event
-        d_event["blockNumber"] = int(parsed["blockNumber"])
-        d_event["user"] = sanitize_address(parsed["user"]).lower()
-        d_event["subaccount"] = sanitize_address(parsed["subaccount"]).lower()
-        d_event["destination"] = sanitize_address(parsed["destination"]).lower()
-        d_event["amount"] = str(parsed["amount"])
-        d_event["mocs"] = str(parsed["mocs"])
-        d_event["createdAt"] = parsed["createdAt"]
-        d_event["lastUpdatedAt"] = datetime.datetime.now()
-
-        # remove old document with only hash as id and replace with id_event as unique id
-        remove_query = {"hash": d_event["hash"], "id_event": {"$exists": False}}
-        if collection.find(remove_query):
-            collection.delete_many(remove_query)
-
-        collection.find_one_and_update(
-            {"id_event": d_event["id_event"]},
-            {"$set": d_event},
-            upsert=True)
-
-        log.info("Event :: Supporters_WithdrawStake :: {0}".format(d_event["id_event"]))
-        log.info(d_event)
-
-        # Write to Omoc Operation collection
-        collection = self.connection_helper.mongo_collection('omoc_operations')
-        d_oper = OrderedDict()
-        d_oper["hash"] = tx_hash
-        d_oper["id_event"] = id_event
-        d_oper["blockNumber"] = int(parsed["blockNumber"])
-        d_oper["operation"] = 'Supporters_WithdrawStake'
-        d_oper["user"] = sanitize_address(parsed["user"]).lower()
-        d_oper["subaccount"] = sanitize_address(parsed["subaccount"]).lower()
-        d_oper["destination"] = sanitize_address(parsed["destination"]).lower()
-        d_oper["amount"] = str(parsed["amount"])
-        d_oper["mocs"] = str(parsed["mocs"])
-        d_oper["createdAt"] = parsed["createdAt"]
-        d_oper["lastUpdatedAt"] = datetime.datetime.now()
-        d_oper["last_block_indexed"] = int(parsed["blockNumber"])
-
-        collection.find_one_and_update(
-            {"id_event": d_oper["id_event"]},
-            {"$set": d_oper},
-            upsert=True)
-
-        return d_event, parsed
-
-
-class EventOMOCVotingMachineVoteEvent(BaseEvent):
-
-    def parse_event_and_save(self, parsed_receipt, decoded_event):
-
-        parsed = self.parse_event(parsed_receipt, decoded_event)
-
-        # get collection
-        collection = self.connection_helper.mongo_collection('event_VotingMachine_VoteEvent')
-
-        tx_hash = parsed['hash']
-        log_index = parsed['logIndex']
-        id_event = "{0}:{1}".format(tx_hash, log_index)
-
-        d_event = dict()
-        d_event["hash"] = tx_hash
-        d_event["id_event"] = id_event
-        d_event["blockNumber"] = int(parsed["blockNumber"])
-        d_event["user"] = sanitize_address(parsed["user"]).lower()
-        d_event["subaccount"] = sanitize_address(parsed["subaccount"]).lower()
-        d_event["destination"] = sanitize_address(parsed["destination"]).lower()
-        d_event["amount"] = str(parsed["amount"])
-        d_event["mocs"] = str(parsed["mocs"])
-        d_event["createdAt"] = parsed["createdAt"]
-        d_event["lastUpdatedAt"] = datetime.datetime.now()
-
-        # remove old document with only hash as id
-        remove_query = {"hash": d_event["hash"], "id_event": {"$exists": False}}
-        if collection.find(remove_query):
-            collection.delete_many(remove_query)
-
-        collection.find_one_and_update(
-            {"id_event": d_event["id_event"]},
-            {"$set": d_event},
-            upsert=True)
-
-        log.info("Event :: VotingMachine_VoteEvent :: {0}".format(d_event["id_event"]))
-        log.info(d_event)
-
-        return d_event, parsed
+        return d_tx, parsed
@@ -0,0 +1,167 @@
+import threading
+import time
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import PyMongoError
+
+from .logger import log
+from .event_schemas import EVENT_SCHEMAS
+
+
+# events collections with hand written handlers (events.py)
+HANDLER_EVENT_COLLECTIONS = [
+    'event_MocQueue_OperationQueued',
+    'event_MocQueue_OperationError',
+    'event_MocQueue_UnhandledError'
+]
+
+# upsert key, unique only on the documents that have it (legacy documents without id_event)
+ID_EVENT_UNIQUE = dict(unique=True, partial_filter={'id_event': {'$exists': True}})
+
+
+def index_entry(collection, keys, unique=False, partial_filter=None):
+
+    return dict(collection=collection, keys=keys, unique=unique, partial_filter=partial_filter)
+
+
+def event_indexes(collection):
+    """ Upsert by id_event and legacy cleanup by hash """
+
+    return [
+        index_entry(collection, [('id_event', ASCENDING)], **ID_EVENT_UNIQUE),
+        index_entry(collection, [('hash', ASCENDING)])
+    ]
+
+
+class IndexCatalog:
+    """ Declarative list of the indexes of every collection the indexer writes
+
+    Reconciled at startup in a background thread: missing indexes are created,
+    indexes not in the catalog and indexes without use ($indexStats) are reported.
+    """
+
+    def __init__(self, options, connection_helper):
+        self.options = options
+        self.connection_helper = connection_helper
+
+    def event_collections(self):
+        """ Events collections of the schemas, the handlers and the ones already in the db """
+
+        db = self.connection_helper.m_client[self.options['mongo']['db']]
+        collections = set(schema['collection'] for schema in EVENT_SCHEMAS.values())
+        collections.update(HANDLER_EVENT_COLLECTIONS)
+        collections.update(name for name in db.list_collection_names() if name.startswith('event_'))
+
+        return sorted(collections)
+
+    def catalog(self):
+
+        indexes = [
+            # Operations: upsert by operId_ (queue), id_event (Transfer) and hash (revert)
+            index_entry('operations', [('operId_', DESCENDING)]),
+            index_entry('operations', [('createdAt', DESCENDING)]),
+            index_entry('operations', [('hash', ASCENDING)]),
+            index_entry('operations', [('id_event', ASCENDING)], **ID_EVENT_UNIQUE),
+            # due time of the pending operations (status scanner), only executed not confirmed
+            index_entry('operations',
+                        [('confirmationTime', ASCENDING), ('blockNumber', ASCENDING), ('createdAt', ASCENDING)],
+                        partial_filter={'status': {'$gte': 1}}),
+
+            # dapp queries of the operations of an account
+            index_entry('operations', [('params.sender', ASCENDING), ('createdAt', DESCENDING)]),
+            index_entry('operations', [('params.recipient', ASCENDING), ('createdAt', DESCENDING)]),
+
+            # Operations by account read model, upsert by (account, key) and page by account
+            index_entry('account_operations', [('account', ASCENDING), ('key', ASCENDING)], unique=True),
+            index_entry('account_operations', [('account', ASCENDING), ('createdAt', DESCENDING)]),
+
+            # Raw transactions: upsert by (hash, blockNumber), logs watermark and backlog queries
+            index_entry('raw_transactions', [('blockNumber', ASCENDING), ('hash', ASCENDING)]),
+            index_entry('raw_transactions', [('blockNumber', ASCENDING), ('transactionIndex', ASCENDING)]),
+            index_entry('raw_transactions', [('processed', ASCENDING), ('blockNumber', ASCENDING)]),
+
+            # FastBtc bridge transfers, upsert by transferId
+            index_entry('FastBtcBridge', [('transferId', ASCENDING)], unique=True),
+
+            # OMOC operations, upsert by id_event
+            index_entry('omoc_operations', [('id_event', ASCENDING)], **ID_EVENT_UNIQUE)
+        ]
+
+        # Operations enrichment jobs, upsert by operId_ read by blockNumber
+        if 'enrich_operations' in self.options['tasks']:
+            indexes.append(index_entry('operations_enrichment', [('operId_', ASCENDING)], unique=True))
+            indexes.append(index_entry('operations_enrichment', [('blockNumber', ASCENDING)]))
+
+        for collection in self.event_collections():
+            indexes.extend(event_indexes(collection))
+
+        return indexes
+
+    def create_missing(self, collection, entries):
+        """ Create the entries not in the collection, return the key specs of the catalog """
+
+        existing = [info['key'] for info in collection.index_information().values()]
+
+        wanted = list()
+        for entry in entries:
+            keys = [tuple(key) for key in entry['keys']]
+            wanted.append(keys)
+            if keys in existing:
+                continue
+
+            log.warning("[Index Catalog] Missing index {0} {1} creating...".format(collection.name, keys))
+            try:
+                self.connection_helper.create_index(collection.name, keys,
+                                                    unique=entry['unique'],
+                                                    partial_filter=entry['partial_filter'])
+            except PyMongoError as e:
+                log.error("[Index Catalog] Cannot create index {0} {1}: {2}".format(collection.name, keys, e))
+
+        return wanted
+
+    @staticmethod
+    def report_unused(collection, wanted):
+        """ Indexes not in the catalog and indexes without any use since the server started """
+
+        try:
+            stats = list(collection.aggregate([{"$indexStats": {}}]))
+        except PyMongoError as e:
+            log.info("[Index Catalog] No index stats for {0}: {1}".format(collection.name, e))
+            return
+
+        for stat in stats:
+            if stat['name'] == '_id_':
+                continue
+            keys = [tuple(key) for key in stat['key'].items()]
+            if keys not in wanted:
+                log.warning("[Index Catalog] Index not in catalog {0} {1}".format(collection.name, stat['name']))
+            elif stat['accesses']['ops'] == 0:
+                log.info("[Index Catalog] Unused index {0} {1} since {2}".format(
+                    collection.name, stat['name'], stat['accesses']['since']))
+
+    def reconcile(self):
+
+        start_time = time.time()
+
+        by_collection = dict()
+        for entry in self.catalog():
+            by_collection.setdefault(entry['collection'], []).append(entry)
+
+        for collection_name, entries in by_collection.items():
+            collection = self.connection_helper.mongo_collection(collection_name)
+            try:
+                wanted = self.create_missing(collection, entries)
+                self.report_unused(collection, wanted)
+            except PyMongoError as e:
+                log.error("[Index Catalog] Cannot reconcile {0}: {1}".format(collection_name, e))
+
+        duration = time.time() - start_time
+        log.info("[Index Catalog] Done! Collections: [{0}] in [{1} seconds]".format(len(by_collection), duration))
+
+    def start(self):
+        """ Reconcile in background, the tasks don't wait for the index builds """
+
+        thread = threading.Thread(target=self.reconcile, name='index_catalog', daemon=True)
+        thread.start()
+
+        return thread
@@ -0,0 +1,79 @@
+import threading
+import time
+
+
+class IndexerState:
+    """ In-process cache of the moc_indexer document shared by all the scanners.
+
+    Reads are served from memory and refreshed from mongo every refresh_interval
+    seconds or when asked to. Writes go to mongo and to the cache at the same time.
+    """
+
+    def __init__(self, connection_helper, refresh_interval=5):
+        self.connection_helper = connection_helper
+        self.refresh_interval = refresh_interval
+        self.lock = threading.Lock()
+        self.state = dict()
+        self.last_refresh = None
+        # counter of the local writes, and the write version of each field
+        self.version = 0
+        self.field_versions = dict()
+
+    @property
+    def expired(self):
+        if self.last_refresh is None:
+            return True
+
+        return time.monotonic() - self.last_refresh >= self.refresh_interval
+
+    def refresh(self):
+        """ Read again the indexer document from mongo
+
+        Fields written locally while the document was being read are kept, the
+        read may be older than them.
+        """
+
+        with self.lock:
+            read_version = self.version
+
+        collection_moc_indexer = self.connection_helper.mongo_collection('moc_indexer')
+        moc_index = collection_moc_indexer.find_one(sort=[("updatedAt", -1)])
+
+        with self.lock:
+            state = dict(moc_index) if moc_index else dict()
+            for key, version in self.field_versions.items():
+                if version > read_version and key in self.state:
+                    state[key] = self.state[key]
+            self.state = state
+            self.last_refresh = time.monotonic()
+
+    def get(self, key, default=None, refresh=False):
+
+        if refresh or self.expired:
+            self.refresh()
+
+        with self.lock:
+            return self.state.get(key, default)
+
+    def update(self, fields):
+        """ Write fields to the indexer document and to the cache """
+
+        collection_moc_indexer = self.connection_helper.mongo_collection('moc_indexer')
+        collection_moc_indexer.update_one({},
+                                          {'$set': fields},
+                                          upsert=True)
+
+        with self.lock:
+            self.version += 1
+            for key in fields:
+                self.field_versions[key] = self.version
+            self.state.update(fields)
+
+    def last_block_info(self):
+        """ Last block number and timestamp seen by the raw scanner, None if not yet """
+
+        last_block_number = self.get('last_block_number')
+        if last_block_number is None:
+            return None
+
+        return last_block_number, self.get('last_block_ts')
@@ -1,9 +1,130 @@
+import atexit
+import collections
+import json
+import queue
+import threading
 import logging
 import logging.config
+import logging.handlers
 
 
-logging.basicConfig(level=logging.INFO,
-                    format='%(asctime)s %(name)-12s %(levelname)-8s %(message)s',
-                    datefmt='%Y-%m-%d %H:%M:%S')
+LOG_FORMAT = '%(asctime)s %(name)-12s %(levelname)-8s %(message)s'
+LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class JsonFormatter(logging.Formatter):
+    """ One json document per line, extra fields of the record included """
+
+    RESERVED = frozenset(logging.LogRecord(
+        '', 0, '', 0, '', (), None).__dict__) | {'message', 'asctime'}
+
+    def format(self, record):
+
+        d_record = dict(
+            time=self.formatTime(record, self.datefmt),
+            logger=record.name,
+            level=record.levelname,
+            message=record.getMessage())
+        for key, value in record.__dict__.items():
+            if key not in self.RESERVED:
+                d_record[key] = value
+        if record.exc_info:
+            d_record['exc_info'] = self.formatException(record.exc_info)
+
+        return json.dumps(d_record, default=str)
+
+
+class SampleFilter(logging.Filter):
+    """ Let pass 1 of every `rate` records of the same call site (logger, line)
+
+    Keyed by call site and not by message, many messages are formatted before
+    logging. At most `max_sites` counters, the least recently used is dropped.
+    """
+
+    def __init__(self, rate, max_sites=1000):
+        logging.Filter.__init__(self)
+        self.rate = max(int(rate), 1)
+        self.max_sites = max_sites
+        self.counters = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+
+        if record.levelno >= logging.WARNING:
+            return True
+
+        site = (record.name, record.pathname, record.lineno)
+        with self.lock:
+            count = self.counters.pop(site, 0)
+            self.counters[site] = count + 1
+            if len(self.counters) > self.max_sites:
+                self.counters.popitem(last=False)
+
+        return count % self.rate == 0
+
+
+class LocalQueueHandler(logging.handlers.QueueHandler):
+    """ Queue handler for an in-process queue
+
+    The record is queued as is, message formatting and I/O happen in the
+    listener thread, not in the caller.
+    """
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # never block the indexer for a log line
+            pass
+
+
+log_queue = queue.Queue(maxsize=100000)
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(logging.Formatter(fmt=LOG_FORMAT, datefmt=LOG_DATE_FORMAT))
+log_listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+
+logging.basicConfig(level=logging.INFO, handlers=[LocalQueueHandler(log_queue)])
+log_listener.start()
+atexit.register(log_listener.stop)
 
 log = logging.getLogger('default')
+
+
+def get_logger(component):
+    """ Logger of the component (child of default, ex. default.events),
+    level and sampling set in config """
+
+    return logging.getLogger('default.{0}'.format(component))
+
+
+def configure_logging(options):
+    """ Apply config 'logging' section
+
+    "logging": {
+        "level": "INFO",
+        "json": false,
+        "levels": {"events": "DEBUG", "scan_raw": "WARNING"},
+        "sampling": {"events": 100}
+    }
+    """
+
+    log_options = options.get('logging', {})
+
+    logging.getLogger().setLevel(log_options.get('level', 'INFO'))
+
+    if log_options.get('json', False):
+        stream_handler.setFormatter(JsonFormatter(datefmt=LOG_DATE_FORMAT))
+
+    for component, level in log_options.get('levels', {}).items():
+        get_logger(component).setLevel(level)
+
+    for component, rate in log_options.get('sampling', {}).items():
+        component_log = get_logger(component)
+        for log_filter in list(component_log.filters):
+            if isinstance(log_filter, SampleFilter):
+                component_log.removeFilter(log_filter)
+        if rate > 1:
+            component_log.addFilter(SampleFilter(rate))
@@ -0,0 +1,289 @@
+import datetime
+import os
+import time
+
+from pymongo import DeleteOne, UpdateOne
+from eth_utils import event_abi_to_log_topic
+
+from .base.mongo import mongo_manager
+from .logger import log
+from .events import TRANSFER_TOPIC
+from .base.decoder import to_bytes
+from .base.address import address_lower
+from .base.abi_registry import abi_registry
+from .account_operations import account_operation_updates, operation_accounts, \
+    COLLECTION_NAME as ACCOUNT_OPERATIONS
+
+
+ABI_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'abi')
+
+# version 1: every document in event_* collections and Transfer in operations has id_event
+ID_EVENT_SCHEMA_VERSION = 1
+# version 2: account_operations built from the existing operations
+SCHEMA_VERSION = 2
+
+
+class Migrations:
+    """ Offline migrations of the indexer database, run with app_run_migrations.py """
+
+    def __init__(self, config, batch_size=1000):
+        self.config = config
+        self.batch_size = batch_size
+
+        mongo_manager.set_connection(uri=self.config['mongo']['uri'], db=self.config['mongo']['db'])
+        self.m_client = mongo_manager.connect()
+
+        # (contract name, event name) -> topics
+        self.topics = dict()
+
+    def mongo_collection(self, collection_name):
+
+        return mongo_manager.get_collection(self.m_client, collection_name)
+
+    def schema_version(self):
+
+        moc_index = self.mongo_collection('moc_indexer').find_one(sort=[("updatedAt", -1)])
+        if moc_index:
+            return moc_index.get('schema_version', 0)
+
+        return 0
+
+    def legacy_collections(self):
+        """ Collections written with the legacy hash only id: event_* and operations (Transfer) """
+
+        db = self.m_client[self.config['mongo']['db']]
+        legacy_query = {"hash": {"$exists": True}, "id_event": {"$exists": False}}
+        collections = [(name, legacy_query)
+                       for name in sorted(db.list_collection_names()) if name.startswith('event_')]
+        collections.append(('operations', dict(legacy_query, operation='Transfer')))
+
+        return collections
+
+    def event_topics(self, contract_name, event_name):
+        """ topic0 of the event in the ABIs of the contract (every app flavor) """
+
+        key = (contract_name, event_name)
+        if key not in self.topics:
+            topics = set()
+            abi_file_name = '{0}.abi'.format(contract_name)
+            for dir_path, _, file_names in os.walk(ABI_PATH):
+                if abi_file_name not in file_names:
+                    continue
+                for item in abi_registry.load_abi_file(os.path.join(dir_path, abi_file_name)):
+                    if item.get('type') == 'event' and item.get('name') == event_name:
+                        topics.add(bytes(event_abi_to_log_topic(item)))
+            self.topics[key] = topics
+
+        return self.topics[key]
+
+    def contract_addresses(self, contract_name):
+        """ Addresses of the contract from config, None if not in config (OMOC, got from the registry) """
+
+        addresses = self.config['addresses'].get(contract_name)
+        if not addresses:
+            return None
+        if isinstance(addresses, str):
+            addresses = [addresses]
+
+        return set(address_lower(address) for address in addresses)
+
+    def legacy_event(self, collection_name):
+        """ (topics, addresses) of the logs the documents of the collection come from """
+
+        if collection_name == 'operations':
+            # Transfer of the tokens
+            addresses = set()
+            for token_name in ('TC', 'TP', 'CA', 'FeeToken'):
+                addresses.update(self.contract_addresses(token_name) or set())
+            return {TRANSFER_TOPIC}, addresses
+
+        _, contract_name, event_name = collection_name.split('_', 2)
+
+        return self.event_topics(contract_name, event_name), self.contract_addresses(contract_name)
+
+    @staticmethod
+    def transfer_matches(doc, tx_log):
+        """ Same sender and recipient of the Transfer operation """
+
+        d_params = doc.get('params') or dict()
+        for topic, address in zip(tx_log['topics'][1:3], (d_params.get('sender'), d_params.get('recipient'))):
+            if address and to_bytes(topic)[-20:] != to_bytes(address):
+                return False
+
+        return True
+
+    def recover_log_index(self, collection_name, doc, tx_logs):
+        """ logIndex of the only log of the tx matching the event address and topic, None if not
+        exactly one """
+
+        topics, addresses = self.legacy_event(collection_name)
+
+        candidates = list()
+        for tx_log in tx_logs:
+            if not tx_log['topics'] or to_bytes(tx_log['topics'][0]) not in topics:
+                continue
+            if addresses is not None and address_lower(tx_log['address']) not in addresses:
+                continue
+            if collection_name == 'operations' and not self.transfer_matches(doc, tx_log):
+                continue
+            candidates.append(tx_log)
+
+        if len(candidates) != 1:
+            return None
+
+        return candidates[0]['logIndex']
+
+    def raw_transactions_logs(self, legacy_docs):
+        """ (hash, blockNumber) -> logs of the raw transactions of the documents """
+
+        hashes = list(set(doc['hash'] for doc in legacy_docs))
+        raw_logs = dict()
+        for raw_tx in self.mongo_collection('raw_transactions').find(
+                {"hash": {"$in": hashes}},
+                projection={"hash": 1, "blockNumber": 1, "logs": 1}):
+            raw_logs[(raw_tx['hash'], raw_tx['blockNumber'])] = raw_tx.get('logs') or list()
+            raw_logs.setdefault(raw_tx['hash'], raw_tx.get('logs') or list())
+
+        return raw_logs
+
+    @staticmethod
+    def fallback_id_event(doc):
+        """ Deterministic id of a legacy document whose logIndex cannot be recovered """
+
+        return "{0}:legacy:{1}".format(doc['hash'], doc['_id'])
+
+    def migrate_legacy_batch(self, collection, legacy_docs):
+        """ Set id_event "hash:logIndex" on the legacy documents, with the logIndex recovered from the logs
+        of raw_transactions. Documents already replaced by the one with the same id_event are deleted.
+        The ones without exactly one matching log (raw tx or logs not found, OMOC contracts without
+        address in config, identical logs in the tx) keep their data with a fallback id_event
+        "hash:legacy:_id" and legacy_unrecovered: True """
+
+        raw_logs = self.raw_transactions_logs(legacy_docs)
+
+        recovered = dict()
+        for doc in legacy_docs:
+            tx_logs = raw_logs.get((doc['hash'], doc.get('blockNumber')), raw_logs.get(doc['hash'], list()))
+            log_index = self.recover_log_index(collection.name, doc, tx_logs)
+            if log_index is not None:
+                recovered[doc['_id']] = "{0}:{1}".format(doc['hash'], log_index)
+
+        # already written again with id_event, ex. the tx was reprocessed
+        replaced = set(collection.distinct('id_event', {"id_event": {"$in": list(recovered.values())}}))
+
+        requests = list()
+        assigned = set()
+        deleted = 0
+        unrecovered = 0
+        for doc in legacy_docs:
+            id_event = recovered.get(doc['_id'])
+            if id_event in replaced:
+                requests.append(DeleteOne({"_id": doc["_id"]}))
+                deleted += 1
+                continue
+
+            d_set = {"id_event": id_event}
+            if id_event is None or id_event in assigned:
+                d_set = {"id_event": self.fallback_id_event(doc), "legacy_unrecovered": True}
+                unrecovered += 1
+            assigned.add(d_set["id_event"])
+            requests.append(UpdateOne({"_id": doc["_id"]}, {"$set": d_set}))
+
+        if requests:
+            collection.bulk_write(requests, ordered=False)
+
+        return deleted, len(requests) - deleted - unrecovered, unrecovered
+
+    def migrate_legacy_id_event(self):
+        """ Convert all the legacy documents, so the handlers don't need the cleanup any more,
+        return the number of documents not converted """
+
+        remaining = 0
+        for collection_name, legacy_query in self.legacy_collections():
+            collection = self.mongo_collection(collection_name)
+
+            deleted = 0
+            updated = 0
+            unrecovered = 0
+            while True:
+                legacy_docs = list(collection.find(
+                    legacy_query,
+                    projection={"hash": 1, "blockNumber": 1, "params.sender": 1, "params.recipient": 1},
+                    limit=self.batch_size))
+                if not legacy_docs:
+                    break
+
+                batch_deleted, batch_updated, batch_unrecovered = self.migrate_legacy_batch(collection, legacy_docs)
+                deleted += batch_deleted
+                updated += batch_updated
+                unrecovered += batch_unrecovered
+
+            if deleted or updated or unrecovered:
+                log.info("[Migrations] {0} Legacy documents deleted (replaced): [{1}] updated: [{2}]".format(
+                    collection_name, deleted, updated))
+            if unrecovered:
+                log.warning("[Migrations] {0} Legacy documents without logIndex, kept with "
+                            "legacy_unrecovered: [{1}]".format(collection_name, unrecovered))
+
+            remaining += collection.count_documents(legacy_query)
+
+        return remaining
+
+    def migrate_account_operations(self):
+        """ Entries in account_operations of the operations indexed before the read model """
+
+        collection = self.mongo_collection('operations')
+        collection_accounts = self.mongo_collection(ACCOUNT_OPERATIONS)
+
+        written = 0
+        last_id = None
+        while True:
+            query = {"_id": {"$gt": last_id}} if last_id else {}
+            operations = list(collection.find(
+                query,
+                projection={"operId_": 1, "id_event": 1, "hash": 1, "operation": 1, "blockNumber": 1,
+                            "createdAt": 1, "params.sender": 1, "params.recipient": 1,
+                            "executed.sender_": 1, "executed.recipient_": 1},
+                sort=[("_id", 1)],
+                limit=self.batch_size))
+            if not operations:
+                break
+            last_id = operations[-1]["_id"]
+
+            requests = list()
+            for d_oper in operations:
+                for query, update in account_operation_updates(d_oper, operation_accounts(d_oper), replace=True):
+                    requests.append(UpdateOne(query, update, upsert=True))
+            if requests:
+                collection_accounts.bulk_write(requests, ordered=False)
+                written += len(requests)
+
+        log.info("[Migrations] account_operations entries written: [{0}]".format(written))
+
+    def run(self):
+
+        start_time = time.time()
+
+        schema_version = self.schema_version()
+        if schema_version >= SCHEMA_VERSION:
+            log.info("[Migrations] Database already in schema version [{0}]".format(schema_version))
+            return
+
+        log.info("[Migrations] Migrating from schema version [{0}] to [{1}]".format(schema_version, SCHEMA_VERSION))
+
+        if schema_version < ID_EVENT_SCHEMA_VERSION:
+            remaining = self.migrate_legacy_id_event()
+            if remaining:
+                log.error("[Migrations] Legacy documents not converted: [{0}], schema version not changed, "
+                          "run the migrations again".format(remaining))
+                return
+
+        self.migrate_account_operations()
+
+        self.mongo_collection('moc_indexer').update_one({},
+                                                       {'$set': {'schema_version': SCHEMA_VERSION,
+                                                                 'updatedAt': datetime.datetime.now()}},
+                                                       upsert=True)
+
+        duration = time.time() - start_time
+        log.info("[Migrations] Done! Schema version [{0}] in [{1} seconds]".format(SCHEMA_VERSION, duration))
@@ -0,0 +1,49 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class PartitionedExecutor:
+    """ Run jobs concurrently across partitions keeping the order inside each partition.
+
+    A job is a tuple (partition key, function, args). Jobs with the same key run
+    one after the other in the given order, different keys run in parallel.
+    """
+
+    def __init__(self, max_workers=1):
+        self.max_workers = max_workers
+        self.pool = None
+        if self.max_workers > 1:
+            self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='partition')
+
+    @staticmethod
+    def run_partition(jobs):
+        for func, args in jobs:
+            func(*args)
+
+    def run(self, jobs):
+
+        if not self.pool:
+            # sequential, same order as given
+            self.run_partition([(func, args) for _, func, args in jobs])
+            return
+
+        partitions = OrderedDict()
+        for key, func, args in jobs:
+            partitions.setdefault(key, list()).append((func, args))
+
+        if len(partitions) <= 1:
+            for partition_jobs in partitions.values():
+                self.run_partition(partition_jobs)
+            return
+
+        futures = [self.pool.submit(self.run_partition, partition_jobs)
+                   for partition_jobs in partitions.values()]
+
+        # wait all and then raise the first error if any
+        wait(futures)
+        for future in futures:
+            future.result()
+
+    def shutdown(self):
+        if self.pool:
+            self.pool.shutdown(wait=True)
@@ -1,44 +1,33 @@
 import time
 import datetime
+import multiprocessing
 from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from web3 import Web3
+from pymongo.errors import PyMongoError
 
-from .logger import log
-from .events import EventMocQueueTCMinted, \
-    EventMocQueueTCRedeemed, \
-    EventMocQueueTPMinted, \
-    EventMocQueueTPRedeemed, \
-    EventMocQueueTPSwappedForTP, \
-    EventMocQueueTPSwappedForTC, \
-    EventMocQueueTCSwappedForTP, \
-    EventMocQueueTCandTPRedeemed, \
-    EventMocQueueTCandTPMinted, \
-    EventTokenTransfer, \
+from .logger import get_logger, configure_logging
+from .events import EventTokenTransfer, \
     EventFastBtcBridgeNewBitcoinTransfer, \
     EventFastBtcBridgeBitcoinTransferStatusUpdated, \
     EventMocQueueOperationError, \
     EventMocQueueUnhandledError, \
     EventMocQueueOperationQueued, \
-    EventMocQueueOperationExecuted, \
-    EventMocLiqTPRedeemed, \
-    EventMocSuccessFeeDistributed, \
-    EventMocSettlementExecuted, \
-    EventMocTCInterestPayment, \
-    EventMocTPemaUpdated, \
-    EventOMOCIncentiveV2ClaimOK, \
-    EventOMOCVestingFactoryVestingCreated, \
-    EventOMOCDelayMachinePaymentCancel, \
-    EventOMOCDelayMachinePaymentDeposit, \
-    EventOMOCDelayMachinePaymentWithdraw, \
-    EventOMOCSupportersAddStake, \
-    EventOMOCSupportersCancelEarnings, \
-    EventOMOCSupportersPayEarnings, \
-    EventOMOCSupportersWithdraw, \
-    EventOMOCSupportersWithdrawStake, \
-    EventOMOCVotingMachineVoteEvent
-
-
-from .base.decoder import LogDecoder, UnknownEvent
+    SchemaEvent, \
+    oper_id_to_int
+from .event_schemas import EVENT_SCHEMAS
+
+
+from .partitioned_executor import PartitionedExecutor
+from .unit_of_work import UnitOfWork, IntentsRecorder
+from .migrations import ID_EVENT_SCHEMA_VERSION
+from .base.decoder import UnknownEvent, EventError, decode_logs_batch
+from .base.abi_registry import abi_registry
+from .base.address import address_lower
+from .account_operations import write_account_operations
+
+
+log = get_logger('scan_logs')
 
 
 class ScanLogsTransactions:
@@ -47,15 +36,27 @@ class ScanLogsTransactions:
     def __init__(self,
                  options,
                  connection_helper,
+                 indexer_state,
                  contracts_loaded,
                  contracts_addresses,
                  filter_contracts_addresses):
         self.options = options
         self.connection_helper = connection_helper
+        self.indexer_state = indexer_state
         self.contracts_loaded = contracts_loaded
         self.contracts_addresses = contracts_addresses
         self.filter_contracts_addresses = filter_contracts_addresses
         self.confirm_blocks = self.options['scan_logs']['confirm_blocks']
+        self.batch_size = self.options['scan_logs'].get('batch_size', 1000)
+
+        # optional mode following inserts in raw_transactions with a change stream (needs replica set)
+        self.change_stream_enabled = self.options['scan_logs'].get('change_stream', False)
+        self.change_stream_seconds = self.options['scan_logs'].get('change_stream_seconds', 60)
+        self.change_stream = None
+        self.change_stream_token = None
+
+        # events are processed in parallel by partition: operId_, transferId or contract
+        self.executor = PartitionedExecutor(max_workers=self.options['scan_logs'].get('workers', 1))
 
         # init log decoder
         self.contracts_log_decoder = self.init_log_decoder()
@@ -69,119 +70,164 @@ class ScanLogsTransactions:
             confirm_blocks=self.confirm_blocks
         )
 
+        self.init_handlers()
+
+        # optional process pool to decode and build the documents, for history reprocessing
+        self.process_pool = None
+        self.process_chunk_size = self.options['scan_logs'].get('process_chunk_size', 100)
+        process_workers = self.options['scan_logs'].get('process_workers', 0)
+        if process_workers > 1:
+            self.process_pool = self.init_process_pool(process_workers)
+
+    def shutdown(self):
+        """ Stop the worker threads, the pool processes and the change stream """
+
+        self.close_change_stream()
+        self.executor.shutdown()
+        if self.process_pool:
+            self.process_pool.shutdown(wait=True, cancel_futures=True)
+            self.process_pool = None
+
+    def init_handlers(self):
+
         self.map_events_contracts = self.map_events()
 
-    def init_log_decoder(self):
+        # token contracts with the Transfer fast path
+        self.transfer_handlers = dict(
+            (address, handlers['Transfer']) for address, handlers in self.map_events_contracts.items()
+            if isinstance(handlers.get('Transfer'), EventTokenTransfer))
 
-        contracts_log_decoder = dict()
-        contracts_log_decoder[self.contracts_addresses['Moc'].lower()] = LogDecoder(
-            self.contracts_loaded['Moc'].sc
-        )
+    def init_process_pool(self, process_workers):
+        """ Pool processes get the topic tables once at start, the node and mongo stay in this process """
 
-        contracts_log_decoder[self.contracts_addresses['MocQueue'].lower()] = LogDecoder(
-            self.contracts_loaded['MocQueue'].sc
-        )
+        handler_queued = self.map_events_contracts[self.contracts_addresses['MocQueue']]['OperationQueued']
+        if not handler_queued.enrich_deferred:
+            # the params of the queued operations are read from the node
+            log.warning("[2. Scan Events Txs] Process pool needs the enrich_operations task, disabled")
+            return
 
-        contracts_log_decoder[self.contracts_addresses['TC'].lower()] = LogDecoder(
-            self.contracts_loaded['TC'].sc
-        )
+        address_abis = dict((address, decoder.event_abis) for address, decoder in self.contracts_log_decoder.items())
 
-        i = 0
-        for t_pegged in self.options['addresses']['TP']:
-            contracts_log_decoder[t_pegged.lower()] = LogDecoder(
-                self.contracts_loaded['TP'][i].sc
-            )
-            i += 1
+        return ProcessPoolExecutor(
+            max_workers=process_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_process_worker,
+            initargs=(self.options,
+                      list(self.contracts_loaded),
+                      self.contracts_addresses,
+                      self.filter_contracts_addresses,
+                      address_abis))
 
-        i = 0
-        for c_asset in self.options['addresses']['CA']:
-            contracts_log_decoder[c_asset.lower()] = LogDecoder(
-                self.contracts_loaded['CA'][i].sc
-            )
-            i += 1
+    @classmethod
+    def process_worker(cls, options, contracts_names, contracts_addresses, filter_contracts_addresses, address_abis):
+        """ Logs scanner of a pool process: decode and build the documents, without node or mongo """
+
+        self = cls.__new__(cls)
+        self.options = options
+        self.connection_helper = None
+        self.indexer_state = None
+        self.contracts_loaded = dict.fromkeys(contracts_names)
+        self.contracts_addresses = contracts_addresses
+        self.filter_contracts_addresses = filter_contracts_addresses
+        self.confirm_blocks = self.options['scan_logs']['confirm_blocks']
+        self.contracts_log_decoder = dict(
+            (address, abi_registry.log_decoder(abi)) for address, abi in address_abis.items())
+        self.block_info = dict()
+        self.init_handlers()
+
+        return self
+
+    def worker_batch(self, raw_txs, block_info, legacy_cleanup):
+        """ Run in the pool process, the writes of the raw txs in order """
+
+        # update in place, the events share this dict
+        self.block_info.update(block_info)
+
+        uow = IntentsRecorder(legacy_cleanup=legacy_cleanup)
+        for _, func, args in self.batch_jobs(raw_txs, uow):
+            func(*args)
+
+        return uow.records()
+
+    def run_txs_processes(self, raw_txs, uow):
+        """ Chunks of raw txs to the pool processes, their writes merged in the original order """
+
+        futures = list()
+        for i in range(0, len(raw_txs), self.process_chunk_size):
+            futures.append(self.process_pool.submit(
+                run_process_worker_batch,
+                raw_txs[i:i + self.process_chunk_size],
+                dict(self.block_info),
+                uow.legacy_cleanup))
+
+        for future in futures:
+            intents, operation_writes = future.result()
+            uow.merge(intents, operation_writes)
+
+    def run_txs(self, raw_txs, uow):
+        """ Process the events of the raw txs registering the writes in the unit of work """
+
+        if self.process_pool:
+            self.run_txs_processes(raw_txs, uow)
+            return
+
+        jobs = self.batch_jobs(raw_txs, uow)
+        self.prefetch_jobs(jobs)
+
+        # process partitions concurrently keeping the order of each one
+        self.executor.run(jobs)
+
+    def log_decoder_contracts(self):
+        """ (address, contract) of the contracts with events to decode """
+
+        contracts = list()
+        contracts.append((self.contracts_addresses['Moc'], self.contracts_loaded['Moc']))
+        contracts.append((self.contracts_addresses['MocQueue'], self.contracts_loaded['MocQueue']))
+        contracts.append((self.contracts_addresses['TC'], self.contracts_loaded['TC']))
+
+        for t_pegged, contract in zip(self.options['addresses']['TP'], self.contracts_loaded['TP']):
+            contracts.append((t_pegged, contract))
+
+        for c_asset, contract in zip(self.options['addresses']['CA'], self.contracts_loaded['CA']):
+            contracts.append((c_asset, contract))
 
         if 'FeeToken' in self.options['addresses']:
-            contracts_log_decoder[self.contracts_addresses['FeeToken'].lower()] = LogDecoder(
-                self.contracts_loaded['FeeToken'].sc
-            )
+            contracts.append((self.contracts_addresses['FeeToken'], self.contracts_loaded['FeeToken']))
 
-        contracts_log_decoder[self.options['addresses']['FastBtcBridge'].lower()] = LogDecoder(
-            self.contracts_loaded['FastBtcBridge'].sc
-        )
+        contracts.append((self.options['addresses']['FastBtcBridge'], self.contracts_loaded['FastBtcBridge']))
 
         if 'IncentiveV2' in self.contracts_loaded:
-            contracts_log_decoder[self.contracts_addresses['IncentiveV2'].lower()] = LogDecoder(
-                self.contracts_loaded['IncentiveV2'].sc
-            )
+            contracts.append((self.contracts_addresses['IncentiveV2'], self.contracts_loaded['IncentiveV2']))
 
-        contracts_log_decoder[self.contracts_addresses['VestingFactory'].lower()] = LogDecoder(
-            self.contracts_loaded['VestingFactory'].sc
-        )
+        for contract_name in ['VestingFactory', 'DelayMachine', 'Supporters', 'VotingMachine']:
+            contracts.append((self.contracts_addresses[contract_name], self.contracts_loaded[contract_name]))
 
-        contracts_log_decoder[self.contracts_addresses['DelayMachine'].lower()] = LogDecoder(
-            self.contracts_loaded['DelayMachine'].sc
-        )
+        return contracts
 
-        contracts_log_decoder[self.contracts_addresses['Supporters'].lower()] = LogDecoder(
-            self.contracts_loaded['Supporters'].sc
-        )
+    def init_log_decoder(self):
+        """ Log decoder by address, shared with the contracts with the same ABI (tokens) """
 
-        contracts_log_decoder[self.contracts_addresses['VotingMachine'].lower()] = LogDecoder(
-            self.contracts_loaded['VotingMachine'].sc
-        )
+        contracts_log_decoder = dict()
+        for address, contract in self.log_decoder_contracts():
+            contracts_log_decoder[address.lower()] = abi_registry.log_decoder(contract.sc.abi)
 
         return contracts_log_decoder
 
     def update_info_last_block(self):
 
-        collection_moc_indexer = self.connection_helper.mongo_collection('moc_indexer')
-        indexer = collection_moc_indexer.find_one(sort=[("updatedAt", -1)])
-        if indexer:
-            if 'last_block_number' in indexer:
-                self.last_block = indexer['last_block_number']
-                self.block_ts = indexer['last_block_ts']
-                self.block_info = dict(
-                    last_block=self.last_block,
-                    block_ts=self.block_ts,
-                    confirm_blocks=self.confirm_blocks
-                )
+        last_block_info = self.indexer_state.last_block_info()
+        if last_block_info:
+            self.last_block, self.block_ts = last_block_info
+            # update in place, the events share this dict
+            self.block_info.update(
+                last_block=self.last_block,
+                block_ts=self.block_ts,
+                confirm_blocks=self.confirm_blocks
+            )
 
     def map_events(self):
 
         d_event = dict()
-        d_event[self.contracts_addresses["Moc"].lower()] = {
-            "LiqTPRedeemed": EventMocLiqTPRedeemed(
-                self.options,
-                self.connection_helper,
-                self.contracts_loaded,
-                self.filter_contracts_addresses,
-                self.block_info),
-            "SuccessFeeDistributed": EventMocSuccessFeeDistributed(
-                self.options,
-                self.connection_helper,
-                self.contracts_loaded,
-                self.filter_contracts_addresses,
-                self.block_info),
-            "SettlementExecuted": EventMocSettlementExecuted(
-                self.options,
-                self.connection_helper,
-                self.contracts_loaded,
-                self.filter_contracts_addresses,
-                self.block_info),
-            "TCInterestPayment": EventMocTCInterestPayment(
-                self.options,
-                self.connection_helper,
-                self.contracts_loaded,
-                self.filter_contracts_addresses,
-                self.block_info),
-            "TPemaUpdated": EventMocTPemaUpdated(
-                self.options,
-                self.connection_helper,
-                self.contracts_loaded,
-                self.filter_contracts_addresses,
-                self.block_info)
-        }
-
         d_event[self.contracts_addresses["MocQueue"].lower()] = {
             "OperationError": EventMocQueueOperationError(
                 self.options,
@@ -200,67 +246,7 @@ class ScanLogsTransactions:
                 self.connection_helper,
                 self.contracts_loaded,
                 self.filter_contracts_addresses,
-                self.block_info),
-            "OperationExecuted": EventMocQueueOperationExecuted(
-                self.options,
-                self.connection_helper,
-                self.contracts_loaded,
-                self.filter_contracts_addresses,
-                self.block_info),
-            "TCMinted": EventMocQueueTCMinted(
-                self.options,
-                self.connection_helper,
-                self.contracts_loaded,
-                self.filter_contracts_addresses,
-                self.block_info),
-            "TCRedeemed": EventMocQueueTCRedeemed(
-                self.options,
-                self.connection_helper,
-                self.contracts_loaded,
-                self.filter_contracts_addresses,
-                self.block_info),
-            "TPMinted": EventMocQueueTPMinted(
-                self.options,
-                self.connection_helper,
-                self.contracts_loaded,
-                self.filter_contracts_addresses,
-                self.block_info),
-            "TPRedeemed": EventMocQueueTPRedeemed(
-                self.options,
-                self.connection_helper,
-                self.contracts_loaded,
-                self.filter_contracts_addresses,
-                self.block_info),
-            "TPSwappedForTP": EventMocQueueTPSwappedForTP(
-                self.options,
-                self.connection_helper,
-                self.contracts_loaded,
-                self.filter_contracts_addresses,
-                self.block_info),
-            "TPSwappedForTC": EventMocQueueTPSwappedForTC(
-                self.options,
-                self.connection_helper,
-                self.contracts_loaded,
-                self.filter_contracts_addresses,
-                self.block_info),
-            "TCSwappedForTP": EventMocQueueTCSwappedForTP(
-                self.options,
-                self.connection_helper,
-                self.contracts_loaded,
-                self.filter_contracts_addresses,
-                self.block_info),
-            "TCandTPRedeemed": EventMocQueueTCandTPRedeemed(
-                self.options,
-                self.connection_helper,
-                self.contracts_loaded,
-                self.filter_contracts_addresses,
-                self.block_info),
-            "TCandTPMinted": EventMocQueueTCandTPMinted(
-                self.options,
-                self.connection_helper,
-                self.contracts_loaded,
-                self.filter_contracts_addresses,
-                self.block_info),
+                self.block_info)
         }
 
         d_event[self.contracts_addresses["TC"].lower()] = {
@@ -325,87 +311,18 @@ class ScanLogsTransactions:
                 self.block_info)
         }
 
-        if 'IncentiveV2' in self.contracts_loaded:
-            d_event[self.contracts_addresses['IncentiveV2'].lower()] = {
-                "ClaimOK": EventOMOCIncentiveV2ClaimOK(
-                    self.options,
-                    self.connection_helper,
-                    self.contracts_loaded,
-                    self.filter_contracts_addresses,
-                    self.block_info)
-            }
-
-        d_event[self.contracts_addresses['VestingFactory'].lower()] = {
-            "VestingCreated": EventOMOCVestingFactoryVestingCreated(
+        # events described by schema
+        for (contract_name, event_name), schema in EVENT_SCHEMAS.items():
+            if not self.contracts_addresses.get(contract_name):
+                # optional contract not configured, ex. IncentiveV2
+                continue
+            d_event.setdefault(self.contracts_addresses[contract_name].lower(), dict())[event_name] = SchemaEvent(
                 self.options,
                 self.connection_helper,
                 self.contracts_loaded,
                 self.filter_contracts_addresses,
-                self.block_info)
-        }
-
-        d_event[self.contracts_addresses['DelayMachine'].lower()] = {
-            "PaymentCancel": EventOMOCDelayMachinePaymentCancel(
-                self.options,
-                self.connection_helper,
-                self.contracts_loaded,
-                self.filter_contracts_addresses,
-                self.block_info),
-            "PaymentDeposit": EventOMOCDelayMachinePaymentDeposit(
-                self.options,
-                self.connection_helper,
-                self.contracts_loaded,
-                self.filter_contracts_addresses,
-                self.block_info),
-            "PaymentWithdraw": EventOMOCDelayMachinePaymentWithdraw(
-                self.options,
-                self.connection_helper,
-                self.contracts_loaded,
-                self.filter_contracts_addresses,
-                self.block_info)
-        }
-
-        d_event[self.contracts_addresses['Supporters'].lower()] = {
-            "AddStake": EventOMOCSupportersAddStake(
-                self.options,
-                self.connection_helper,
-                self.contracts_loaded,
-                self.filter_contracts_addresses,
-                self.block_info),
-            "CancelEarnings": EventOMOCSupportersCancelEarnings(
-                self.options,
-                self.connection_helper,
-                self.contracts_loaded,
-                self.filter_contracts_addresses,
-                self.block_info),
-            "PayEarnings": EventOMOCSupportersPayEarnings(
-                self.options,
-                self.connection_helper,
-                self.contracts_loaded,
-                self.filter_contracts_addresses,
-                self.block_info),
-            "Withdraw": EventOMOCSupportersWithdraw(
-                self.options,
-                self.connection_helper,
-                self.contracts_loaded,
-                self.filter_contracts_addresses,
-                self.block_info),
-            "WithdrawStake": EventOMOCSupportersWithdrawStake(
-                self.options,
-                self.connection_helper,
-                self.contracts_loaded,
-                self.filter_contracts_addresses,
-                self.block_info)
-        }
-
-        d_event[self.contracts_addresses['VotingMachine'].lower()] = {
-            "VoteEvent": EventOMOCVotingMachineVoteEvent(
-                self.options,
-                self.connection_helper,
-                self.contracts_loaded,
-                self.filter_contracts_addresses,
-                self.block_info)
-        }
+                self.block_info,
+                schema)
 
         return d_event
 
@@ -416,6 +333,7 @@ class ScanLogsTransactions:
 
         parse_info = dict()
         parse_info['blockNumber'] = tx_receipt['blockNumber']
+        parse_info['blockHash'] = tx_receipt.get('blockHash')
         parse_info['hash'] = tx_receipt['hash']
         parse_info['gas'] = tx_receipt['gas']
         parse_info['gasPrice'] = int(tx_receipt['gasPrice'])
@@ -427,75 +345,258 @@ class ScanLogsTransactions:
 
         return parse_info
 
-    def process_logs(self, raw_tx):
-
-        if raw_tx["status"] == 0:
-            # reverted by EVM
-
-            collection_tx = self.connection_helper.mongo_collection('operations')
-
-            d_oper = OrderedDict()
-            d_oper["blockNumber"] = raw_tx["blockNumber"]
-            d_oper["hash"] = raw_tx["hash"]
-            d_oper["operId_"] = None
-            d_params = dict()
-            d_params['hash'] = raw_tx["hash"]
-            d_params['blockNumber'] = int(raw_tx["blockNumber"])
-            d_params["createdAt"] = raw_tx["createdAt"]
-            d_params["lastUpdatedAt"] = datetime.datetime.now()
-            d_params['sender'] = raw_tx["from"]
-            d_params["recipient"] = raw_tx["from"]
-            d_oper["params"] = d_params
-            d_oper["operation"] = 'ERROR'
-            d_oper["gas"] = raw_tx["gas"]
-            d_oper["gasPrice"] = str(raw_tx["gasPrice"])
-            d_oper["gasUsed"] = int(raw_tx['gasUsed'])
-            gas_fee = d_oper['gasUsed'] * Web3.from_wei(int(raw_tx["gasPrice"]), 'ether')
-            d_oper["gasFeeRBTC"] = str(int(gas_fee * self.precision))
-            d_oper["status"] = -4  # Revert
-            d_oper["createdAt"] = raw_tx["createdAt"]
-            d_oper["lastUpdatedAt"] = datetime.datetime.now()
-            d_oper['from'] = raw_tx["from"]
-            d_oper["to"] = raw_tx["to"]
+    def process_revert(self, raw_tx, uow):
+
+        # reverted by EVM
+
+        d_oper = OrderedDict()
+        d_oper["blockNumber"] = raw_tx["blockNumber"]
+        d_oper["hash"] = raw_tx["hash"]
+        d_oper["operId_"] = None
+        d_params = dict()
+        d_params['hash'] = raw_tx["hash"]
+        d_params['blockNumber'] = int(raw_tx["blockNumber"])
+        d_params["createdAt"] = raw_tx["createdAt"]
+        d_params["lastUpdatedAt"] = datetime.datetime.now()
+        d_params['sender'] = raw_tx["from"]
+        d_params["recipient"] = raw_tx["from"]
+        d_oper["params"] = d_params
+        d_oper["operation"] = 'ERROR'
+        d_oper["gas"] = raw_tx["gas"]
+        d_oper["gasPrice"] = str(raw_tx["gasPrice"])
+        d_oper["gasUsed"] = int(raw_tx['gasUsed'])
+        gas_fee = d_oper['gasUsed'] * Web3.from_wei(int(raw_tx["gasPrice"]), 'ether')
+        d_oper["gasFeeRBTC"] = str(int(gas_fee * self.precision))
+        d_oper["status"] = -4  # Revert
+        d_oper["createdAt"] = raw_tx["createdAt"]
+        d_oper["lastUpdatedAt"] = datetime.datetime.now()
+        d_oper['from'] = raw_tx["from"]
+        d_oper["to"] = raw_tx["to"]
+
+        try:
+            d_oper["contract"] = list(self.contracts_addresses.keys())[list(self.contracts_addresses.values()).index(d_oper["to"].lower())]
+        except (KeyError, ValueError):
+            d_oper["contract"] = ''
+
+        if d_oper["contract"] not in ['Moc', 'MocQueue', 'TC', 'TP', 'CA', 'FeeToken']:
+            log.info("Tx (REVERT) contract is not from Stable Protocol. Tx Hash: %s", raw_tx['hash'])
+            return
 
-            try:
-                d_oper["contract"] = list(self.contracts_addresses.keys())[list(self.contracts_addresses.values()).index(d_oper["to"].lower())]
-            except (KeyError, ValueError):
-                d_oper["contract"] = ''
+        uow.update_one('operations',
+                       {"hash": d_oper['hash']},
+                       {"$set": d_oper},
+                       upsert=True)
+        write_account_operations(uow, d_oper, [d_oper['from']], replace=True)
 
-            if d_oper["contract"] not in ['Moc', 'MocQueue', 'TC', 'TP', 'CA', 'FeeToken']:
-                log.info("Tx (REVERT) contract is not from Stable Protocol. Tx Hash: {0}".format(raw_tx['hash']))
-                return
+        log.info("Tx (REVERT) Tx Hash: %s", raw_tx['hash'])
+
+    @staticmethod
+    def partition_key(log_address, decoded_event):
+        """ Events of the same operation, bridge transfer or contract must keep the order """
+
+        for field in decoded_event['data']:
+            if field['name'] == 'operId_':
+                return 'operId_', oper_id_to_int(field['value'])
+            if field['name'] == 'transferId':
+                return 'transferId', str(field['value'])
 
-            collection_tx.find_one_and_update(
-                {"hash": d_oper['hash']},
-                {"$set": d_oper},
-                upsert=True)
+        return 'address', log_address
 
-            log.info("Tx (REVERT) Tx Hash: {0}".format(raw_tx['hash']))
+    def log_job(self, raw_tx, log_address, tx_log, decoded_event, uow):
+        """ Job of a decoded log: (partition key, function, args), None if not handled """
+
+        if isinstance(decoded_event, UnknownEvent):
+            log.error("Skipping. Not known event in ABI. Contract address: {0} Info: {1}".format(
+                log_address, tx_log))
+            return
+
+        if isinstance(decoded_event, EventError):
+            log.error("Skipping. Cannot decode event: {0} Tx Hash: {1} Log index: {2} Contract address: {3}".format(
+                decoded_event, raw_tx['hash'], tx_log.get('logIndex'), log_address))
+            return
 
+        if decoded_event['name'] not in self.map_events_contracts[log_address]:
+            log.warning("Event name not recognized. Event: {0}".format(decoded_event['name']))
             return
 
-        if raw_tx["logs"]:
-            for tx_log in raw_tx["logs"]:
-                log_address = str.lower(tx_log['address'])
-                if log_address in self.contracts_log_decoder:
-                    try:
-                        decoded_event = self.contracts_log_decoder[log_address].decode_log(tx_log)
-                    except UnknownEvent:
-                        log.error("Skipping. Not known event in ABI. Contract address: {0} Info: {1}".format(
-                            log_address, tx_log))
-                        continue
-                    if decoded_event['name'] in self.map_events_contracts[log_address]:
-                        log_index = tx_log['logIndex']
-                        parsed_receipt = self.parse_tx_receipt(raw_tx, decoded_event['name'], log_index=log_index)
-                        parsed_event = self.map_events_contracts[log_address][decoded_event['name']]\
-                            .parse_event_and_save(
-                                parsed_receipt,
-                                decoded_event['data']
-                            )
-                    else:
-                        log.warning("Event name not recognized. Event: {0}".format(decoded_event['name']))
+        log_index = tx_log['logIndex']
+        parsed_receipt = self.parse_tx_receipt(raw_tx, decoded_event['name'], log_index=log_index)
+        return (
+            self.partition_key(log_address, decoded_event),
+            self.map_events_contracts[log_address][decoded_event['name']].parse_event_and_save,
+            (parsed_receipt, decoded_event['data'], uow)
+        )
+
+    def batch_jobs(self, raw_txs, uow):
+        """ Decode the logs of the raw txs to jobs: (partition key, function, args)
+
+        All the logs of the batch are decoded together grouped by (address, topic),
+        the jobs keep the order of the logs.
+        """
+
+        # (job, raw_tx, log address, tx_log), job None while pending to decode
+        entries = list()
+        pending_logs = list()
+        for raw_tx in raw_txs:
+            if raw_tx["status"] == 0:
+                entries.append(((('hash', raw_tx["hash"]), self.process_revert, (raw_tx, uow)), None, None, None))
+                continue
+
+            for tx_log in raw_tx["logs"] or []:
+                log_address = address_lower(tx_log['address'])
+                handler_transfer = self.transfer_handlers.get(log_address)
+                if handler_transfer and handler_transfer.is_transfer_log(tx_log):
+                    # most of the volume, decoded straight from the raw log
+                    parsed_receipt = self.parse_tx_receipt(raw_tx, 'Transfer', log_index=tx_log['logIndex'])
+                    job = (('address', log_address), handler_transfer.parse_log_and_save, (parsed_receipt, tx_log, uow))
+                    entries.append((job, None, None, None))
+                elif log_address in self.contracts_log_decoder:
+                    entries.append((None, raw_tx, log_address, tx_log))
+                    pending_logs.append(tx_log)
+
+        decoded_events, _ = decode_logs_batch(pending_logs, self.contracts_log_decoder)
+        decoded_events = iter(decoded_events)
+
+        jobs = list()
+        for job, raw_tx, log_address, tx_log in entries:
+            if job is None:
+                job = self.log_job(raw_tx, log_address, tx_log, next(decoded_events), uow)
+                if job is None:
+                    continue
+            jobs.append(job)
+
+        return jobs
+
+    def prefetch_jobs(self, jobs):
+        """ Params of all the queued operations of the jobs in one multicall per block """
+
+        handler_queued = self.map_events_contracts[self.contracts_addresses['MocQueue']]['OperationQueued']
+        if handler_queued.enrich_deferred:
+            # the params are filled by the enrichment task
+            return
+
+        queued_operations = [handler_queued.queued_operation(*args[:2])
+                             for _, func, args in jobs if getattr(func, '__self__', None) is handler_queued]
+        if queued_operations:
+            handler_queued.prefetch_params(queued_operations)
+
+    def unit_of_work(self):
+
+        # after the migration there are no legacy documents to clean up
+        migrated = self.indexer_state.get('schema_version', 0) >= ID_EVENT_SCHEMA_VERSION
+        return UnitOfWork(self.connection_helper, legacy_cleanup=not migrated)
+
+    @staticmethod
+    def watermark_query(watermark):
+        """ Raw transactions after the watermark in chain order (blockNumber, transactionIndex) """
+
+        return {"$or": [
+            {"blockNumber": {"$gt": watermark["blockNumber"]}},
+            {"blockNumber": watermark["blockNumber"], "transactionIndex": {"$gt": watermark["transactionIndex"]}}
+        ]}
+
+    @staticmethod
+    def behind_watermark_query(watermark):
+        """ Raw transactions not processed before or at the watermark, ex. indexed later by confirming scanner
+        (raw txs of old versions without transactionIndex included) """
+
+        return {"processed": False, "$or": [
+            {"blockNumber": {"$lt": watermark["blockNumber"]}},
+            {"blockNumber": watermark["blockNumber"], "transactionIndex": {"$not": {"$gt": watermark["transactionIndex"]}}}
+        ]}
+
+    @staticmethod
+    def tx_watermark(raw_tx):
+        """ Watermark of the raw tx, old versions don't store the transactionIndex, taken from the logs """
+
+        tx_index = raw_tx.get("transactionIndex")
+        if tx_index is None:
+            tx_index = raw_tx["logs"][0]["transactionIndex"] if raw_tx.get("logs") else -1
+
+        return {"blockNumber": raw_tx["blockNumber"], "transactionIndex": tx_index, "hash": raw_tx["hash"]}
+
+    def logs_watermark(self):
+        """ Last (blockNumber, transactionIndex) processed by the logs scanner """
+
+        watermark = self.indexer_state.get('last_logs_watermark')
+        if watermark and "transactionIndex" in watermark:
+            return watermark
+
+        if watermark:
+            # (blockNumber, hash) watermark of the previous version, read again the block,
+            # the raw txs already processed are skipped
+            return {"blockNumber": watermark["blockNumber"], "transactionIndex": -1, "hash": ""}
+
+        # No watermark yet, start from the first not processed raw tx (old processed flag)
+        collection_raw_transactions = self.connection_helper.mongo_collection('raw_transactions')
+        first_raw_tx = collection_raw_transactions.find_one(
+            {"processed": False},
+            projection={"blockNumber": 1},
+            sort=[("blockNumber", 1)])
+        if first_raw_tx:
+            return {"blockNumber": first_raw_tx["blockNumber"], "transactionIndex": -1, "hash": ""}
+
+        last_raw_tx = collection_raw_transactions.find_one(
+            projection={"blockNumber": 1, "transactionIndex": 1, "hash": 1, "logs.transactionIndex": 1},
+            sort=[("blockNumber", -1), ("transactionIndex", -1)])
+        if last_raw_tx:
+            return self.tx_watermark(last_raw_tx)
+
+        return {"blockNumber": 0, "transactionIndex": -1, "hash": ""}
+
+    def save_logs_watermark(self, watermark):
+
+        self.indexer_state.update({'last_logs_watermark': watermark,
+                                   'updatedAt': datetime.datetime.now()})
+
+    def process_raw_txs(self, raw_txs):
+        """ Process a batch of raw transactions, all the writes flushed together in one unit of work """
+
+        # update block information, served from the indexer state cache
+        self.update_info_last_block()
+
+        uow = self.unit_of_work()
+
+        # already processed, ex. behind watermark when it was created
+        pending_txs = [raw_tx for raw_tx in raw_txs if not raw_tx.get("processed")]
+        processed_ids = [raw_tx["_id"] for raw_tx in pending_txs]
+
+        self.run_txs(pending_txs, uow)
+
+        # processed markers are the last writes of the flush
+        if processed_ids:
+            uow.update_many('raw_transactions',
+                            {"_id": {"$in": processed_ids}},
+                            {"$set": {"processed": True}})
+        uow.flush()
+
+        return len(processed_ids)
+
+    def process_fused_txs(self, raw_txs):
+        """ Process in memory the raw txs coming from the raw scanner and write them (fused mode) """
+
+        self.update_info_last_block()
+
+        uow = self.unit_of_work()
+
+        self.run_txs(raw_txs, uow)
+
+        # raw transactions written as audit log already processed, last in the flush
+        for raw_tx in raw_txs:
+            raw_tx["processed"] = True
+            uow.update_one('raw_transactions',
+                           {"hash": raw_tx["hash"], "blockNumber": raw_tx["blockNumber"]},
+                           {"$set": raw_tx},
+                           upsert=True)
+        uow.flush()
+
+    def advance_logs_watermark(self, raw_txs):
+        """ Move the watermark forward past raw txs already processed (fused mode) """
+
+        last_raw_tx = max(raw_txs, key=self.watermark_key)
+        watermark = self.logs_watermark()
+        if self.watermark_key(last_raw_tx) > self.watermark_key(watermark):
+            self.save_logs_watermark(self.tx_watermark(last_raw_tx))
 
     def scan_events_txs(self, task=None):
 
@@ -505,24 +606,151 @@ class ScanLogsTransactions:
         self.update_info_last_block()
 
         collection_raw_transactions = self.connection_helper.mongo_collection('raw_transactions')
-        raw_txs = collection_raw_transactions.find({"processed": False}, sort=[("blockNumber", 1)])
+        watermark = self.logs_watermark()
 
-        count = 0
-        if raw_txs:
-            for raw_tx in raw_txs:
-                # update block information
-                self.update_info_last_block()
+        # first the late ones behind the watermark
+        count = self.process_behind_watermark(watermark)
+
+        # read forward from the watermark in batches
+        while True:
+            raw_txs = list(collection_raw_transactions.find(
+                self.watermark_query(watermark),
+                sort=[("blockNumber", 1), ("transactionIndex", 1)],
+                limit=self.batch_size))
+            if not raw_txs:
+                break
 
-                count += 1
-                self.process_logs(raw_tx)
+            count += self.process_raw_txs(raw_txs)
 
-                collection_raw_transactions.find_one_and_update(
-                    {"hash": raw_tx["hash"], "blockNumber": raw_tx["blockNumber"]},
-                    {"$set": {"processed": True}},
-                    upsert=False)
+            watermark = self.tx_watermark(raw_txs[-1])
+            self.save_logs_watermark(watermark)
+
+            if len(raw_txs) < self.batch_size:
+                break
 
         duration = time.time() - start_time
         log.info("[2. Scan Events Txs] Processed: [{0}] Done! [{1} seconds]".format(count, duration))
 
+    @classmethod
+    def watermark_key(cls, raw_tx):
+        """ Chain order of a raw tx or a watermark """
+
+        if raw_tx.get("transactionIndex") is None:
+            raw_tx = cls.tx_watermark(raw_tx)
+
+        return raw_tx["blockNumber"], raw_tx["transactionIndex"]
+
+    def open_change_stream(self):
+
+        collection_raw_transactions = self.connection_helper.mongo_collection('raw_transactions')
+        return collection_raw_transactions.watch(
+            [{"$match": {"operationType": "insert"}}],
+            max_await_time_ms=500,
+            resume_after=self.change_stream_token)
+
+    def close_change_stream(self):
+
+        if self.change_stream is not None:
+            try:
+                self.change_stream.close()
+            except PyMongoError:
+                pass
+        self.change_stream = None
+
+    def process_behind_watermark(self, watermark):
+        """ Not processed raw txs behind the watermark, ex. inserted late by the confirming scanner """
+
+        collection_raw_transactions = self.connection_helper.mongo_collection('raw_transactions')
+        raw_txs = list(collection_raw_transactions.find(
+            self.behind_watermark_query(watermark),
+            sort=[("blockNumber", 1), ("transactionIndex", 1)]))
+
+        return self.process_raw_txs(raw_txs)
+
+    def process_change_stream_txs(self, raw_txs, watermark):
+        """ Process raw txs coming from the change stream, return the new watermark """
+
+        # the ones inserted behind the watermark are read back from the db with its processed flag
+        count = 0
+        if any(self.watermark_key(raw_tx) <= self.watermark_key(watermark) for raw_tx in raw_txs):
+            count += self.process_behind_watermark(watermark)
+
+        raw_txs = [raw_tx for raw_tx in raw_txs
+                   if self.watermark_key(raw_tx) > self.watermark_key(watermark)]
+        if not raw_txs:
+            return watermark, count
+
+        raw_txs.sort(key=self.watermark_key)
+        count += self.process_raw_txs(raw_txs)
+
+        watermark = self.tx_watermark(raw_txs[-1])
+        self.save_logs_watermark(watermark)
+
+        return watermark, count
+
+    def watch_events_txs(self, task=None):
+        """ Process the raw transactions as they are inserted following a change stream """
+
+        start_time = time.time()
+
+        if self.change_stream is None:
+            try:
+                # open the stream before the catch-up, so nothing inserted meanwhile is lost
+                self.change_stream = self.open_change_stream()
+            except PyMongoError as e:
+                log.error("[2. Scan Events Txs] Change stream not available, using watermark query. {0}".format(e))
+                # ex. the resume token is no longer in the oplog, next time open without it,
+                # the catch-up with the watermark query covers the gap
+                self.change_stream_token = None
+                self.scan_events_txs(task=task)
+                return
+
+            # resume after a restart with the watermark query
+            self.scan_events_txs(task=task)
+
+        watermark = self.logs_watermark()
+
+        count = 0
+        try:
+            while time.time() - start_time < self.change_stream_seconds:
+                raw_txs = list()
+                while len(raw_txs) < self.batch_size:
+                    change = self.change_stream.try_next()
+                    if change is None:
+                        break
+                    raw_txs.append(change['fullDocument'])
+                self.change_stream_token = self.change_stream.resume_token
+
+                if raw_txs:
+                    watermark, processed = self.process_change_stream_txs(raw_txs, watermark)
+                    count += processed
+        except PyMongoError as e:
+            log.error("[2. Scan Events Txs] Change stream error, going to reopen. {0}".format(e))
+            self.close_change_stream()
+
+        # not processed raw txs behind the watermark missed by the stream, ex. after a stream error
+        count += self.process_behind_watermark(watermark)
+
+        duration = time.time() - start_time
+        log.info("[2. Scan Events Txs] Change stream processed: [{0}] Done! [{1} seconds]".format(count, duration))
+
     def on_task(self, task=None):
-        self.scan_events_txs(task=task)
+        if self.change_stream_enabled:
+            self.watch_events_txs(task=task)
+        else:
+            self.scan_events_txs(task=task)
+
+
+# logs scanner of the pool process, created by init_process_worker
+process_worker = None
+
+
+def init_process_worker(options, contracts_names, contracts_addresses, filter_contracts_addresses, address_abis):
+    global process_worker
+    configure_logging(options)
+    process_worker = ScanLogsTransactions.process_worker(
+        options, contracts_names, contracts_addresses, filter_contracts_addresses, address_abis)
+
+
+def run_process_worker_batch(raw_txs, block_info, legacy_cleanup):
+    return process_worker.worker_batch(raw_txs, block_info, legacy_cleanup)
@@ -5,7 +5,11 @@ from web3.exceptions import TransactionNotFound
 from hexbytes import HexBytes
 from collections import OrderedDict
 
-from indexer.logger import log
+from indexer.logger import get_logger
+from indexer.base.address import address_lower
+
+
+log = get_logger('scan_raw')
 
 
 LOCAL_TIMEZONE = datetime.datetime.now().astimezone().tzinfo
@@ -14,17 +18,18 @@ LOCAL_TIMEZONE = datetime.datetime.now().astimezone().tzinfo
 def filter_transactions(transactions, filter_addresses):
     l_transactions = list()
     d_index_transactions = dict()
+    filter_addresses = set(filter_addresses)
 
     for transaction in transactions:
         tx_to = None
         tx_from = None
         if 'to' in transaction:
             if transaction['to']:
-                tx_to = str.lower(transaction['to'])
+                tx_to = address_lower(transaction['to'])
 
         if 'from' in transaction:
             if transaction['from']:
-                tx_from = str.lower(transaction['from'])
+                tx_from = address_lower(transaction['from'])
 
         if tx_to in filter_addresses or tx_from in filter_addresses:
             l_transactions.append(transaction)
@@ -48,8 +53,7 @@ def transactions_receipt(
         try:
             tx_receipt = web3.eth.get_transaction_receipt(Web3.to_hex(tx['hash']))
         except TransactionNotFound:
-            log.error("No transaction receipt for hash: [{0}]".format(
-                Web3.to_hex(tx['hash'])))
+            log.error("No transaction receipt for hash: [%s]", Web3.to_hex(tx['hash']))
             tx_receipt = None
         if tx_receipt:
             if tx_receipt['status'] >= index_status and \
@@ -99,14 +103,20 @@ def index_raw_tx(
         filter_tx=None,
         debug_mode=True,
         processed=0,
-        confirm_mode=False):
-    """ Receipts from blockchain to Database"""
+        confirm_mode=False,
+        logs_processor=None):
+    """ Receipts from blockchain to Database
+
+    With a logs processor (fused mode) the receipts are processed in memory and
+    written to raw_transactions in bulk already marked as processed.
+    """
 
     collection_raw_transactions = connection_helper.mongo_collection('raw_transactions')
 
     fil_txs = block_filtered_transactions(connection_helper, block_number, filter_tx=filter_tx)
     receipts = fil_txs["receipts"]
 
+    fused_txs = list()
     if receipts:
         for tx_rcp in receipts:
             if confirm_mode:
@@ -122,6 +132,7 @@ def index_raw_tx(
             d_tx["hash"] = str(HexBytes(tx_rcp['hash']).hex())
             d_tx["blockNumber"] = tx_rcp['blockNumber']
             d_tx["blockHash"] = str(HexBytes(tx_rcp['blockHash']).hex())
+            d_tx["transactionIndex"] = tx_rcp['transactionIndex']
             d_tx["from"] = tx_rcp['from']
             d_tx["to"] = tx_rcp['to']
             d_tx["value"] = str(tx_rcp['value'])
@@ -138,6 +149,10 @@ def index_raw_tx(
             d_tx["createdAt"] = fil_txs["block_ts"]
             d_tx["lastUpdatedAt"] = datetime.datetime.now()
 
+            if logs_processor:
+                fused_txs.append(d_tx)
+                continue
+
             collection_raw_transactions.find_one_and_update(
                 {"hash": str(HexBytes(tx_rcp['hash']).hex()), "blockNumber": tx_rcp['blockNumber']},
                 {"$set": d_tx},
@@ -145,6 +160,13 @@ def index_raw_tx(
 
             processed += 1
 
+    if fused_txs:
+        # events and raw txs in one flush, if it fails the block is scanned again
+        logs_processor.process_fused_txs(fused_txs)
+        logs_processor.advance_logs_watermark(fused_txs)
+
+        processed += len(fused_txs)
+
     d_info = dict()
     d_info["processed"] = processed
     d_info["block_number"] = fil_txs["block_number"]
@@ -153,7 +175,7 @@ def index_raw_tx(
     return d_info
 
 
-def scan_raw_txs(options, connection_helper, filter_contracts, task=None):
+def scan_raw_txs(options, connection_helper, indexer_state, filter_contracts, task=None, logs_processor=None):
 
     start_time = time.time()
 
@@ -161,13 +183,7 @@ def scan_raw_txs(options, connection_helper, filter_contracts, task=None):
     config_blocks_recession = options['scan_raw_transactions']['blocks_recession']
     debug_mode = options['debug']
 
-    collection_moc_indexer = connection_helper.mongo_collection('moc_indexer')
-    protocol_index = collection_moc_indexer.find_one(sort=[("updatedAt", -1)])
-
-    last_block_indexed = 0
-    if protocol_index:
-        if 'last_raw_tx_block' in protocol_index:
-            last_block_indexed = protocol_index['last_raw_tx_block']
+    last_block_indexed = indexer_state.get('last_raw_tx_block', 0)
 
     # get last block from node compare 1 blocks older than new
     last_block = connection_helper.connection_manager.block_number - config_blocks_recession
@@ -205,17 +221,16 @@ def scan_raw_txs(options, connection_helper, filter_contracts, task=None):
             last_block,
             filter_tx=filter_contracts,
             debug_mode=debug_mode,
-            processed=processed)
+            processed=processed,
+            logs_processor=logs_processor)
 
         if debug_mode:
-            log.info("[1. Scan Raw Txs] OK [{0}] / [{1}]".format(current_block, to_block))
-
-        collection_moc_indexer.update_one({},
-                                          {'$set': {'last_raw_tx_block': current_block,
-                                                    'updatedAt': datetime.datetime.now(),
-                                                    'last_block_number': block_processed['block_number'],
-                                                    'last_block_ts': block_processed['block_ts']}},
-                                          upsert=True)
+            log.debug("[1. Scan Raw Txs] OK [%s] / [%s]", current_block, to_block)
+
+        indexer_state.update({'last_raw_tx_block': current_block,
+                              'updatedAt': datetime.datetime.now(),
+                              'last_block_number': block_processed['block_number'],
+                              'last_block_ts': block_processed['block_ts']})
         processed = block_processed["processed"]
 
         # Go to next block
@@ -224,8 +239,10 @@ def scan_raw_txs(options, connection_helper, filter_contracts, task=None):
     duration = time.time() - start_time
     log.info("[1. Scan Raw Txs] Done! Processed: [{0}] in [{1} seconds]".format(processed, duration))
 
+    return processed
 
-def scan_raw_txs_confirming(options, connection_helper, filter_contracts, task=None):
+
+def scan_raw_txs_confirming(options, connection_helper, indexer_state, filter_contracts, task=None, logs_processor=None):
 
     start_time = time.time()
 
@@ -233,13 +250,7 @@ def scan_raw_txs_confirming(options, connection_helper, filter_contracts, task=N
     debug_mode = options['debug']
     confirm_blocks = options['scan_raw_transactions_confirming']['confirm_blocks']
 
-    collection_moc_indexer = connection_helper.mongo_collection('moc_indexer')
-    protocol_index = collection_moc_indexer.find_one(sort=[("updatedAt", -1)])
-
-    last_block_indexed = 0
-    if protocol_index:
-        if 'last_raw_tx_confirming_block' in protocol_index:
-            last_block_indexed = protocol_index['last_raw_tx_confirming_block']
+    last_block_indexed = indexer_state.get('last_raw_tx_confirming_block', 0)
 
     # get last block from node compare 1 blocks older than new
     last_block = connection_helper.connection_manager.block_number - config_blocks_recession
@@ -278,14 +289,13 @@ def scan_raw_txs_confirming(options, connection_helper, filter_contracts, task=N
             filter_tx=filter_contracts,
             debug_mode=debug_mode,
             processed=processed,
-            confirm_mode=True)
+            confirm_mode=True,
+            logs_processor=logs_processor)
 
         if debug_mode:
-            log.info("[5. Scan Raw Txs Confirming] OK [{0}] / [{1}]".format(current_block, to_block))
+            log.debug("[5. Scan Raw Txs Confirming] OK [%s] / [%s]", current_block, to_block)
 
-        collection_moc_indexer.update_one({},
-                                          {'$set': {'last_raw_tx_confirming_block': current_block}},
-                                          upsert=True)
+        indexer_state.update({'last_raw_tx_confirming_block': current_block})
         processed = block_processed["processed"]
 
         # Go to next block
@@ -298,21 +308,17 @@ def scan_raw_txs_confirming(options, connection_helper, filter_contracts, task=N
     else:
         log.info("[5. Scan Raw Txs Confirming] Done! Processed: [{0}] in [{1} seconds]".format(processed, duration))
 
+    return processed
+
 
-def scan_raw_txs_history(options, connection_helper, filter_contracts, task=None):
+def scan_raw_txs_history(options, connection_helper, indexer_state, filter_contracts, task=None, logs_processor=None):
 
     start_time = time.time()
 
     config_blocks_recession = options['scan_raw_transactions_history']['blocks_recession']
     debug_mode = options['debug']
 
-    collection_moc_indexer = connection_helper.mongo_collection('moc_indexer')
-    protocol_index = collection_moc_indexer.find_one(sort=[("updatedAt", -1)])
-
-    last_block_indexed = 0
-    if protocol_index:
-        if 'last_raw_tx_history_block' in protocol_index:
-            last_block_indexed = protocol_index['last_raw_tx_history_block']
+    last_block_indexed = indexer_state.get('last_raw_tx_history_block', 0)
 
     # get last block from node compare 1 blocks older than new
     last_block = connection_helper.connection_manager.block_number - config_blocks_recession
@@ -354,14 +360,13 @@ def scan_raw_txs_history(options, connection_helper, filter_contracts, task=None
             filter_tx=filter_contracts,
             debug_mode=debug_mode,
             processed=processed,
-            confirm_mode=False)
+            confirm_mode=False,
+            logs_processor=logs_processor)
 
         if debug_mode:
-            log.info("[6. Scan Raw Txs History] OK [{0}] / [{1}]".format(current_block, to_block))
+            log.debug("[6. Scan Raw Txs History] OK [%s] / [%s]", current_block, to_block)
 
-        collection_moc_indexer.update_one({},
-                                          {'$set': {'last_raw_tx_history_block': current_block}},
-                                          upsert=True)
+        indexer_state.update({'last_raw_tx_history_block': current_block})
         processed = block_processed["processed"]
 
         # Go to next block
@@ -374,15 +379,100 @@ def scan_raw_txs_history(options, connection_helper, filter_contracts, task=None
     else:
         log.info("[6. Scan Raw Txs History] Done! Processed: [{0}] in [{1} seconds]".format(processed, duration))
 
+    return processed
+
+
+def raw_txs_backlog(connection_helper):
+    """ Raw transactions pending to process by the logs scanner: (count, blocks distance)"""
+
+    collection_raw_transactions = connection_helper.mongo_collection('raw_transactions')
+
+    backlog_txs = collection_raw_transactions.count_documents({"processed": False})
+    backlog_blocks = 0
+    if backlog_txs:
+        oldest = collection_raw_transactions.find_one(
+            {"processed": False},
+            projection={"blockNumber": 1},
+            sort=[("blockNumber", 1)])
+        newest = collection_raw_transactions.find_one(
+            {"processed": False},
+            projection={"blockNumber": 1},
+            sort=[("blockNumber", -1)])
+        if oldest and newest:
+            backlog_blocks = newest['blockNumber'] - oldest['blockNumber']
+
+    return backlog_txs, backlog_blocks
+
+
+class RawTxsBackpressure:
+    """ Pause the raw ingestion while the backlog of the logs scanner is too big
+
+    Ingestion pause when the backlog of unprocessed raw transactions pass
+    max_backlog_txs (count) or max_backlog_blocks (block distance) and resume
+    when it drains below resume_backlog_ratio of those limits. 0 disable the limit.
+    """
+
+    def __init__(self, options_task):
+        self.max_backlog_txs = options_task.get('max_backlog_txs', 0)
+        self.max_backlog_blocks = options_task.get('max_backlog_blocks', 0)
+        resume_ratio = options_task.get('resume_backlog_ratio', 0.5)
+        self.resume_backlog_txs = int(self.max_backlog_txs * resume_ratio)
+        self.resume_backlog_blocks = int(self.max_backlog_blocks * resume_ratio)
+        self.paused = False
+
+    @property
+    def enabled(self):
+        return self.max_backlog_txs > 0 or self.max_backlog_blocks > 0
+
+    @staticmethod
+    def over_limit(value, limit):
+        return 0 < limit < value
+
+    def can_ingest(self, connection_helper, indexer_state, task_label):
+        """ Check the backlog and return False if the ingestion must wait """
+
+        if not self.enabled:
+            return True
+
+        backlog_txs, backlog_blocks = raw_txs_backlog(connection_helper)
+
+        if self.paused:
+            if not self.over_limit(backlog_txs, self.resume_backlog_txs) and \
+                    not self.over_limit(backlog_blocks, self.resume_backlog_blocks):
+                self.paused = False
+                log.info("{0} Backlog drained, resuming ingestion. Backlog: [{1} txs] [{2} blocks]".format(
+                    task_label, backlog_txs, backlog_blocks))
+        elif self.over_limit(backlog_txs, self.max_backlog_txs) or \
+                self.over_limit(backlog_blocks, self.max_backlog_blocks):
+            self.paused = True
+            log.warning("{0} Backlog too big, pausing ingestion. Backlog: [{1} txs] [{2} blocks]".format(
+                task_label, backlog_txs, backlog_blocks))
+
+        # expose the backlog level as metric
+        indexer_state.update({'raw_tx_backlog': {
+            'txs': backlog_txs,
+            'blocks': backlog_blocks,
+            'paused': self.paused,
+            'updatedAt': datetime.datetime.now()}})
+
+        return not self.paused
+
 
 class ScanRawTxs:
 
-    def __init__(self, options, connection_helper, filter_contracts):
+    def __init__(self, options, connection_helper, indexer_state, filter_contracts, logs_processor=None):
         self.options = options
         self.connection_helper = connection_helper
+        self.indexer_state = indexer_state
         self.filter_contracts = filter_contracts
         self.filter_contracts_vesting = []
 
+        # fused mode: receipts go straight to the logs scanner in memory
+        self.logs_processor = logs_processor
+
+        self.backpressure = RawTxsBackpressure(self.options['scan_raw_transactions'])
+        self.backpressure_history = RawTxsBackpressure(self.options.get('scan_raw_transactions_history', {}))
+
     def on_init(self):
         pass
 
@@ -392,18 +482,32 @@ class ScanRawTxs:
         all_vesting = vesting_created.find({})
         l_vesting = []
         for vesting in all_vesting:
-            l_vesting.append(vesting['vesting'].lower())
+            l_vesting.append(address_lower(vesting['vesting']))
 
         self.filter_contracts_vesting = l_vesting
 
+    def task_result(self, processed):
+        """ Wake up the logs scanner when there are new raw transactions to process """
+
+        if processed and not self.logs_processor:
+            return dict(wake=['scan_logs'])
+
     def on_task(self, task=None):
+        if not self.backpressure.can_ingest(self.connection_helper, self.indexer_state, "[1. Scan Raw Txs]"):
+            # let the logs scanner drain the backlog
+            return dict(wake=['scan_logs'])
         self.on_load_vesting()
-        scan_raw_txs(self.options, self.connection_helper, self.filter_contracts + self.filter_contracts_vesting, task=task)
+        processed = scan_raw_txs(self.options, self.connection_helper, self.indexer_state, self.filter_contracts + self.filter_contracts_vesting, task=task, logs_processor=self.logs_processor)
+        return self.task_result(processed)
 
     def on_task_confirming(self, task=None):
         self.on_load_vesting()
-        scan_raw_txs_confirming(self.options, self.connection_helper, self.filter_contracts + self.filter_contracts_vesting, task=task)
+        processed = scan_raw_txs_confirming(self.options, self.connection_helper, self.indexer_state, self.filter_contracts + self.filter_contracts_vesting, task=task, logs_processor=self.logs_processor)
+        return self.task_result(processed)
 
     def on_task_history(self, task=None):
+        if not self.backpressure_history.can_ingest(self.connection_helper, self.indexer_state, "[6. Scan Raw Txs History]"):
+            return dict(wake=['scan_logs'])
         self.on_load_vesting()
-        scan_raw_txs_history(self.options, self.connection_helper, self.filter_contracts + self.filter_contracts_vesting, task=task)
+        processed = scan_raw_txs_history(self.options, self.connection_helper, self.indexer_state, self.filter_contracts + self.filter_contracts_vesting, task=task, logs_processor=self.logs_processor)
+        return self.task_result(processed)
@@ -1,16 +1,18 @@
 import time
 import datetime
-from web3 import Web3
-from web3.exceptions import TransactionNotFound
 
-from .logger import log
+from .logger import get_logger
+
+
+log = get_logger('tx_status')
 
 
 class ScanTxStatus:
 
-    def __init__(self, options, connection_helper):
+    def __init__(self, options, connection_helper, indexer_state):
         self.options = options
         self.connection_helper = connection_helper
+        self.indexer_state = indexer_state
         self.confirm_blocks = self.options['scan_tx_status']['confirm_blocks']
 
         # update block info
@@ -23,58 +25,124 @@ class ScanTxStatus:
             confirm_blocks=self.confirm_blocks
         )
 
+        # earliest stale deadline (createdAt + seconds_not_in_chain_error) of the pending
+        # operations without indexed block, None: look them up on the next run
+        self.next_due_time = None
+
     def update_info_last_block(self):
 
-        collection_moc_indexer = self.connection_helper.mongo_collection('moc_indexer')
-        indexer = collection_moc_indexer.find_one(sort=[("updatedAt", -1)])
-        if indexer:
-            if 'last_block_number' in indexer:
-                self.last_block = indexer['last_block_number']
-                self.block_ts = indexer['last_block_ts']
-                self.block_info = dict(
-                    last_block=self.last_block,
-                    block_ts=self.block_ts,
-                    confirm_blocks=self.confirm_blocks
-                )
+        last_block_info = self.indexer_state.last_block_info()
+        if last_block_info:
+            self.last_block, self.block_ts = last_block_info
+            self.block_info = dict(
+                last_block=self.last_block,
+                block_ts=self.block_ts,
+                confirm_blocks=self.confirm_blocks
+            )
 
-    def scan_transaction_status_block(self, block_height, block_height_ts):
+    @staticmethod
+    def pending_query(tx_pending):
+        """ Only update if the operation is still executed and not confirmed, atomic transition """
+
+        return {"_id": tx_pending["_id"], "status": {"$gte": 1}, "confirmationTime": None}
+
+    def confirm_by_block(self, block_height, confirm_blocks):
+        """ Confirm with the indexed block. Operations with status >= 1 come from the logs of a
+        successful tx, only the confirmations are missing. The hash of their block is checked
+        against the chain (one batch call per run): operations of a block reorged out lose the
+        block and are resolved again with the receipt """
+
+        batch_size = self.options['scan_tx_status'].get('receipts_batch_size', 100)
+
+        operations = self.connection_helper.mongo_collection('operations')
+
+        query = {"status": {"$gte": 1},
+                 "confirmationTime": None,
+                 "blockNumber": {"$lt": block_height - confirm_blocks},
+                 "blockHash": {"$ne": None}}
+        block_numbers = sorted(operations.distinct('blockNumber', query))
+        if not block_numbers:
+            return
+
+        block_hashes = self.connection_helper.connection_manager.get_block_hashes(
+            block_numbers, batch_size=batch_size)
+
+        confirmed = 0
+        reorged = 0
+        for block_number, block_hash in block_hashes.items():
+            block_query = dict(query, blockNumber=block_number)
+            canonical_hash = block_hash.lower() if block_hash else None
+            if canonical_hash:
+                result = operations.update_many(
+                    dict(block_query, blockHash=canonical_hash),
+                    {"$set": {"confirmationTime": datetime.datetime.now()}})
+                confirmed += result.modified_count
+
+            result = operations.update_many(
+                dict(block_query, blockHash={"$nin": [None, canonical_hash]}),
+                {"$set": {"blockNumber": None, "blockHash": None}})
+            reorged += result.modified_count
+
+        if confirmed:
+            log.info("[3. Scan Moc Status] Confirmed operations: [%s]", confirmed)
+        if reorged:
+            # look up their receipts in this run
+            self.next_due_time = None
+            log.warning("[3. Scan Moc Status] Operations of blocks no longer in the chain, "
+                        "checking the receipt: [%s]", reorged)
+
+    def resolve_without_block(self, block_height, block_height_ts, confirm_blocks):
+        """ Pending operations without indexed block hash (not indexed, reorged out or indexed by
+        old versions), receipts from the node in batch. With receipt the block is stored and from
+        then on they are confirmed by block, without receipt they are marked stale after
+        seconds_not_in_chain_error """
+
+        if self.next_due_time and block_height_ts < self.next_due_time:
+            return
 
-        web3 = self.connection_helper.connection_manager.web3
         seconds_not_in_chain_error = self.options['scan_tx_status']['seconds_not_in_chain_error']
-        confirm_blocks = self.options['scan_tx_status']['confirm_blocks']
+        receipts_batch_size = self.options['scan_tx_status'].get('receipts_batch_size', 100)
 
         operations = self.connection_helper.mongo_collection('operations')
 
-        # Get confirming tx and check for confirming, confirmed or failed
-        tx_pendings = operations.find({"status": {"$gte": 1}, "confirmationTime": None})
+        tx_pendings = list(operations.find(
+            {"status": {"$gte": 1}, "confirmationTime": None, "blockHash": None},
+            {"hash": 1, "createdAt": 1}))
+
+        self.next_due_time = None
+        if not tx_pendings:
+            return
+
+        tx_receipts = self.connection_helper.connection_manager.get_transaction_receipts(
+            list({tx_pending['hash'] for tx_pending in tx_pendings}),
+            batch_size=receipts_batch_size)
+
         for tx_pending in tx_pendings:
-            try:
-                tx_receipt = web3.eth.get_transaction_receipt(tx_pending['hash'])
-            except TransactionNotFound:
-                tx_receipt = None
+            tx_receipt = tx_receipts.get(tx_pending['hash'])
 
             if tx_receipt:
                 d_tx_up = dict()
-                if tx_receipt.status == 0:
+                if tx_receipt['status'] == 0:
                     # Revert TX
                     d_tx_up['status'] = -4
-                    operations.find_one_and_update(
-                        {"_id": tx_pending["_id"]},
+                    operations.update_one(
+                        self.pending_query(tx_pending),
                         {"$set": d_tx_up})
 
                     log.info("[3. Scan Moc Status] Setting TX STATUS: {0} hash: {1}".format(
                         d_tx_up['status'],
                         tx_pending['hash']))
-                elif tx_receipt.status == 1:
-                    if tx_pending['blockNumber'] + confirm_blocks < block_height:
+                elif tx_receipt['status'] == 1:
+                    d_tx_up['blockNumber'] = tx_receipt['blockNumber']
+                    d_tx_up['blockHash'] = tx_receipt['blockHash'].lower()
+                    if tx_receipt['blockNumber'] + confirm_blocks < block_height:
                         # set confirmation time
                         d_tx_up['confirmationTime'] = datetime.datetime.now()
-
-                        operations.find_one_and_update(
-                            {"_id": tx_pending["_id"]},
-                            {"$set": d_tx_up})
-
                         log.info("[3. Scan Moc Status] Confirmed operation! hash: {0}".format(tx_pending['hash']))
+
+                    operations.update_one(
+                        self.pending_query(tx_pending),
+                        {"$set": d_tx_up})
             else:
                 # no receipt from tx
                 # here problem with eternal confirming
@@ -86,13 +154,23 @@ class ScanTxStatus:
                         d_tx_up['status'] = -3
                         d_tx_up['errorCode'] = 'staleTransaction'
 
-                        operations.find_one_and_update(
-                            {"_id": tx_pending["_id"]},
+                        operations.update_one(
+                            self.pending_query(tx_pending),
                             {"$set": d_tx_up})
 
                         log.info("[3. Scan Moc Status] Setting TX STATUS: {0} hash: {1}".format(
                             d_tx_up['status'],
                             tx_pending['hash']))
+                    elif self.next_due_time is None or dte < self.next_due_time:
+                        self.next_due_time = dte
+
+    def scan_transaction_status_block(self, block_height, block_height_ts):
+
+        confirm_blocks = self.options['scan_tx_status']['confirm_blocks']
+
+        # only the operations past their deadline are touched, both use the due time index
+        self.confirm_by_block(block_height, confirm_blocks)
+        self.resolve_without_block(block_height, block_height_ts, confirm_blocks)
 
     def scan_transactions_status(self, task=None):
 
@@ -105,12 +183,7 @@ class ScanTxStatus:
         # get block time from node
         last_block_ts = self.block_ts  # network_manager.block_timestamp(last_block)
 
-        collection_moc_indexer = self.connection_helper.mongo_collection('moc_indexer')
-        moc_index = collection_moc_indexer.find_one(sort=[("updatedAt", -1)])
-        last_moc_status_block = 0
-        if moc_index:
-            if 'last_moc_status_block' in moc_index:
-                last_moc_status_block = int(moc_index['last_moc_status_block'])
+        last_moc_status_block = int(self.indexer_state.get('last_moc_status_block', 0))
 
         if last_block <= last_moc_status_block:
             log.info("[3. Scan Moc Status] Its not time to run Scan Transactions status")
@@ -120,10 +193,8 @@ class ScanTxStatus:
 
         start_time = time.time()
 
-        collection_moc_indexer.update_one({},
-                                          {'$set': {'last_moc_status_block': last_block,
-                                                    'updatedAt': datetime.datetime.now()}},
-                                          upsert=True)
+        self.indexer_state.update({'last_moc_status_block': last_block,
+                                   'updatedAt': datetime.datetime.now()})
 
         self.scan_transaction_status_block(last_block, last_block_ts)
 
@@ -1,17 +1,19 @@
-from pymongo import ASCENDING, DESCENDING
 import os
 import json
 
 from .base.main import ConnectionHelperMongo
 from .base.token import ERC20Token
 from .tasks_manager import TasksManager
-from .logger import log
+from .indexer_state import IndexerState
+from .logger import log, configure_logging
 from .contracts import Multicall2, Moc, FastBtcBridge, MocQueue, \
     OMOCDelayMachine, OMOCIncentiveV2, OMOCSupporters, OMOCVestingFactory, \
     OMOCVotingMachine, OMOCIRegistry
 from .scan_raw_transactions import ScanRawTxs
 from .scan_logs_transactions import ScanLogsTransactions
 from .scan_transactions_status import ScanTxStatus
+from .enrich_operations import EnrichOperations
+from .index_catalog import IndexCatalog
 
 __VERSION__ = '4.2.4'
 
@@ -37,8 +39,14 @@ class StableIndexerTasks(TasksManager):
         TasksManager.__init__(self)
 
         self.config = config
+        configure_logging(config)
         self.connection_helper = ConnectionHelperMongo(config)
 
+        # shared cache of the moc_indexer document
+        self.indexer_state = IndexerState(
+            self.connection_helper,
+            refresh_interval=config.get('indexer_state', {}).get('refresh_interval', 5))
+
         self.contracts_loaded = dict()
         self.contracts_addresses = dict()
         self.filter_contracts_addresses = dict()
@@ -181,13 +189,9 @@ class StableIndexerTasks(TasksManager):
                 raise Exception("Filter address not recognize!")
 
     def create_mongo_index(self):
+        """ Indexes from the catalog (index_catalog.py), reconciled in background """
 
-        # Operations collection
-        index_map = [('operId_', DESCENDING)]
-        self.connection_helper.create_index('operations', index_map, unique=False)
-
-        index_map = [('createdAt', DESCENDING)]
-        self.connection_helper.create_index('operations', index_map, unique=False)
+        IndexCatalog(self.config, self.connection_helper).start()
 
     def schedule_tasks(self):
 
@@ -199,66 +203,105 @@ class StableIndexerTasks(TasksManager):
         log.info("Creating mongo collection index...")
         self.create_mongo_index()
 
+        # Logs scanner, also used in memory by the raw scanners in fused mode
+        scan_logs_txs = None
+        logs_processor = None
+        fused = self.config.get('scan_raw_transactions', {}).get('fused', False)
+        if 'scan_logs' in self.config['tasks'] or fused:
+            scan_logs_txs = ScanLogsTransactions(
+                self.config,
+                self.connection_helper,
+                self.indexer_state,
+                self.contracts_loaded,
+                self.contracts_addresses,
+                self.filter_contracts_addresses)
+            self.add_shutdown_hook(scan_logs_txs.shutdown)
+            if fused:
+                log.info("Fused mode: raw transactions are processed in memory by the logs scanner")
+                logs_processor = scan_logs_txs
+
         # 1. Scan Raw Transactions
         if 'scan_raw_transactions' in self.config['tasks']:
             log.info("Jobs add: 1. Scan Raw Transactions")
             interval = self.config['tasks']['scan_raw_transactions']['interval']
-            scan_raw_txs = ScanRawTxs(self.config, self.connection_helper, self.filter_contracts_addresses)
+            scan_raw_txs = ScanRawTxs(self.config, self.connection_helper, self.indexer_state, self.filter_contracts_addresses,
+                                      logs_processor=logs_processor)
             self.add_task(scan_raw_txs.on_task,
                           args=[],
                           wait=interval,
                           timeout=180,
+                          tid='scan_raw_transactions',
                           task_name='1. Scan Raw Transactions')
 
         # 2. Scan Logs Txs
         if 'scan_logs' in self.config['tasks']:
             log.info("Jobs add: 2. Scan Logs Transactions")
             interval = self.config['tasks']['scan_logs']['interval']
-            scan_logs_txs = ScanLogsTransactions(
-                self.config,
-                self.connection_helper,
-                self.contracts_loaded,
-                self.contracts_addresses,
-                self.filter_contracts_addresses)
             self.add_task(scan_logs_txs.on_task,
                           args=[],
                           wait=interval,
                           timeout=180,
+                          tid='scan_logs',
                           task_name='2. Scan Logs Transactions')
 
+            if scan_logs_txs.change_stream_enabled:
+                # the change stream keep the worker busy, let the other tasks run
+                self.max_workers = 2
+
         # 3. Scan TX Status
         if 'scan_tx_status' in self.config['tasks']:
             log.info("Jobs add: 3. Scan Transactions Status")
             interval = self.config['tasks']['scan_tx_status']['interval']
-            scan_tx_status = ScanTxStatus(self.config, self.connection_helper)
+            scan_tx_status = ScanTxStatus(self.config, self.connection_helper, self.indexer_state)
             self.add_task(scan_tx_status.on_task,
                           args=[],
                           wait=interval,
                           timeout=180,
+                          tid='scan_tx_status',
                           task_name='3. Scan Transactions Status')
 
         # 4. Scan Raw Transactions Confirming
         if 'scan_raw_transactions_confirming' in self.config['tasks']:
             log.info("Jobs add: 4. Scan Raw Transactions Confirming")
             interval = self.config['tasks']['scan_raw_transactions_confirming']['interval']
-            scan_raw_txs_confirming = ScanRawTxs(self.config, self.connection_helper, self.filter_contracts_addresses)
+            scan_raw_txs_confirming = ScanRawTxs(self.config, self.connection_helper, self.indexer_state, self.filter_contracts_addresses,
+                                                 logs_processor=logs_processor)
             self.add_task(scan_raw_txs_confirming.on_task_confirming,
                           args=[],
                           wait=interval,
                           timeout=180,
+                          tid='scan_raw_transactions_confirming',
                           task_name='4. Scan Raw Transactions Confirming')
 
         # 5. Scan Raw Transactions History
         if 'scan_raw_transactions_history' in self.config['tasks']:
             log.info("Jobs add: 5. Scan Raw Transactions History")
             interval = self.config['tasks']['scan_raw_transactions_history']['interval']
-            scan_raw_txs_history = ScanRawTxs(self.config, self.connection_helper,
-                                                 self.filter_contracts_addresses)
+            scan_raw_txs_history = ScanRawTxs(self.config, self.connection_helper, self.indexer_state,
+                                              self.filter_contracts_addresses,
+                                              logs_processor=logs_processor)
             self.add_task(scan_raw_txs_history.on_task_history,
                           args=[],
                           wait=interval,
                           timeout=180,
+                          tid='scan_raw_transactions_history',
                           task_name='5. Scan Raw Transactions History')
 
+        # 6. Enrich Operations
+        if 'enrich_operations' in self.config['tasks']:
+            log.info("Jobs add: 6. Enrich Operations")
+            interval = self.config['tasks']['enrich_operations']['interval']
+            enrich_operations = EnrichOperations(self.config,
+                                                 self.connection_helper,
+                                                 self.indexer_state,
+                                                 self.contracts_loaded,
+                                                 self.filter_contracts_addresses)
+            self.add_task(enrich_operations.on_task,
+                          args=[],
+                          wait=interval,
+                          timeout=180,
+                          tid='enrich_operations',
+                          task_name='6. Enrich Operations')
+
         # Set max tasks
         self.max_tasks = len(self.tasks)
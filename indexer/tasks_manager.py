@@ -1,6 +1,9 @@
-from time import sleep
+from time import sleep, monotonic
 import signal
 import functools
+import heapq
+import itertools
+import threading
 import uuid
 from concurrent.futures import TimeoutError
 import datetime
@@ -25,7 +28,8 @@ def signal_handler(signum, frame):
 
 
 class Task:
-    def __init__(self, func, args=None, kwargs=None, wait=1, timeout=180, task_name='Task N'):
+    def __init__(self, func, args=None, kwargs=None, wait=1, timeout=180, task_name='Task N', tid=None):
+        self.tid = tid
         self.func = func
         if args:
             self.args = args
@@ -44,6 +48,10 @@ class Task:
         self.tx_receipt = None
         self.tx_receipt_timestamp = None
         self.task_name = task_name
+        # sequence of the current entry in the due heap, older entries are stale
+        self.due_seq = None
+        # woken while running, run again as soon as it finish
+        self.wake_pending = False
 
 
 class TasksManager:
@@ -53,20 +61,70 @@ class TasksManager:
         self.max_workers = 1
         self.max_tasks = 1
         self.timeout = 180
+        # max seconds the loop sleep without news, only to check the shutdown
+        self.max_idle = 5
+
+        # heap of (due time, sequence, task id) guarded by the condition
+        self.due_heap = list()
+        self.due_counter = itertools.count()
+        self.condition = threading.Condition()
+
+        # called once the loop ends, to release pools and connections
+        self.shutdown_hooks = list()
 
     def add_task(self, func, args=None, kwargs=None, wait=1, timeout=180, tid=None, task_name='Task N'):
 
         if not tid:
             tid = uuid.uuid4()
 
-        task = Task(func, args=args, kwargs=kwargs, wait=wait, timeout=timeout, task_name=task_name)
+        task = Task(func, args=args, kwargs=kwargs, wait=wait, timeout=timeout, task_name=task_name, tid=tid)
         self.tasks[tid] = task
 
+        with self.condition:
+            self.push_due(task, task.wait)
+
+    def add_shutdown_hook(self, func):
+
+        self.shutdown_hooks.append(func)
+
+    def run_shutdown_hooks(self):
+
+        for func in self.shutdown_hooks:
+            try:
+                func()
+            except Exception as e:
+                log.error("Shutdown hook raised %s" % e)
+
+    def push_due(self, task, delay):
+        """ Schedule the task to run in delay seconds. Call it holding the condition """
+
+        task.due_seq = next(self.due_counter)
+        heapq.heappush(self.due_heap, (monotonic() + delay, task.due_seq, task.tid))
+        self.condition.notify()
+
+    def wake_task(self, tid):
+        """ Run the task now instead of waiting for its interval """
+
+        task = self.tasks.get(tid)
+        if task is None:
+            return
+
+        with self.condition:
+            if task.running:
+                # already running, run again as soon as it finish
+                task.wake_pending = True
+            else:
+                self.push_due(task, 0)
+
     def on_task_done(self, future, task=None):
 
+        wake_tasks = list()
         try:
             task.result = future.result()  # blocks until results are ready
             if isinstance(task.result, dict):
+                if 'wake' in task.result:
+                    # signal other tasks there are new work for them
+                    wake_tasks = task.result['wake']
                 if 'shutdown' in task.result:
                     if task.result['shutdown']:
                         task.shutdown = True
@@ -89,20 +147,48 @@ class TasksManager:
             future.cancel()
 
         task.last_run = datetime.datetime.now()
-        task.running = False
+
+        with self.condition:
+            task.running = False
+            if task.shutdown or task.wake_pending:
+                task.wake_pending = False
+                self.push_due(task, 0)
+            else:
+                self.push_due(task, task.wait)
+
+        for tid in wake_tasks:
+            self.wake_task(tid)
+
+    def next_due_task(self):
+        """ Block until a task is due and return it """
+
+        with self.condition:
+            while True:
+                now = monotonic()
+                if self.due_heap and self.due_heap[0][0] <= now:
+                    due_time, due_seq, tid = heapq.heappop(self.due_heap)
+                    task = self.tasks[tid]
+                    if task.due_seq != due_seq or task.running:
+                        # stale entry, the task was rescheduled
+                        continue
+                    task.due_seq = None
+                    task.running = True
+                    return task
+
+                timeout = self.max_idle
+                if self.due_heap:
+                    timeout = min(self.due_heap[0][0] - now, self.max_idle)
+                self.condition.wait(timeout=timeout)
 
     def schedule_task(self, pool, task):
 
-        if not task.running:
-            # shutdown task manager!
-            if task.shutdown:
-                raise TerminateSignal
-            if task.last_run + datetime.timedelta(seconds=task.wait) <= datetime.datetime.now():
-                task.running = True
-                # pass task object as vars to run funtion
-                task.kwargs["task"] = task
-                future = pool.schedule(task.func, args=task.args, kwargs=task.kwargs)
-                future.add_done_callback(functools.partial(self.on_task_done, task=task))
+        # shutdown task manager!
+        if task.shutdown:
+            raise TerminateSignal
+        # pass task object as vars to run funtion
+        task.kwargs["task"] = task
+        future = pool.schedule(task.func, args=task.args, kwargs=task.kwargs)
+        future.add_done_callback(functools.partial(self.on_task_done, task=task))
 
     def start_loop(self):
 
@@ -111,16 +197,16 @@ class TasksManager:
         with ThreadPool(max_workers=self.max_workers, max_tasks=self.max_tasks) as pool:
             try:
                 while True:
-                    if self.tasks:
-                        for key in self.tasks:
-                            self.schedule_task(pool, self.tasks[key])
-                    sleep(1)
+                    task = self.next_due_task()
+                    self.schedule_task(pool, task)
             except TerminateSignal:
                 log.info("Terminal Signal received... Going to shutdown... stop pooling now!")
                 #pool.stop()
                 # wait to finish tasks ...
                 pool.close()
                 pool.join(timeout=self.timeout)
+            finally:
+                self.run_shutdown_hooks()
 
         log.info("End Task Jobs loop")
 
@@ -0,0 +1,158 @@
+import threading
+from collections import OrderedDict
+
+from pymongo import UpdateOne, UpdateMany, DeleteMany
+
+
+# STATUS:
+# -4 Revert
+# -3 Stale Transaction
+# -2 Error Unhandled
+# -1 Error
+#  0 Queue
+#  1 Executed
+#  2 Confirmed > 10 blocks
+STATUS_EXECUTED = 1
+
+
+def operation_update(d_oper):
+    """ Update of the operation with the status rules applied by the database in one round trip
+
+    Executed (status >= 1) always wins. Queued and errors (status < 1) are written
+    with an update pipeline that keeps the current values if the stored operation is
+    already executed, so it is safe with concurrent writers and upsert.
+    """
+
+    if d_oper["status"] >= STATUS_EXECUTED:
+        return {"$set": d_oper}
+
+    executed = {"$gte": [{"$ifNull": ["$status", d_oper["status"]]}, STATUS_EXECUTED]}
+
+    return [{"$set": {field: {"$cond": [executed, "$" + field, {"$literal": value}]}
+                      for field, value in d_oper.items()}}]
+
+
+class UnitOfWork:
+    """ Collect the writes of a batch of raw transactions and flush them together.
+
+    Event handlers register write intents instead of writing to mongo. Intents are
+    plain tuples, kept in order per collection, and flushed with one ordered
+    bulk_write per collection. Safe to use from the partition threads.
+
+    Writes to the same operation (operId_) are coalesced in memory, so a queued,
+    executed and minted sequence in one batch goes out as one upsert.
+    """
+
+    def __init__(self, connection_helper, legacy_cleanup=True):
+        self.connection_helper = connection_helper
+        # remove legacy hash only documents, not needed once the database is migrated
+        self.legacy_cleanup = legacy_cleanup
+        self.lock = threading.Lock()
+        self.intents = OrderedDict()
+        # final state of the operations written in this batch by operId_
+        self.operations = OrderedDict()
+
+    def add(self, collection_name, intent):
+        with self.lock:
+            self.intents.setdefault(collection_name, list()).append(intent)
+
+    def delete_many(self, collection_name, query):
+        self.add(collection_name, ('delete_many', query))
+
+    def update_one(self, collection_name, query, update, upsert=False):
+        self.add(collection_name, ('update_one', query, update, upsert))
+
+    def update_many(self, collection_name, query, update):
+        self.add(collection_name, ('update_many', query, update, False))
+
+    def upsert_operation(self, d_oper):
+        """ Upsert the operation by operId_, merged with the previous writes of the batch """
+
+        with self.lock:
+            pending = self.operations.get(d_oper["operId_"])
+            if pending is None:
+                self.operations[d_oper["operId_"]] = dict(d_oper)
+                return
+
+            if pending["status"] >= STATUS_EXECUTED > d_oper["status"]:
+                # executed wins over queued and errors
+                return
+
+            # same result as applying the $set one after the other
+            pending.update(d_oper)
+
+    @staticmethod
+    def to_request(intent):
+
+        if intent[0] == 'delete_many':
+            return DeleteMany(intent[1])
+        if intent[0] == 'update_one':
+            return UpdateOne(intent[1], intent[2], upsert=intent[3])
+        if intent[0] == 'update_many':
+            return UpdateMany(intent[1], intent[2], upsert=intent[3])
+
+        raise Exception("Write intent not recognize: {0}".format(intent[0]))
+
+    def merge(self, intents, operation_writes):
+        """ Add the writes recorded by an IntentsRecorder, after the current ones """
+
+        with self.lock:
+            for collection_name, collection_intents in intents.items():
+                self.intents.setdefault(collection_name, list()).extend(collection_intents)
+
+        for d_oper in operation_writes:
+            self.upsert_operation(d_oper)
+
+    def __len__(self):
+        with self.lock:
+            return sum(len(intents) for intents in self.intents.values()) + len(self.operations)
+
+    def flush(self):
+        """ One bulk_write per collection, in the order the collections were first written, raw txs last """
+
+        with self.lock:
+            intents = self.intents
+            operations = self.operations
+            self.intents = OrderedDict()
+            self.operations = OrderedDict()
+
+        # one upsert per operation
+        operations_intents = intents.setdefault('operations', list())
+        for oper_id, d_oper in operations.items():
+            operations_intents.append(('update_one', {"operId_": oper_id}, operation_update(d_oper), True))
+        if not operations_intents:
+            del intents['operations']
+
+        # enrichment jobs after the operations they enrich, and raw txs processed
+        # markers always after the writes they stand for
+        for collection_name in ('operations_enrichment', 'raw_transactions'):
+            if collection_name in intents:
+                intents.move_to_end(collection_name)
+
+        for collection_name, collection_intents in intents.items():
+            collection = self.connection_helper.mongo_collection(collection_name)
+            collection.bulk_write([self.to_request(intent) for intent in collection_intents], ordered=True)
+
+
+class IntentsRecorder(UnitOfWork):
+    """ Unit of work of a pool process, only records the writes to send them to the parent.
+
+    Operations are not coalesced here, they are kept in order and merged by the
+    parent unit of work, so the result is the same as processing in the parent.
+    """
+
+    def __init__(self, legacy_cleanup=True):
+        super().__init__(None, legacy_cleanup=legacy_cleanup)
+        self.operation_writes = list()
+
+    def upsert_operation(self, d_oper):
+        with self.lock:
+            self.operation_writes.append(dict(d_oper))
+
+    def records(self):
+        """ (intents, operation writes), picklable """
+
+        return dict(self.intents), self.operation_writes
+
+    def flush(self):
+        raise Exception("Recorded intents are flushed by the parent unit of work")